@@ -1,25 +1,61 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from nlp.query_interpreter import interpret_query
-from ingestion.pubmed_ingestor import fetch_pubmed_results
-from summarization.summarizer import summarize_articles
-import json
+from nlp.query_interpreter import ainterpret, interpreter_stats
+from ingestion.async_http import close_async_client
+from ingestion.pubmed_ingestor import async_fetch_pubmed_results
+from summarization.summarizer import summarize_articles_async
+from storage.vector_index import rerank
+from utils import metrics
+import asyncio
+import time
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await close_async_client()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    metrics.HTTP_LATENCY.observe(time.perf_counter() - start, route=metrics.route_label(request.scope),
+                                 status=str(response.status_code))
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 class PromptReq(BaseModel):
     prompt: str
     max_results: int = 100
+    top_k: int = 0  # summarize only the N most relevant; 0 = all of them, most relevant first
+
+async def interpret_or_502(prompt):
+    q_struct = await ainterpret(prompt)
+    if q_struct is None:
+        raise HTTPException(status_code=502, detail="Could not interpret the prompt")
+    return q_struct
 
 @app.post("/interpret")
-def interpret(req: PromptReq):
-    return json.loads(interpret_query(req.prompt))
+async def interpret(req: PromptReq):
+    return await interpret_or_502(req.prompt)
+
+@app.get("/interpret/stats")
+async def interpret_stats():
+    # How much traffic the rule-based fast path takes, and per-path latency
+    return interpreter_stats()
 
 @app.post("/search")
-def search(req: PromptReq):
-    q_struct = json.loads(interpret_query(req.prompt))
-    articles = fetch_pubmed_results(q_struct["pubmed_query"], req.max_results)
-    summaries = summarize_articles(articles)
+async def search(req: PromptReq):
+    q_struct = await interpret_or_502(req.prompt)
+    articles = await async_fetch_pubmed_results(q_struct["pubmed_query"], req.max_results)
+    articles = await asyncio.to_thread(rerank, articles, q_struct.get("user_intent") or req.prompt,
+                                       top_k=req.top_k or None)
+    summaries = await summarize_articles_async(articles)
     q_struct["summaries"] = summaries
     return q_struct
-
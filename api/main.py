@@ -1,16 +1,49 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
+import asyncio
+import json
 import sys
 import os
+import time
 
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from ingestion.pubmed_ingestor import search_pubmed, fetch_details, mentions_statistics
+from ingestion.async_http import close_async_client
+from ingestion.pubmed_ingestor import (
+    async_search_pubmed, async_fetch_details, async_fetch_batch, mentions_statistics, BATCH_SIZE, MAX_WORKERS,
+)
+from ingestion.federated import iter_federated, federated_search, FETCHERS
+from storage.article_store import get_store
+from jobs.store import get_job_store, FINISHED
+from jobs.worker import WorkerPool
+from nlp.mesh import get_mesh_index
+from utils import metrics
+
+# Job workers inside the API process; set JOB_WORKERS=0 and run
+# `python -m jobs.worker` to keep them in a separate process instead
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
 
-app = FastAPI(title="Literature Review API")
+@asynccontextmanager
+async def lifespan(app):
+    # The shared async HTTP client and the job workers live as long as the app
+    pool = WorkerPool(get_job_store(), JOB_WORKERS) if JOB_WORKERS else None
+    if pool:
+        pool.start()
+    # Prebuilt MeSH index (python -m nlp.mesh build); memory-mapped, so
+    # opening it here costs milliseconds
+    get_mesh_index()
+    yield
+    if pool:
+        pool.stop()
+    await close_async_client()
+
+app = FastAPI(title="Literature Review API", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -21,6 +54,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    metrics.HTTP_LATENCY.observe(time.perf_counter() - start, route=metrics.route_label(request.scope),
+                                 status=str(response.status_code))
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Stage latency, upstream requests/bytes/retries, LLM tokens, cache hits
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 class SearchRequest(BaseModel):
     query: str
     max_results: int = 20
@@ -35,19 +81,55 @@ class Article(BaseModel):
     pmid: str
     summary: Optional[str] = None
 
+class LocalSearchRequest(BaseModel):
+    query: str
+    max_results: int = 20
+    filter_stats: bool = True
+    sources: Optional[List[str]] = None  # "pubmed", "arxiv", "semantic"
+
+class LocalArticle(BaseModel):
+    source: str
+    source_id: str
+    title: str
+    abstract: str
+    authors: List[str]
+    journal: str = ""
+    pubdate: str = ""
+    score: float
+
+def to_local_article(source, record, score):
+    # Map each ingestor's record shape onto one response shape
+    if source == "arxiv":
+        source_id, abstract, journal, pubdate = record["id"], record.get("summary", ""), record.get("primary_category", ""), record.get("published", "")
+    elif source == "semantic":
+        source_id, abstract, journal, pubdate = record["paper_id"], record.get("abstract") or "", record.get("venue") or "", str(record.get("year") or "")
+    else:
+        source_id, abstract, journal, pubdate = record["pmid"], record.get("abstract", ""), record.get("journal", ""), record.get("pubdate", "")
+    return LocalArticle(
+        source=source,
+        source_id=source_id,
+        title=record.get("title") or "",
+        abstract=abstract,
+        authors=[a for a in record.get("authors") or [] if a],
+        journal=journal,
+        pubdate=pubdate,
+        score=score,
+    )
+
 @app.post("/api/search", response_model=List[Article])
 async def search_literature(request: SearchRequest):
     # Search PubMed
-    ids = search_pubmed(request.query, request.max_results)
+    ids = await async_search_pubmed(request.query, request.max_results)
     if not ids:
         return []
     
     # Fetch article details
-    articles = fetch_details(ids)
+    articles = await async_fetch_details(ids)
     
     # Filter for statistical analysis if requested
     if request.filter_stats:
-        articles = [a for a in articles if mentions_statistics(a.get("abstract", ""))]
+        with metrics.stage("filter"):
+            articles = [a for a in articles if mentions_statistics(a.get("abstract", ""))]
     
     # Skip summarization for now
     for article in articles:
@@ -55,6 +137,279 @@ async def search_literature(request: SearchRequest):
     
     return articles
 
+# === Streaming search: NDJSON (default) or server-sent events ===
+def encode_event(event, fmt):
+    data = json.dumps(event)
+    if fmt == "sse":
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+async def stream_search_events(http_request: Request, request: SearchRequest):
+    """Yield progress/article/error/done events as each efetch batch is parsed.
+
+    Batches run MAX_WORKERS at a time on the shared async HTTP client; if
+    the caller goes away, pending batches are cancelled before they reach
+    PubMed. The response headers are already sent by the time anything
+    fails, so failures become "error" events (the search itself, or one
+    batch's PMIDs) and the stream still ends with "done"; a stream without
+    "done" was cut off.
+    """
+    store = get_store()
+    try:
+        ids = await async_search_pubmed(request.query, request.max_results)
+        cached = await run_in_threadpool(store.get_fresh, "pubmed", ids)
+    except Exception as e:
+        yield {"type": "error", "stage": "search", "error": f"{type(e).__name__}: {e}"}
+        yield {"type": "done", "total": 0, "returned": 0, "failed": 0}
+        return
+    to_fetch = [pid for pid in ids if pid not in cached]
+    batches = [to_fetch[i:i + BATCH_SIZE] for i in range(0, len(to_fetch), BATCH_SIZE)]
+
+    progress = {"type": "progress", "total": len(ids), "cached": len(cached),
+                "batches_done": 0, "batches_total": len(batches), "batches_failed": 0, "returned": 0}
+    yield progress
+
+    def article_events(records):
+        for record in records:
+            if request.filter_stats and not mentions_statistics(record.get("abstract", "")):
+                continue
+            progress["returned"] += 1
+            yield {"type": "article", "article": dict(record, summary="Summarization temporarily disabled")}
+
+    for event in article_events(cached[pid] for pid in ids if pid in cached):
+        yield event
+
+    semaphore = asyncio.Semaphore(MAX_WORKERS)
+
+    async def fetch(batch):
+        # (batch, records, error); one failed batch doesn't end the stream
+        async with semaphore:
+            if await http_request.is_disconnected():
+                return batch, [], None
+            try:
+                records = await async_fetch_batch(batch)
+                await run_in_threadpool(store.put_many, "pubmed",
+                                        [r for r in records if r["title"] or r["abstract"]], "pmid")
+            except Exception as e:
+                return batch, [], f"{type(e).__name__}: {e}"
+            return batch, records, None
+
+    failed = 0
+    tasks = [asyncio.ensure_future(fetch(batch)) for batch in batches]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            batch, records, error = await next_done
+            progress["batches_done"] += 1
+            if error:
+                progress["batches_failed"] += 1
+                failed += len(batch)
+                yield {"type": "error", "stage": "fetch", "pmids": batch, "error": error}
+            for event in article_events(records):
+                yield event
+            yield dict(progress)
+    finally:
+        # Client disconnected (or an error): stop everything not yet fetched
+        for task in tasks:
+            task.cancel()
+
+    yield {"type": "done", "total": len(ids), "returned": progress["returned"], "failed": failed}
+
+@app.post("/api/search/stream")
+async def search_literature_stream(http_request: Request, request: SearchRequest, format: str = "ndjson"):
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+
+    async def body():
+        async for event in stream_search_events(http_request, request):
+            yield encode_event(event, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/local-search", response_model=List[LocalArticle])
+def search_local(request: LocalSearchRequest):
+    # Offline BM25 search over everything already ingested; accepts the same
+    # boolean syntax interpret_query produces for pubmed_query
+    hits = get_store().search(request.query, limit=request.max_results, sources=request.sources)
+    articles = [to_local_article(source, record, score) for source, record, score in hits]
+    if request.filter_stats:
+        articles = [a for a in articles if mentions_statistics(a.abstract)]
+    return articles
+
+# === Federated search: PubMed + arXiv + Semantic Scholar ===
+class FederatedSearchRequest(BaseModel):
+    query: str
+    max_results: int = 20  # per source
+    filter_stats: bool = False
+    sources: Optional[List[str]] = None  # "pubmed", "arxiv", "semantic"
+    budget: Optional[float] = None  # seconds per source
+    dedupe: bool = True  # fold near-duplicate preprints/versions together
+
+class FederatedArticle(BaseModel):
+    key: str
+    title: str
+    abstract: str
+    authors: List[str]
+    venue: str = ""
+    published: str = ""
+    year: Optional[int] = None
+    doi: str = ""
+    url: str = ""
+    ids: Dict[str, str]
+    sources: List[str]
+    merged_from: List[str] = []
+
+class SourceStatus(BaseModel):
+    status: str  # "ok", "timeout" or "error"
+    count: int
+    elapsed: float
+    error: Optional[str] = None
+
+class FederatedResponse(BaseModel):
+    results: List[FederatedArticle]
+    sources: Dict[str, SourceStatus]
+
+def check_sources(sources):
+    unknown = [s for s in sources or [] if s not in FETCHERS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sources: {', '.join(unknown)}")
+
+@app.post("/api/federated-search", response_model=FederatedResponse)
+async def search_federated(request: FederatedSearchRequest):
+    check_sources(request.sources)
+    result = await federated_search(request.query, request.max_results, request.sources,
+                                    request.budget, request.dedupe)
+    if request.filter_stats:
+        result["results"] = [a for a in result["results"] if mentions_statistics(a["abstract"])]
+    return result
+
+@app.post("/api/federated-search/stream")
+async def search_federated_stream(request: FederatedSearchRequest, format: str = "ndjson"):
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    check_sources(request.sources)
+
+    def keep(articles):
+        if not request.filter_stats:
+            return articles
+        return [a for a in articles if mentions_statistics(a["abstract"])]
+
+    async def body():
+        async for event in iter_federated(request.query, request.max_results, request.sources, request.budget):
+            if event["type"] == "articles":
+                event = dict(event, new=keep(event["new"]), updated=keep(event["updated"]))
+                if not event["new"] and not event["updated"]:
+                    continue
+            yield encode_event(event, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+# === Background jobs for large pulls ===
+class JobRequest(BaseModel):
+    query: str
+    max_results: int = -1  # -1 = everything that matches
+    filter_stats: bool = True
+    summarize: bool = False
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    step: Optional[str] = None
+    total: Optional[int] = None
+    fetched: int = 0
+    result_count: int = 0
+    error: Optional[str] = None
+    summary: Optional[str] = None
+
+class JobResults(BaseModel):
+    job_id: str
+    offset: int
+    limit: int
+    result_count: int
+    results: List[dict]
+
+def to_job_status(job):
+    state = job["state"]
+    return JobStatus(
+        job_id=job["id"],
+        status=job["status"],
+        step=job["step"],
+        total=state.get("total"),
+        fetched=state.get("fetched", 0),
+        result_count=job["result_count"],
+        error=job["error"],
+        summary=state.get("summary"),
+    )
+
+def get_job_or_404(job_id):
+    job = get_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs", response_model=JobStatus, status_code=202)
+def submit_job(request: JobRequest):
+    job_id = get_job_store().create(request.dict())
+    return to_job_status(get_job_store().get(job_id))
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+def job_status(job_id: str):
+    return to_job_status(get_job_or_404(job_id))
+
+@app.post("/api/jobs/{job_id}/cancel", response_model=JobStatus)
+def cancel_job(job_id: str):
+    job = get_job_or_404(job_id)
+    if job["status"] not in FINISHED:
+        get_job_store().request_cancel(job_id)
+    return to_job_status(get_job_store().get(job_id))
+
+@app.get("/api/jobs/{job_id}/results", response_model=JobResults)
+def job_results(job_id: str, offset: int = 0, limit: int = 100):
+    job = get_job_or_404(job_id)
+    limit = max(1, min(limit, 1000))
+    return JobResults(
+        job_id=job_id,
+        offset=offset,
+        limit=limit,
+        result_count=job["result_count"],
+        results=get_job_store().get_results(job_id, offset, limit),
+    )
+
+# === MeSH autocomplete / expansion (local index, no LLM) ===
+class MeshSuggestion(BaseModel):
+    ui: str
+    name: str
+    match: str  # the name or entry term that matched the prefix
+
+class MeshDescriptor(BaseModel):
+    ui: str
+    name: str
+    tree_numbers: List[str]
+    entry_terms: List[str]
+    narrower: Optional[List[str]] = None
+    pubmed_clause: str
+
+def mesh_index_or_503():
+    index = get_mesh_index()
+    if index is None:
+        raise HTTPException(status_code=503,
+                            detail="MeSH index not built; run `python -m nlp.mesh build desc20XX.xml`")
+    return index
+
+# Lookups are sub-millisecond, so these run on the event loop directly
+@app.get("/api/mesh/autocomplete", response_model=List[MeshSuggestion])
+async def mesh_autocomplete(q: str, limit: int = 10):
+    return mesh_index_or_503().complete(q, max(1, min(limit, 50)))
+
+@app.get("/api/mesh/descriptor", response_model=MeshDescriptor)
+async def mesh_descriptor(term: str, explode: bool = False, max_depth: Optional[int] = None):
+    index = mesh_index_or_503()
+    i = index.find(term)
+    if i is None:
+        raise HTTPException(status_code=404, detail=f"'{term}' is not a MeSH heading or entry term")
+    return dict(index.descriptor(i, explode, max_depth), pubmed_clause=index.pubmed_clause(term))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
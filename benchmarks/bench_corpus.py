@@ -0,0 +1,110 @@
+# benchmarks/bench_corpus.py
+#
+# Load time and peak RSS of a data/raw-style JSON file (json.load, as
+# load_filtered_abstracts did) vs. the same records as a .corpus
+# (storage/corpus.py): full lazy scan, metadata columns only, and random
+# row lookups. Each load runs in a fresh interpreter so peak RSS is its own.
+#
+#   python -m benchmarks.bench_corpus --n 300000
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from storage.corpus import disk_size, open_corpus, write_corpus
+
+META_COLUMNS = ["pmid", "title", "journal", "year"]
+
+# === 1. Fixture ===
+def build_records(n, source, seed=3):
+    with open(source) as f:
+        seeds = json.load(f)
+    rng = random.Random(seed)
+    for i in range(n):
+        record = dict(seeds[i % len(seeds)], pmid=str(30000000 + i))
+        # Shuffle sentences so blocks don't compress as exact repeats
+        sentences = record.get("abstract", "").split(". ")
+        rng.shuffle(sentences)
+        record["abstract"] = ". ".join(sentences)
+        yield record
+
+# === 2. One load, run in a child process ===
+def peak_rss_mb():
+    # VmHWM is per-process; ru_maxrss would carry over the parent's peak
+    # from before the fork
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def load(mode, path):
+    start = time.perf_counter()
+    chars = 0
+    if mode == "json":
+        with open(path) as f:
+            records = json.load(f)
+        for r in records:
+            chars += len(r.get("abstract", ""))
+    elif mode == "corpus":
+        for r in open_corpus(path):
+            chars += len(r.get("abstract", ""))
+    elif mode == "corpus-meta":
+        for r in open_corpus(path, META_COLUMNS):
+            chars += len(r.get("title", ""))
+    elif mode == "corpus-random":
+        corpus = open_corpus(path)
+        rng = random.Random(0)
+        for _ in range(1000):
+            chars += len(corpus[rng.randrange(len(corpus))].get("abstract", ""))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"elapsed": elapsed, "peak_mb": peak_rss_mb(), "chars": chars}))
+
+def measure(mode, path):
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_corpus", "--load", mode, path],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out)
+
+# === 3. Comparison ===
+def run(n, source, workdir):
+    json_path = os.path.join(workdir, "corpus.json")
+    corpus_path = os.path.join(workdir, "corpus.corpus")
+    print(f"🧪 Writing {n} records to {workdir}")
+    with open(json_path, "w") as f:
+        json.dump(list(build_records(n, source)), f, indent=2)
+    start = time.perf_counter()
+    write_corpus(corpus_path, build_records(n, source))
+    print(f"   JSON {os.path.getsize(json_path) / 1e6:.0f} MB, corpus {disk_size(corpus_path) / 1e6:.0f} MB "
+          f"(written in {time.perf_counter() - start:.1f}s)")
+
+    baseline = None
+    for mode, path in (("json", json_path), ("corpus", corpus_path),
+                       ("corpus-meta", corpus_path), ("corpus-random", corpus_path)):
+        result = measure(mode, path)
+        baseline = baseline or result
+        print(f"{mode:14s}: {result['elapsed']:7.2f}s  peak RSS {result['peak_mb']:7.0f} MB  "
+              f"({baseline['elapsed'] / result['elapsed']:.1f}x faster, "
+              f"{baseline['peak_mb'] / result['peak_mb']:.1f}x less memory)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100000, help="Number of records")
+    parser.add_argument("--source", default="data/raw/pubmed_machine_learning.json")
+    parser.add_argument("--workdir", default=None, help="Where to write the fixture files (default: a temp dir)")
+    parser.add_argument("--load", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load:
+        load(*args.load)
+    else:
+        with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+            run(args.n, args.source, workdir)
@@ -0,0 +1,254 @@
+# benchmarks/bench_e2e.py
+#
+# Offline end-to-end benchmark: the main.py pipeline, POST /api/search and
+# POST /api/federated-search at 100, 1k and 10k articles, against local
+# stand-ins for E-utilities, arXiv, Semantic Scholar and OpenAI. Reports
+# throughput (articles/s), p50/p99 latency and peak RSS per scenario and
+# size, and appends every result to benchmarks/results/e2e.jsonl under the
+# current git commit, so each run is compared with the last one recorded
+# for a different commit.
+#
+# The stand-ins replay benchmarks/fixtures/ when it exists
+# (python -m benchmarks.record_fixtures), else synthesize from data/raw.
+# Every run starts from an empty article store, LLM cache and vector index.
+#
+#   python -m benchmarks.bench_e2e
+#   python -m benchmarks.bench_e2e --sizes 100 1000 --scenarios cli api_search --repeat 5
+#   python -m benchmarks.bench_e2e --history      # past results, newest last
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fake_arxiv import start_fake_arxiv
+from benchmarks.fake_eutils import start_fake_eutils
+from benchmarks.fake_openai import start_fake_openai
+from benchmarks.fake_s2 import start_fake_s2
+from benchmarks.load_test import percentile, start_api
+from benchmarks.record_fixtures import FIXTURE_DIR
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "e2e.jsonl")
+SIZES = (100, 1000, 10000)
+SCENARIOS = ("cli", "api_search", "api_federated")
+REGRESSION_THRESHOLD = 0.10  # flag >10% slower / more memory than the last commit
+
+# === 1. Stand-ins and a clean environment per run ===
+def fixture(name):
+    path = os.path.join(FIXTURE_DIR, name)
+    return path if os.path.exists(path) else None
+
+def start_stand_ins(hits, latency, llm_latency):
+    """Start all four stand-ins; returns (servers, env overrides, fixtures used)."""
+    fixtures = {name: fixture(name) for name in ("efetch.xml", "arxiv.xml", "s2_papers.json")}
+    eutils, eutils_url = start_fake_eutils(latency, hits, recorded_path=fixtures["efetch.xml"])
+    arxiv, arxiv_url = start_fake_arxiv(latency, hits, recorded_path=fixtures["arxiv.xml"])
+    s2, s2_url = start_fake_s2(latency, recorded_path=fixtures["s2_papers.json"])
+    llm, llm_url = start_fake_openai(llm_latency)
+    env = {
+        "NCBI_BASE_URL": eutils_url, "NCBI_RATE_LIMIT": "1000",
+        "ARXIV_API_URL": arxiv_url, "ARXIV_RATE_LIMIT": "1000",
+        "S2_API_URL": s2_url, "S2_RATE_LIMIT": "1000",
+        "OPENAI_API_BASE": llm_url, "OPENAI_API_KEY": "fake",
+        "JOB_WORKERS": "0",
+    }
+    return [eutils, arxiv, s2, llm], env, sorted(n for n, p in fixtures.items() if p)
+
+def run_env(stand_in_env, state_dir):
+    return dict(
+        os.environ, **stand_in_env,
+        PYTHONPATH=ROOT,
+        ARTICLE_DB_PATH=os.path.join(state_dir, "articles.db"),
+        LLM_CACHE_PATH=os.path.join(state_dir, "llm_cache.db"),
+        SUMMARY_DB_PATH=os.path.join(state_dir, "summaries.db"),
+        JOB_DB_PATH=os.path.join(state_dir, "jobs.db"),
+        VECTOR_DIR=os.path.join(state_dir, "vectors"),
+        MESH_INDEX_DIR=os.path.join(state_dir, "mesh"),
+    )
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def vm_hwm_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+def query(i):
+    # Boolean, so the rule interpreter takes it without an LLM round trip;
+    # distinct per request so nothing is served from the search cache
+    return f"machine learning AND sepsis AND cohort{i}"
+
+# === 2. Scenarios ===
+def bench_cli(size, repeat, env, concurrency):
+    # One main.py process per run; latency is the whole run, peak RSS its own
+    latencies, peaks = [], []
+    for i in range(repeat):
+        with tempfile.TemporaryDirectory() as state_dir:
+            cmd = [sys.executable, "main.py", "--prompt", query(i), "--max_results", str(size), "--enrich"]
+            start = time.perf_counter()
+            proc = subprocess.Popen(cmd, cwd=ROOT, env=run_env(env, state_dir),
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            with proc.stdout:
+                output = proc.stdout.read()
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            latencies.append(time.perf_counter() - start)
+            if proc.returncode != 0:
+                raise RuntimeError(f"main.py failed:\n{output.decode(errors='replace')[-2000:]}")
+            peaks.append(usage.ru_maxrss / 1024)
+    return latencies, sum(latencies), max(peaks)
+
+async def post_all(url, bodies, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(timeout=1800) as client:
+        async def one(body):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(url, json=body)
+                response.raise_for_status()
+                return time.perf_counter() - start
+        return await asyncio.gather(*(one(b) for b in bodies))
+
+def bench_api(path, body_for):
+    def bench(size, repeat, env, concurrency):
+        with tempfile.TemporaryDirectory() as state_dir:
+            port = free_port()
+            proc = start_api("api.main:app", port, run_env(env, state_dir))
+            try:
+                bodies = [body_for(i, size) for i in range(repeat)]
+                start = time.perf_counter()
+                latencies = asyncio.run(post_all(f"http://127.0.0.1:{port}{path}", bodies, concurrency))
+                wall = time.perf_counter() - start
+                peak = vm_hwm_mb(proc.pid)
+            finally:
+                proc.terminate()
+                proc.wait()
+        return latencies, wall, peak
+    return bench
+
+BENCHES = {
+    "cli": bench_cli,
+    "api_search": bench_api("/api/search", lambda i, size: {"query": query(i), "max_results": size}),
+    "api_federated": bench_api("/api/federated-search", lambda i, size: {
+        "query": query(i), "max_results": size, "budget": 600}),
+}
+
+# === 3. Results history ===
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, bool(dirty)
+
+def load_history(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def append_results(results, path=RESULTS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+def same_config(a, b):
+    keys = ("scenario", "size", "repeat", "concurrency", "latency", "llm_latency", "fixtures")
+    return all(a.get(k) == b.get(k) for k in keys)
+
+def previous_result(result, history):
+    # Most recent run of the same configuration on another commit
+    for past in reversed(history):
+        if past["commit"] != result["commit"] and same_config(past, result):
+            return past
+    return None
+
+def change(new, old, higher_is_better=False):
+    if not old or new is None:
+        return ""
+    delta = (new - old) / old
+    worse = -delta if higher_is_better else delta
+    flag = " ⚠️" if worse > REGRESSION_THRESHOLD else ""
+    return f" ({delta:+.0%}{flag})"
+
+def format_result(result, previous=None):
+    prev = previous or {}
+    return (f"{result['scenario']:14s} {result['size']:6d}  "
+            f"{result['throughput']:8.1f} art/s{change(result['throughput'], prev.get('throughput'), True):12s}"
+            f" p50 {result['p50']:7.2f}s{change(result['p50'], prev.get('p50')):12s}"
+            f" p99 {result['p99']:7.2f}s{change(result['p99'], prev.get('p99')):12s}"
+            f" peak {result['peak_mb']:6.0f} MB{change(result['peak_mb'], prev.get('peak_mb'))}")
+
+# === 4. Run ===
+def run(scenarios, sizes, repeat, concurrency, latency, llm_latency, save=True):
+    commit, dirty = git_commit()
+    history = load_history()
+    servers, env, fixtures = start_stand_ins(max(sizes), latency, llm_latency)
+    print(f"🧪 Commit {commit}{' (dirty)' if dirty else ''}; upstream "
+          f"{'replaying ' + ', '.join(fixtures) if fixtures else 'synthetic'}; "
+          f"latency {latency}s, LLM {llm_latency}s")
+    results = []
+    try:
+        for scenario in scenarios:
+            for size in sizes:
+                latencies, wall, peak = BENCHES[scenario](size, repeat, env, concurrency)
+                result = {
+                    "commit": commit, "dirty": dirty, "timestamp": time.time(),
+                    "python": platform.python_version(), "scenario": scenario, "size": size,
+                    "repeat": repeat, "concurrency": 1 if scenario == "cli" else concurrency,
+                    "latency": latency, "llm_latency": llm_latency, "fixtures": fixtures,
+                    "throughput": size * repeat / wall,
+                    "p50": percentile(latencies, 50), "p99": percentile(latencies, 99),
+                    "peak_mb": peak,
+                }
+                results.append(result)
+                print(format_result(result, previous_result(result, history)))
+    finally:
+        for server in servers:
+            server.shutdown()
+    if save:
+        append_results(results)
+        print(f"💾 Appended {len(results)} results to {os.path.relpath(RESULTS_PATH, ROOT)}")
+    return results
+
+def show_history(path=RESULTS_PATH):
+    history = load_history(path)
+    for i, result in enumerate(history):
+        print(f"{result['commit']:>9s}{'*' if result['dirty'] else ' '} "
+              f"{format_result(result, previous_result(result, history[:i]))}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES), help="Articles per request")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs / requests per scenario and size")
+    parser.add_argument("--concurrency", type=int, default=1, help="API requests in flight at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="Upstream stand-in latency (s)")
+    parser.add_argument("--llm_latency", type=float, default=0.5, help="Fake OpenAI latency (s)")
+    parser.add_argument("--no_save", action="store_true", help="Don't append to the results history")
+    parser.add_argument("--history", action="store_true", help="Print the stored results and exit")
+    args = parser.parse_args()
+
+    if args.history:
+        show_history()
+    else:
+        run(args.scenarios, args.sizes, args.repeat, args.concurrency, args.latency, args.llm_latency,
+            save=not args.no_save)
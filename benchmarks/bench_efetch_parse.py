@@ -0,0 +1,87 @@
+# benchmarks/bench_efetch_parse.py
+#
+# Micro-benchmark: streaming efetch parser vs. the old per-PMID regex scan.
+# The payload is the recorded efetch response in benchmarks/fixtures/,
+# its articles repeated (with fresh PMIDs) up to 200.
+#
+#   python -m benchmarks.bench_efetch_parse --record "machine learning"   # re-record the fixture
+#   python -m benchmarks.bench_efetch_parse                               # run the benchmark
+
+import argparse
+import os
+import re
+import time
+
+from benchmarks.fake_eutils import PMID_BASE, efetch_xml, load_recorded, load_seeds
+from benchmarks.record_fixtures import FIXTURE_DIR
+from ingestion.pubmed_xml import iter_pubmed_articles
+
+PAYLOAD_PATH = os.path.join(FIXTURE_DIR, "efetch.xml")
+N_ARTICLES = 200
+
+# === 1. The regex path we replaced (kept here only as the baseline) ===
+def legacy_extract_abstract_from_xml(xml_text, pmid):
+    pattern = re.compile(rf"<ArticleId IdType=\"pubmed\">{pmid}</ArticleId>.*?<Abstract>(.*?)</Abstract>", re.DOTALL)
+    match = pattern.search(xml_text)
+    if match:
+        raw = match.group(1)
+        clean = re.sub(r"<.*?>", "", raw)
+        return clean.strip()
+    return ""
+
+def legacy_parse(xml_text, pmids):
+    return {pid: legacy_extract_abstract_from_xml(xml_text, pid) for pid in pmids}
+
+def streaming_parse(xml_bytes):
+    return {r["pmid"]: r for r in iter_pubmed_articles([xml_bytes])}
+
+# === 2. Payload: the recorded fixture, or synthesized from data/raw ===
+def record_payload(query, path):
+    from ingestion.pubmed_ingestor import search_pubmed, ncbi_request
+
+    pmids = search_pubmed(query, max_results=N_ARTICLES)
+    response = ncbi_request("efetch.fcgi", {"db": "pubmed", "id": ",".join(pmids), "retmode": "xml"}, method="POST")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(response.content)
+    print(f"✅ Recorded {len(pmids)} articles to {path}")
+
+def build_payload(path):
+    pmids = [str(PMID_BASE + i) for i in range(N_ARTICLES)]
+    if os.path.exists(path):
+        seeds, fragments = load_recorded(path)
+        print(f"📄 Using recorded payload {path} ({len(fragments)} articles)")
+        return efetch_xml(pmids, seeds, fragments)
+    print(f"📄 No recorded payload at {path}; using a synthesized one")
+    return efetch_xml(pmids, load_seeds())
+
+# === 3. Timing ===
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run(path, repeat):
+    payload = build_payload(path)
+    text = payload.decode("utf-8")
+    pmids = list(streaming_parse(payload))
+    print(f"🔢 {len(pmids)} articles, {len(payload) / 1024:.0f} KiB")
+
+    t_regex = best_of(lambda: legacy_parse(text, pmids), repeat)
+    t_stream = best_of(lambda: streaming_parse(payload), repeat)
+    print(f"regex per-PMID scan : {t_regex * 1000:8.2f} ms")
+    print(f"streaming pull parse: {t_stream * 1000:8.2f} ms  ({t_regex / t_stream:.1f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payload", default=PAYLOAD_PATH, help="Recorded efetch XML payload")
+    parser.add_argument("--record", default=None, help="Record a fresh payload for this query first")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.record:
+        record_payload(args.record, args.payload)
+    run(args.payload, args.repeat)
@@ -0,0 +1,57 @@
+# benchmarks/bench_packing.py
+#
+# LLM calls needed by the old character chunker vs. the token bin packer.
+#
+#   python -m benchmarks.bench_packing --n 500 --budget 6000
+
+import argparse
+import json
+import random
+
+from summarization.packer import count_tokens, pack_abstracts, packing_report
+from summarization.summarizer import build_messages
+
+# === The character-count chunker we replaced (baseline only) ===
+def legacy_chunk_abstracts(abstracts, chunk_size=3000):
+    chunks = []
+    current_chunk = ""
+    for entry in abstracts:
+        abstract = entry.get("abstract", "")
+        if not abstract:
+            continue
+        if len(current_chunk) + len(abstract) > chunk_size:
+            chunks.append(current_chunk)
+            current_chunk = ""
+        current_chunk += f"\nTitle: {entry.get('title', '')}\nAbstract: {abstract}\n"
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+def run(n, budget, source):
+    with open(source) as f:
+        seeds = json.load(f)
+    rng = random.Random(0)
+    # Vary abstract lengths so packing actually has something to do
+    abstracts = []
+    for i in range(n):
+        seed = dict(seeds[i % len(seeds)], pubmed_id=str(i))
+        seed["abstract"] = seed["abstract"][: rng.randint(300, len(seed["abstract"]))]
+        abstracts.append(seed)
+
+    for label, chars in (("legacy 3000 chars", 3000), ("legacy same budget", budget * 4)):
+        chunks = legacy_chunk_abstracts(abstracts, chars)
+        fills = [count_tokens(c) / budget for c in chunks]
+        over = sum(1 for f in fills if f > 1)
+        print(f"{label:20s}: {len(chunks):5d} calls, mean fill {sum(fills) / len(fills):5.0%}, {over} over budget")
+
+    chunks = pack_abstracts(abstracts, build_messages, budget)
+    report = packing_report(chunks)
+    print(f"{'token bin packer':20s}: {report['chunks']:5d} calls, mean fill {report['mean_fill']:5.0%}, 0 over budget")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=500)
+    parser.add_argument("--budget", type=int, default=6000, help="Abstract tokens per request")
+    parser.add_argument("--source", default="data/raw/pubmed_machine_learning.json")
+    args = parser.parse_args()
+    run(args.n, args.budget, args.source)
@@ -0,0 +1,69 @@
+# benchmarks/bench_stats_matcher.py
+#
+# Throughput of the unified StatsMatcher against the three filters it replaced.
+#
+#   python -m benchmarks.bench_stats_matcher --n 100000
+
+import argparse
+import json
+import re
+import time
+
+from utils.stats_matcher import default_matcher
+
+# === 1. The three filters we replaced (kept here only as baselines) ===
+LEGACY_KEYWORDS = [
+    "p-value", "multivariate", "regression", "ANOVA",
+    "chi-square", "logistic", "cox model", "hazard ratio",
+]
+
+LEGACY_TERMS = {
+    'statistical analysis', 'statistical significance', 'p-value', 'confidence interval',
+    'standard deviation', 'chi-square', 'regression', 't-test', 'anova', 'correlation',
+    'mean', 'median', 'statistical test', 'statistically significant', 'p < ', 'p<', 'p=', 'p = ',
+}
+
+def legacy_utils_filter(abstract):
+    return any(re.search(rf"\b{kw}\b", abstract, re.IGNORECASE) for kw in LEGACY_KEYWORDS)
+
+def legacy_utils_filters(abstract):
+    if not abstract:
+        return False
+    abstract = abstract.lower()
+    return any(term in abstract for term in LEGACY_TERMS)
+
+def legacy_pubmed_mentions(text):
+    if not text:
+        return False
+    pattern = re.compile(r"(p-?value|regression|anova|odds ratio|confidence interval|multivariate|statistical significance)", re.I)
+    return bool(pattern.search(text))
+
+# === 2. Timing ===
+def throughput(fn, abstracts):
+    start = time.perf_counter()
+    for abstract in abstracts:
+        fn(abstract)
+    return len(abstracts) / (time.perf_counter() - start)
+
+def run(n, source):
+    with open(source) as f:
+        seeds = [r.get("abstract", "") for r in json.load(f)]
+    abstracts = [seeds[i % len(seeds)] for i in range(n)]
+    print(f"🔢 {n} abstracts (avg {sum(map(len, seeds)) // len(seeds)} chars)")
+
+    candidates = [
+        ("utils.filter (regex per keyword)", legacy_utils_filter),
+        ("utils.filters (substring scans)", legacy_utils_filters),
+        ("pubmed_ingestor.mentions_statistics", legacy_pubmed_mentions),
+        ("StatsMatcher.mentions", default_matcher.mentions),
+        ("StatsMatcher.find (all matches)", default_matcher.find),
+    ]
+    for name, fn in candidates:
+        print(f"{name:38s} {throughput(fn, abstracts):12,.0f} abstracts/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100000, help="Number of abstracts to scan")
+    parser.add_argument("--source", default="data/raw/pubmed_machine_learning.json")
+    args = parser.parse_args()
+    run(args.n, args.source)
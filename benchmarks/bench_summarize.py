@@ -0,0 +1,46 @@
+# benchmarks/bench_summarize.py
+#
+# Sequential vs. async summarization against the fake OpenAI server.
+#
+#   python -m benchmarks.bench_summarize --chunks 40 --latency 0.5 --concurrency 8
+
+import argparse
+import asyncio
+import time
+
+import openai
+
+from benchmarks.fake_openai import start_fake_openai
+from summarization import summarizer
+from utils import llm_cache
+
+def run(n_chunks, latency, fail_rate, concurrency):
+    server, base = start_fake_openai(latency, fail_rate)
+    openai.api_base = base
+    openai.api_key = "fake"
+    summarizer.BACKOFF_BASE = 0.05
+    llm_cache.CACHE_MAX_TEMPERATURE = -1  # measure real calls, not cache hits
+    chunks = [f"\nTitle: Article {i}\nAbstract: " + "regression analysis " * 150 for i in range(n_chunks)]
+
+    start = time.perf_counter()
+    sequential = [summarizer.summarize_chunk(c) for c in chunks]
+    t_seq = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = asyncio.run(summarizer.summarize_chunks_async(chunks, concurrency, tokens_per_minute=0))
+    t_async = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"sequential : {t_seq:6.2f}s, {sum(s is None for s in sequential)} chunks silently dropped")
+    print(f"async (x{concurrency}): {t_async:6.2f}s, {sum(1 for r in results if r['error'])} chunks failed after retries, "
+          f"{sum(r['attempts'] or 0 for r in results) - sum(1 for r in results if r['summary'])} retries")
+    print(f"speedup    : {t_seq / t_async:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--fail_rate", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    run(args.chunks, args.latency, args.fail_rate, args.concurrency)
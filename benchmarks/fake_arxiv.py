@@ -0,0 +1,120 @@
+# benchmarks/fake_arxiv.py
+#
+# Stand-in for the arXiv query API (Atom feed with opensearch totals).
+# Entries are synthesized from data/raw seeds, or replayed from a recorded
+# Atom response (benchmarks/record_fixtures.py): its <entry> elements are
+# served verbatim with the arXiv id rewritten, so every result is distinct.
+#
+#   python -m benchmarks.fake_arxiv --port 8400 --hits 5000
+#   ARXIV_API_URL=http://127.0.0.1:8400/api/query python -m ingestion.arxiv_ingestor --query "deep learning"
+
+import argparse
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+from benchmarks.fake_eutils import SEED_PATH, load_seeds
+
+ENTRY_RE = re.compile(r"<entry>.*?</entry>", re.S)
+ID_RE = re.compile(r"<id>[^<]*</id>")
+FEED_HEAD = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+             '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:arxiv="http://arxiv.org/schemas/atom" '
+             'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">')
+
+def arxiv_id(query, i):
+    # Deterministic, query-specific ids: 2301.00000v1 style
+    h = zlib.crc32(query.encode())
+    return f"{21 + h % 4}{1 + h // 4 % 12:02d}.{(h // 48 % 90 * 1000 + i) % 100000:05d}v1"
+
+def load_recorded(path):
+    with open(path, encoding="utf-8") as f:
+        entries = ENTRY_RE.findall(f.read())
+    if not entries:
+        raise ValueError(f"{path} has no Atom <entry> elements")
+    return entries
+
+def synthetic_entry(aid, seed):
+    authors = "".join(f"<author><name>{escape(a)}</name></author>" for a in seed.get("authors", []))
+    year = str(seed.get("year") or "2023")[:4]
+    return (
+        f"<entry><id>http://arxiv.org/abs/{aid}</id>"
+        f"<updated>{year}-01-15T00:00:00Z</updated><published>{year}-01-15T00:00:00Z</published>"
+        f"<title>{escape(seed.get('title', ''))}</title>"
+        f"<summary>{escape(seed.get('abstract', ''))}</summary>{authors}"
+        f'<link href="http://arxiv.org/abs/{aid}" rel="alternate" type="text/html"/>'
+        f'<link title="pdf" href="http://arxiv.org/pdf/{aid}" rel="related" type="application/pdf"/>'
+        f'<arxiv:primary_category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>'
+        f'<category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>'
+        f'<category term="stat.ML" scheme="http://arxiv.org/schemas/atom"/></entry>'
+    )
+
+def feed_xml(query, start, count, hits, seeds, recorded=None):
+    entries = []
+    for i in range(start, min(start + count, hits)):
+        aid = arxiv_id(query, i)
+        if recorded:
+            entries.append(ID_RE.sub(f"<id>http://arxiv.org/abs/{aid}</id>", recorded[i % len(recorded)], count=1))
+        else:
+            entries.append(synthetic_entry(aid, seeds[i % len(seeds)]))
+    return (f"{FEED_HEAD}<title>arXiv Query: {escape(query)}</title>"
+            f"<opensearch:totalResults>{hits}</opensearch:totalResults>"
+            f"<opensearch:startIndex>{start}</opensearch:startIndex>"
+            f"<opensearch:itemsPerPage>{count}</opensearch:itemsPerPage>"
+            f"{''.join(entries)}</feed>").encode("utf-8")
+
+def make_handler(latency, hits, seeds, recorded):
+    class Handler(BaseHTTPRequestHandler):
+        calls = 0
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            type(self).calls += 1
+            time.sleep(latency)
+
+            if not url.path.endswith("/api/query"):
+                return self._send(404, b"not found", "text/plain")
+            start = int(params.get("start", 0))
+            count = int(params.get("max_results", 10))
+            data = feed_xml(params.get("search_query", ""), start, count, hits, seeds, recorded)
+            self._send(200, data, "application/atom+xml; charset=utf-8")
+
+        def _send(self, status, data, content_type):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def start_fake_arxiv(latency=0.2, hits=1000, port=0, seed_path=SEED_PATH, recorded_path=None):
+    """Serve in a background thread; returns (server, api_url) for ARXIV_API_URL."""
+    recorded = load_recorded(recorded_path) if recorded_path else None
+    handler = make_handler(latency, hits, load_seeds(seed_path), recorded)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/query"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8400)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per response")
+    parser.add_argument("--hits", type=int, default=1000, help="Result count for every query")
+    parser.add_argument("--recorded", default=None, help="Recorded Atom feed to replay entries from")
+    args = parser.parse_args()
+
+    server, base = start_fake_arxiv(args.latency, args.hits, args.port, recorded_path=args.recorded)
+    print(f"📜 Fake arXiv API on {base}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,179 @@
+# benchmarks/fake_eutils.py
+#
+# Stand-in for NCBI E-utilities (esearch/esummary/efetch, incl. the history
+# server). Articles are synthesized from data/raw seeds, or replayed from a
+# recorded efetch response (benchmarks/record_fixtures.py): its
+# PubmedArticle elements are served verbatim, with the PMID rewritten.
+#
+#   python -m benchmarks.fake_eutils --port 8200 --latency 0.3
+#   python -m benchmarks.fake_eutils --recorded benchmarks/fixtures/efetch.xml
+#   NCBI_BASE_URL=http://127.0.0.1:8200 NCBI_RATE_LIMIT=1000 uvicorn api.main:app
+
+import argparse
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+from ingestion.pubmed_xml import iter_pubmed_articles
+
+SEED_PATH = "data/raw/pubmed_machine_learning.json"
+PMID_BASE = 30000000
+ARTICLE_RE = re.compile(rb"<PubmedArticle>.*?</PubmedArticle>", re.S)
+# The first of each is the article's own id; later ones are references
+PMID_RE = re.compile(r"(<PMID[^>]*>)\d+(</PMID>)")
+ARTICLE_ID_RE = re.compile(r"(<ArticleId IdType=\"pubmed\">)\d+(</ArticleId>)")
+
+def load_seeds(path=SEED_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+def load_recorded(path):
+    """(seeds, fragments) from a recorded efetch XML response."""
+    with open(path, "rb") as f:
+        fragments = ARTICLE_RE.findall(f.read())
+    if not fragments:
+        raise ValueError(f"{path} has no PubmedArticle elements")
+    seeds = []
+    for fragment in fragments:
+        record = next(iter_pubmed_articles([b"<PubmedArticleSet>" + fragment + b"</PubmedArticleSet>"]))
+        seeds.append({"title": record["title"], "journal": record["journal"], "year": record["pubdate"][:4],
+                      "authors": record["authors"], "abstract": record["abstract"]})
+    return seeds, [f.decode("utf-8") for f in fragments]
+
+def recorded_xml(pmid, fragment):
+    fragment = PMID_RE.sub(rf"\g<1>{pmid}\g<2>", fragment, count=1)
+    return ARTICLE_ID_RE.sub(rf"\g<1>{pmid}\g<2>", fragment, count=1)
+
+def article_xml(pmid, seed):
+    authors = "".join(
+        f"<Author><LastName>{escape(a.split()[-1])}</LastName><Initials>{escape(a[0])}</Initials></Author>"
+        for a in seed.get("authors", [])
+    )
+    return (
+        f"<PubmedArticle><MedlineCitation><PMID Version=\"1\">{pmid}</PMID><Article>"
+        f"<Journal><JournalIssue><PubDate><Year>{seed.get('year', '')}</Year></PubDate></JournalIssue>"
+        f"<Title>{escape(seed.get('journal', ''))}</Title></Journal>"
+        f"<ArticleTitle>{escape(seed.get('title', ''))}</ArticleTitle>"
+        f"<Abstract><AbstractText>{escape(seed.get('abstract', ''))}</AbstractText></Abstract>"
+        f"<AuthorList>{authors}</AuthorList></Article></MedlineCitation>"
+        f"<PubmedData><ArticleIdList><ArticleId IdType=\"pubmed\">{pmid}</ArticleId></ArticleIdList></PubmedData>"
+        f"</PubmedArticle>"
+    )
+
+def efetch_xml(pmids, seeds, recorded=None):
+    if recorded:
+        body = "".join(recorded_xml(pid, recorded[int(pid) % len(recorded)]) for pid in pmids)
+    else:
+        body = "".join(article_xml(pid, seeds[int(pid) % len(seeds)]) for pid in pmids)
+    return f"<?xml version=\"1.0\" ?><PubmedArticleSet>{body}</PubmedArticleSet>".encode()
+
+def esummary_json(pmids, seeds):
+    # retmode=json, version 2.0 shape
+    result = {"uids": list(pmids)}
+    for pid in pmids:
+        seed = seeds[int(pid) % len(seeds)]
+        result[pid] = {
+            "uid": pid,
+            "pubdate": str(seed.get("year", "")),
+            "source": seed.get("journal", ""),
+            "fulljournalname": seed.get("journal", ""),
+            "title": seed.get("title", ""),
+            "authors": [{"name": a, "authtype": "Author"} for a in seed.get("authors", [])],
+            "articleids": [{"idtype": "pubmed", "value": pid}],
+        }
+    return json.dumps({"header": {"type": "esummary", "version": "0.3"}, "result": result}).encode()
+
+def query_pmids(term, count):
+    # Deterministic, query-specific result set
+    offset = zlib.crc32(term.encode()) % 1000000 * 1000
+    return [str(PMID_BASE + offset + i) for i in range(count)]
+
+def make_handler(latency, hits, seeds, recorded=None):
+    class Handler(BaseHTTPRequestHandler):
+        calls = {}
+
+        def _params(self):
+            params = parse_qs(urlparse(self.path).query)
+            if self.command == "POST":
+                length = int(self.headers.get("Content-Length", 0))
+                params.update(parse_qs(self.rfile.read(length).decode()))
+            return {k: v[0] for k, v in params.items()}
+
+        def do_GET(self):
+            self._handle()
+
+        def do_POST(self):
+            self._handle()
+
+        def _handle(self):
+            path = urlparse(self.path).path.rsplit("/", 1)[-1]
+            params = self._params()
+            type(self).calls[path] = type(self).calls.get(path, 0) + 1
+            time.sleep(latency)
+
+            if path == "esearch.fcgi":
+                term = params.get("term", "")
+                retstart = int(params.get("retstart", 0))
+                retmax = int(params.get("retmax", 20))
+                ids = query_pmids(term, hits)
+                result = {"count": str(hits), "retstart": str(retstart), "retmax": str(retmax),
+                          "idlist": ids[retstart:retstart + retmax]}
+                if params.get("usehistory") == "y":
+                    result.update(webenv=f"FAKE_{term}", querykey="1")
+                return self._send(200, json.dumps({"esearchresult": result}).encode(), "application/json")
+
+            if path in ("efetch.fcgi", "esummary.fcgi"):
+                if "WebEnv" in params:
+                    retstart = int(params.get("retstart", 0))
+                    retmax = int(params.get("retmax", 20))
+                    ids = query_pmids(params["WebEnv"][len("FAKE_"):], hits)[retstart:retstart + retmax]
+                else:
+                    ids = [i for i in params.get("id", "").split(",") if i]
+                if path == "esummary.fcgi":
+                    return self._send(200, esummary_json(ids, seeds), "application/json")
+                return self._send(200, efetch_xml(ids, seeds, recorded), "text/xml")
+
+            self._send(404, b"not found", "text/plain")
+
+        def _send(self, status, data, content_type):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def start_fake_eutils(latency=0.2, hits=1000, port=0, seed_path=SEED_PATH, recorded_path=None):
+    """Serve in a background thread; returns (server, base_url)."""
+    if recorded_path:
+        seeds, recorded = load_recorded(recorded_path)
+    else:
+        seeds, recorded = load_seeds(seed_path), None
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, hits, seeds, recorded))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per response")
+    parser.add_argument("--hits", type=int, default=1000, help="Result count for every query")
+    parser.add_argument("--recorded", default=None, help="Recorded efetch XML to replay articles from")
+    args = parser.parse_args()
+
+    server, base = start_fake_eutils(args.latency, args.hits, args.port, recorded_path=args.recorded)
+    print(f"🧪 Fake E-utilities on {base}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,80 @@
+# benchmarks/fake_openai.py
+#
+# Minimal OpenAI-compatible chat completions server for offline runs.
+#
+#   python -m benchmarks.fake_openai --port 8100 --latency 0.5 --fail_rate 0.1
+#   OPENAI_API_BASE=http://127.0.0.1:8100/v1 OPENAI_API_KEY=fake python -m summarization.summarizer
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def make_handler(latency, fail_rate, reply):
+    class Handler(BaseHTTPRequestHandler):
+        calls = 0
+        failures = 0
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            type(self).calls += 1
+            time.sleep(latency)
+
+            if not self.path.endswith("/chat/completions"):
+                return self._send(404, {"error": {"message": "not found"}})
+            if random.random() < fail_rate:
+                type(self).failures += 1
+                status = random.choice([429, 500, 503])
+                return self._send(status, {"error": {"message": f"fake {status}", "type": "server_error"}},
+                                  {"Retry-After": "0.1"} if status == 429 else None)
+
+            prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+            content = reply(body) if reply else f"- fake summary of {prompt_chars} prompt chars"
+            self._send(200, {
+                "id": f"chatcmpl-fake-{type(self).calls}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(content) // 4,
+                          "total_tokens": (prompt_chars + len(content)) // 4},
+            })
+
+        def _send(self, status, payload, headers=None):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def start_fake_openai(latency=0.2, fail_rate=0.0, port=0, reply=None):
+    """Serve in a background thread; returns (server, api_base)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, fail_rate, reply))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per response")
+    parser.add_argument("--fail_rate", type=float, default=0.0, help="Fraction of 429/5xx responses")
+    args = parser.parse_args()
+
+    server, base = start_fake_openai(args.latency, args.fail_rate, args.port)
+    print(f"🤖 Fake OpenAI API on {base}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
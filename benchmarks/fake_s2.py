@@ -0,0 +1,161 @@
+# benchmarks/fake_s2.py
+#
+# Stand-in for the Semantic Scholar Graph API (paper/batch and paper/search).
+# Papers come from a recorded-response file when given (a JSON list of
+# paper objects as the real API returned them, matched on their
+# externalIds; other ids get one of them replayed under their own id),
+# otherwise they are synthesized from data/raw seeds. It can
+# also play the rate limiter: every `throttle_every`-th request gets a 429
+# with Retry-After.
+#
+#   python -m benchmarks.fake_s2 --port 8300 --throttle_every 5
+#   S2_API_URL=http://127.0.0.1:8300/graph/v1 S2_RATE_LIMIT=100 python -m ingestion.semantic_enrich --stored
+
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fake_eutils import SEED_PATH, load_seeds
+
+MAX_BATCH = 500
+MISS_RATE = 10  # percent of ids the fake has never heard of
+# Lookup prefix <-> externalIds key
+EXTERNAL_KINDS = {"PMID": "PubMed", "DOI": "DOI", "ARXIV": "ArXiv"}
+LOOKUP_KINDS = {v.upper(): k for k, v in EXTERNAL_KINDS.items()}
+
+def load_recorded(path):
+    # {"PMID:123": paper, "DOI:10.1/x": paper, ...} and the papers themselves
+    with open(path) as f:
+        papers = [p for p in json.load(f) if p]
+    recorded = {}
+    for paper in papers:
+        for kind, value in (paper.get("externalIds") or {}).items():
+            recorded[f"{LOOKUP_KINDS.get(kind.upper(), kind.upper())}:{value}"] = paper
+    return recorded, papers
+
+def replayed_paper(lookup, papers):
+    h = zlib.crc32(lookup.encode())
+    if h % 100 < MISS_RATE:
+        return None
+    kind, _, value = lookup.partition(":")
+    return dict(papers[h % len(papers)], paperId=f"{h:040x}",
+                externalIds={EXTERNAL_KINDS.get(kind.upper(), kind): value})
+
+def synthetic_paper(lookup, seeds):
+    h = zlib.crc32(lookup.encode())
+    if h % 100 < MISS_RATE:
+        return None
+    seed = seeds[h % len(seeds)]
+    kind, _, value = lookup.partition(":")
+    external = EXTERNAL_KINDS.get(kind.upper(), kind)
+    open_access = h % 3 == 0
+    return {
+        "paperId": f"{h:040x}",
+        "externalIds": {external: value},
+        "title": seed.get("title"),
+        "abstract": seed.get("abstract"),
+        "authors": [{"authorId": str(i), "name": a} for i, a in enumerate(seed.get("authors", []))],
+        "year": int(seed["year"]) if str(seed.get("year", "")).isdigit() else None,
+        "venue": seed.get("journal", ""),
+        "url": f"https://www.semanticscholar.org/paper/{h:040x}",
+        "citationCount": h % 500,
+        "influentialCitationCount": h % 40,
+        "isOpenAccess": open_access,
+        "openAccessPdf": {"url": f"https://example.org/{h}.pdf", "status": "GREEN"} if open_access else None,
+        "fieldsOfStudy": ["Medicine", "Computer Science"][: 1 + h % 2],
+    }
+
+def make_handler(latency, throttle_every, seeds, recorded):
+    lock = threading.Lock()
+    by_id, papers = recorded or ({}, [])
+
+    def paper_for(lookup):
+        if lookup in by_id:
+            return by_id[lookup]
+        return replayed_paper(lookup, papers) if papers else synthetic_paper(lookup, seeds)
+
+    class Handler(BaseHTTPRequestHandler):
+        calls = 0
+        throttled = 0
+        ids_served = 0
+
+        def do_GET(self):
+            self._handle()
+
+        def do_POST(self):
+            self._handle()
+
+        def _handle(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            body = {}
+            if self.command == "POST":
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with lock:
+                type(self).calls += 1
+                throttle = throttle_every and type(self).calls % throttle_every == 0
+            time.sleep(latency)
+
+            if throttle:
+                type(self).throttled += 1
+                return self._send(429, {"message": "Too Many Requests"}, {"Retry-After": "1"})
+
+            if url.path.endswith("/paper/batch") and self.command == "POST":
+                ids = body.get("ids", [])
+                if len(ids) > MAX_BATCH:
+                    return self._send(400, {"error": f"ids must be at most {MAX_BATCH}"})
+                type(self).ids_served += len(ids)
+                return self._send(200, [paper_for(i) for i in ids])
+
+            if url.path.endswith("/paper/search"):
+                offset = int(params.get("offset", 0))
+                limit = int(params.get("limit", 10))
+                total = len(seeds)
+                data = [paper_for(f"SEARCH:{params.get('query', '')}:{i}")
+                        for i in range(offset, min(offset + limit, total))]
+                return self._send(200, {"total": total, "offset": offset, "data": [p for p in data if p]})
+
+            self._send(404, {"error": "not found"})
+
+        def _send(self, status, payload, headers=None):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def start_fake_s2(latency=0.1, throttle_every=0, port=0, seed_path=SEED_PATH, recorded_path=None):
+    """Serve in a background thread; returns (server, api_url) for S2_API_URL."""
+    recorded = load_recorded(recorded_path) if recorded_path else None
+    handler = make_handler(latency, throttle_every, load_seeds(seed_path), recorded)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/graph/v1"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8300)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per response")
+    parser.add_argument("--throttle_every", type=int, default=0, help="Answer every Nth request with a 429")
+    parser.add_argument("--recorded", default=None, help="JSON list of recorded S2 paper objects to serve")
+    args = parser.parse_args()
+
+    server, base = start_fake_s2(args.latency, args.throttle_every, args.port, recorded_path=args.recorded)
+    print(f"📚 Fake Semantic Scholar API on {base}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
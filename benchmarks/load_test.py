@@ -0,0 +1,102 @@
+# benchmarks/load_test.py
+#
+# p50/p99 latency of 50 concurrent /api/search calls against the fake
+# E-utilities server, for the blocking request path ("before": sync
+# requests inside async def, as api/main.py used to do) and the async one.
+#
+#   python -m benchmarks.load_test --concurrency 50 --latency 0.3
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.fake_eutils import start_fake_eutils
+
+# === "Before": the old request path, blocking calls on the event loop ===
+blocking_app = FastAPI()
+
+@blocking_app.post("/api/search")
+async def blocking_search(request: dict):
+    from ingestion.pubmed_ingestor import search_pubmed, fetch_details, mentions_statistics
+
+    ids = search_pubmed(request["query"], request.get("max_results", 20))
+    articles = fetch_details(ids) if ids else []
+    return [a for a in articles if mentions_statistics(a.get("abstract", ""))]
+
+# === Harness ===
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def start_api(app_path, port, env):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/openapi.json", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{app_path} did not start")
+
+async def load(base_url, concurrency, max_results):
+    async with httpx.AsyncClient(timeout=300) as client:
+        probe_latencies = []
+        stop = asyncio.Event()
+
+        async def probe():
+            # A cheap request issued during the load: shows loop stalls
+            while not stop.is_set():
+                start = time.perf_counter()
+                await client.get(f"{base_url}/openapi.json")
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        async def one(i):
+            start = time.perf_counter()
+            response = await client.post(f"{base_url}/api/search",
+                                         json={"query": f"load test query {i}", "max_results": max_results})
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        probe_task = asyncio.create_task(probe())
+        latencies = await asyncio.gather(*(one(i) for i in range(concurrency)))
+        stop.set()
+        await probe_task
+    return latencies, probe_latencies
+
+def run(concurrency, latency, max_results, port):
+    server, eutils = start_fake_eutils(latency, hits=max_results)
+    for label, app_path in (("before (blocking)", "benchmarks.load_test:blocking_app"), ("after (async)", "api.main:app")):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, NCBI_BASE_URL=eutils, NCBI_RATE_LIMIT="1000",
+                       ARTICLE_DB_PATH=os.path.join(tmp, "articles.db"))
+            proc = start_api(app_path, port, env)
+            try:
+                latencies, probes = asyncio.run(load(f"http://127.0.0.1:{port}", concurrency, max_results))
+            finally:
+                proc.terminate()
+                proc.wait()
+        print(f"{label:18s} search p50 {percentile(latencies, 50):6.2f}s  p99 {percentile(latencies, 99):6.2f}s  "
+              f"| probe p50 {percentile(probes, 50) * 1000:7.1f}ms  p99 {percentile(probes, 99) * 1000:7.1f}ms")
+    server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent searches")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake E-utilities latency (s)")
+    parser.add_argument("--max_results", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    run(args.concurrency, args.latency, args.max_results, args.port)
@@ -0,0 +1,58 @@
+# benchmarks/record_fixtures.py
+#
+# Records real upstream responses once, for the stand-in servers to replay
+# (--recorded on fake_eutils / fake_arxiv / fake_s2, and bench_e2e picks up
+# benchmarks/fixtures/ automatically):
+#
+#   fixtures/efetch.xml     PubMed efetch response for the query's top hits
+#   fixtures/arxiv.xml      one arXiv Atom page for the query
+#   fixtures/s2_papers.json Semantic Scholar batch papers for those PMIDs
+#
+# Needs network access (and respects NCBI_API_KEY / S2_API_KEY).
+#
+#   python -m benchmarks.record_fixtures --query "machine learning sepsis" --n 200
+
+import argparse
+import json
+import os
+
+from ingestion.arxiv_ingestor import ARXIV_API_URL, arxiv_params, get_session as arxiv_session
+from ingestion.pubmed_ingestor import ncbi_request
+from ingestion.semantic_enrich import fetch_paper_batch
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def record_pubmed(query, n, out_dir):
+    ids = ncbi_request("esearch.fcgi", {"db": "pubmed", "term": query, "retmax": n,
+                                        "retmode": "json"}).json()["esearchresult"]["idlist"]
+    response = ncbi_request("efetch.fcgi", {"db": "pubmed", "id": ",".join(ids), "retmode": "xml"}, method="POST")
+    with open(os.path.join(out_dir, "efetch.xml"), "wb") as f:
+        f.write(response.content)
+    return ids
+
+def record_arxiv(query, n, out_dir):
+    response = arxiv_session().get(ARXIV_API_URL, params=arxiv_params(query, n))
+    response.raise_for_status()
+    with open(os.path.join(out_dir, "arxiv.xml"), "wb") as f:
+        f.write(response.content)
+
+def record_s2(pmids, out_dir):
+    papers = fetch_paper_batch([f"PMID:{p}" for p in pmids[:500]])
+    with open(os.path.join(out_dir, "s2_papers.json"), "w") as f:
+        json.dump([p for p in papers if p], f)
+    return sum(1 for p in papers if p)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record upstream responses for the offline benchmarks")
+    parser.add_argument("--query", default="machine learning AND sepsis")
+    parser.add_argument("--n", type=int, default=200, help="Articles per source")
+    parser.add_argument("--out", default=FIXTURE_DIR)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    pmids = record_pubmed(args.query, args.n, args.out)
+    print(f"✅ PubMed: {len(pmids)} articles")
+    record_arxiv(args.query, args.n, args.out)
+    print("✅ arXiv: 1 page")
+    print(f"✅ Semantic Scholar: {record_s2(pmids, args.out)} papers")
+    print(f"💾 Fixtures in {args.out}")
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import {
   ChakraProvider,
   Box,
@@ -28,7 +28,24 @@ import {
   AccordionPanel,
   AccordionIcon,
 } from '@chakra-ui/react';
-import axios from 'axios';
+
+const API_BASE = 'http://localhost:8000';
+
+// Read an NDJSON stream line by line, calling onEvent for each JSON object
+async function readNdjson(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)));
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
 
 function App() {
   const [query, setQuery] = useState('');
@@ -36,6 +53,8 @@ function App() {
   const [filterStats, setFilterStats] = useState(true);
   const [articles, setArticles] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [progress, setProgress] = useState(null);
+  const abortRef = useRef(null);
 
   const toast = useToast();
 
@@ -49,16 +68,50 @@ function App() {
       return;
     }
 
+    // A new search cancels the one in flight (the server stops fetching)
+    if (abortRef.current) abortRef.current.abort();
+    const controller = new AbortController();
+    abortRef.current = controller;
+
     setLoading(true);
+    setArticles([]);
+    setProgress(null);
+    let returned = 0;
     try {
-      const response = await axios.post('http://localhost:8000/api/search', {
-        query,
-        max_results: maxResults,
-        filter_stats: filterStats,
+      const response = await fetch(`${API_BASE}/api/search/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          query,
+          max_results: maxResults,
+          filter_stats: filterStats,
+        }),
+        signal: controller.signal,
+      });
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+      let finished = false;
+      await readNdjson(response, (event) => {
+        if (event.type === 'article') {
+          returned += 1;
+          setArticles((prev) => [...prev, event.article]);
+        } else if (event.type === 'progress') {
+          setProgress(event);
+        } else if (event.type === 'error') {
+          toast({
+            title: event.stage === 'search' ? 'Search failed' : `${event.pmids.length} articles could not be fetched`,
+            description: event.error,
+            status: 'error',
+            duration: 5000,
+          });
+        } else if (event.type === 'done') {
+          finished = true;
+        }
       });
-      setArticles(response.data);
-      
-      if (response.data.length === 0) {
+      // The server always ends with "done"; without it the stream was cut off
+      if (!finished) throw new Error('The result stream ended early');
+
+      if (returned === 0) {
         toast({
           title: 'No results found',
           status: 'info',
@@ -66,14 +119,23 @@ function App() {
         });
       }
     } catch (error) {
-      toast({
-        title: 'Error fetching results',
-        description: error.message,
-        status: 'error',
-        duration: 5000,
-      });
+      if (error.name !== 'AbortError') {
+        toast({
+          title: 'Error fetching results',
+          description: error.message,
+          status: 'error',
+          duration: 5000,
+        });
+      }
+    }
+    if (abortRef.current === controller) {
+      abortRef.current = null;
+      setLoading(false);
     }
-    setLoading(false);
+  };
+
+  const handleCancel = () => {
+    if (abortRef.current) abortRef.current.abort();
   };
 
   return (
@@ -133,53 +195,65 @@ function App() {
                   >
                     Search
                   </Button>
+                  {loading && (
+                    <Button variant="outline" onClick={handleCancel} size="sm">
+                      Cancel
+                    </Button>
+                  )}
                 </VStack>
               </CardBody>
             </Card>
 
-            {loading ? (
-              <Spinner size="xl" />
-            ) : (
-              <VStack spacing={4} width="100%">
-                {articles.map((article) => (
-                  <Card key={article.pubmed_id} width="100%">
-                    <CardBody>
-                      <Accordion allowToggle>
-                        <AccordionItem>
-                          <AccordionButton>
-                            <Box flex="1" textAlign="left">
-                              <Text fontWeight="bold" fontSize="lg">
-                                {article.title}
-                              </Text>
-                              <Text fontSize="sm" color="gray.600">
-                                {article.authors.join(', ')} • {article.journal} • {article.year}
-                              </Text>
+            {loading && (
+              <VStack>
+                <Spinner size="xl" />
+                {progress && (
+                  <Text fontSize="md" color="gray.600">
+                    {progress.total} hits • {progress.batches_done}/{progress.batches_total} batches
+                    fetched • {progress.returned} shown
+                  </Text>
+                )}
+              </VStack>
+            )}
+            <VStack spacing={4} width="100%">
+              {articles.map((article) => (
+                <Card key={article.pmid} width="100%">
+                  <CardBody>
+                    <Accordion allowToggle>
+                      <AccordionItem>
+                        <AccordionButton>
+                          <Box flex="1" textAlign="left">
+                            <Text fontWeight="bold" fontSize="lg">
+                              {article.title}
+                            </Text>
+                            <Text fontSize="sm" color="gray.600">
+                              {article.authors.join(', ')} • {article.journal} • {article.pubdate}
+                            </Text>
+                          </Box>
+                          <AccordionIcon />
+                        </AccordionButton>
+                        
+                        <AccordionPanel>
+                          <VStack align="start" spacing={4}>
+                            <Box>
+                              <Badge colorScheme="blue" mb={2}>Abstract</Badge>
+                              <Text>{article.abstract}</Text>
                             </Box>
-                            <AccordionIcon />
-                          </AccordionButton>
-                          
-                          <AccordionPanel>
-                            <VStack align="start" spacing={4}>
+                            
+                            {article.summary && (
                               <Box>
-                                <Badge colorScheme="blue" mb={2}>Abstract</Badge>
-                                <Text>{article.abstract}</Text>
+                                <Badge colorScheme="green" mb={2}>AI Summary</Badge>
+                                <Text>{article.summary}</Text>
                               </Box>
-                              
-                              {article.summary && (
-                                <Box>
-                                  <Badge colorScheme="green" mb={2}>AI Summary</Badge>
-                                  <Text>{article.summary}</Text>
-                                </Box>
-                              )}
-                            </VStack>
-                          </AccordionPanel>
-                        </AccordionItem>
-                      </Accordion>
-                    </CardBody>
-                  </Card>
-                ))}
-              </VStack>
-            )}
+                            )}
+                          </VStack>
+                        </AccordionPanel>
+                      </AccordionItem>
+                    </Accordion>
+                  </CardBody>
+                </Card>
+              ))}
+            </VStack>
           </VStack>
         </Container>
       </Box>
@@ -1,77 +1,188 @@
 # ingestion/arxiv_ingestor.py
 
 import requests
-import xml.etree.ElementTree as ET
 import argparse
+import asyncio
 import json
 import os
-from urllib.parse import quote
+import re
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from tqdm import tqdm
+from storage.article_store import get_store
+from ingestion.async_http import request as async_request
+from ingestion.arxiv_xml import arxiv_key, iter_arxiv_entries, iter_oai_records
+from utils.checkpoint import load_checkpoint, save_checkpoint
+from utils.rate_limit import RateLimiter, AsyncRateLimiter
+from utils import metrics
 
-# Namespaces for parsing arXiv Atom feed
-NS = {
-    'atom': 'http://www.w3.org/2005/Atom',
-    'arxiv': 'http://arxiv.org/schemas/atom'
-}
+ARXIV_API_URL = os.getenv('ARXIV_API_URL', 'http://export.arxiv.org/api/query')
+ARXIV_OAI_URL = os.getenv('ARXIV_OAI_URL', 'http://export.arxiv.org/oai2')
 
-ARXIV_API_URL = 'http://export.arxiv.org/api/query'
+PAGE_SIZE = int(os.getenv('ARXIV_PAGE_SIZE', '500'))  # entries per request; arXiv allows up to 2000
+MAX_API_RESULTS = 30000   # the query API stops paging here; use OAI-PMH for whole categories
+EMPTY_PAGE_RETRIES = 3    # arXiv now and then returns an empty page mid-result-set
+STREAM_CHUNK = 64 * 1024
+
+# arXiv asks for no more than one request every 3 seconds. The limiter
+# reserves a slot when a request starts, so the time spent parsing and
+# writing one page already counts towards the gap before the next.
+# ARXIV_RATE_LIMIT (requests/s) overrides it for local stand-in servers.
+ARXIV_RATE = float(os.getenv('ARXIV_RATE_LIMIT', str(1 / 3)))
+limiter = RateLimiter(ARXIV_RATE)
+async_limiter = AsyncRateLimiter(limiter)  # same budget as the sync path
+
+BOOLEAN_RE = re.compile(r'\b(AND|OR|ANDNOT)\b|[:"()]')
+
+_session = None
+
+# === 0. Shared HTTP session ===
+def get_session():
+    global _session
+    if _session is None:
+        # urllib3 honours Retry-After, which arXiv sends with its 503s
+        retry = Retry(total=5, backoff_factor=3, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['User-Agent'] = 'LiteratureReviewApp/1.0'
+        _session = session
+    return _session
 
 # === 1. Search arXiv and fetch entries ===
-def search_arxiv(query, max_results=100, categories=None):
-    # Build the search_query parameter
+def arxiv_search_query(query, categories=None):
+    # Plain text: requests URL-encodes it once. Plain words are ANDed;
+    # queries that already use arXiv syntax are passed through as-is.
     terms = []
-    # all:{query}
-    terms.append(f'all:{quote(query)}')
-    # Optional category filters, e.g. cs.LG, q-bio.BM
+    if query and BOOLEAN_RE.search(query):
+        terms.append(f'({query})')
+    elif query:
+        terms.append(' AND '.join(f'all:{word}' for word in query.split()))
+    # Optional category filters, e.g. cs.LG, q-bio.BM (any of them)
     if categories:
-        for cat in categories:
-            terms.append(f'cat:{cat}')
-    search_query = '+AND+'.join(terms)
+        terms.append('(' + ' OR '.join(f'cat:{cat}' for cat in categories) + ')')
+    return ' AND '.join(terms)
 
-    params = {
-        'search_query': search_query,
-        'start': 0,
+def arxiv_params(query, max_results=100, categories=None, start=0):
+    return {
+        'search_query': arxiv_search_query(query, categories),
+        'start': start,
         'max_results': max_results
     }
-    response = requests.get(ARXIV_API_URL, params=params)
+
+def fetch_arxiv_page(query, start, page_size, categories=None, feed=None):
+    # Entries are parsed while the page is still downloading
+    limiter.wait()
+    response = get_session().get(ARXIV_API_URL, params=arxiv_params(query, page_size, categories, start),
+                                 stream=True)
+    metrics.record_response('arxiv', response, stream=True)
     response.raise_for_status()
-    return response.text
+    with response:
+        entries = list(iter_arxiv_entries(response.iter_content(STREAM_CHUNK), feed))
+    metrics.record_bytes('arxiv', response)
+    return entries
+
+def iter_arxiv_pages(query, categories=None, start=0, max_results=None, page_size=PAGE_SIZE):
+    """Yield (next_start, total, entries) for each page from `start` on."""
+    total = None
+    while True:
+        limit = min(n for n in (total, max_results, MAX_API_RESULTS) if n is not None)
+        if start >= limit:
+            return
+        for _ in range(EMPTY_PAGE_RETRIES + 1):
+            feed = {}
+            entries = fetch_arxiv_page(query, start, min(page_size, limit - start), categories, feed)
+            if entries or feed.get('total_results', 0) <= start:
+                break
+        total = feed.get('total_results', 0)
+        if not entries:
+            return
+        start += len(entries)
+        yield start, total, entries
+
+def search_arxiv(query, max_results=100, categories=None):
+    return [e for _, _, entries in iter_arxiv_pages(query, categories, max_results=max_results) for e in entries]
+
+@metrics.timed('search_arxiv')
+async def async_search_arxiv(query, max_results=100, categories=None, page_size=PAGE_SIZE):
+    # Same paging as iter_arxiv_pages; the async limiter waits without
+    # holding up the event loop
+    entries = []
+    total = None
+    while len(entries) < min(n for n in (total, max_results, MAX_API_RESULTS) if n is not None):
+        feed = {}
+        size = min(page_size, max_results - len(entries))
+        response = await async_request('GET', ARXIV_API_URL, limiter=async_limiter, source='arxiv',
+                                       params=arxiv_params(query, size, categories, len(entries)))
+        page = await asyncio.to_thread(lambda: list(iter_arxiv_entries([response.content], feed)))
+        total = feed.get('total_results', 0)
+        if not page:
+            break
+        entries.extend(page)
+    return entries[:max_results]
+
+async def async_fetch_arxiv_results(query, max_results=100, categories=None):
+    entries = await async_search_arxiv(query, max_results, categories)
+    await asyncio.to_thread(get_store().put_many, 'arxiv', entries, 'id')
+    return entries
 
 # === 2. Parse Atom XML into Python objects ===
 def parse_arxiv_feed(xml_text):
-    root = ET.fromstring(xml_text)
-    entries = []
-    for entry in root.findall('atom:entry', NS):
-        arxiv_id = entry.find('atom:id', NS).text
-        title = entry.find('atom:title', NS).text.strip()
-        summary = entry.find('atom:summary', NS).text.strip()
-        published = entry.find('atom:published', NS).text
-        # Authors
-        authors = []
-        for author in entry.findall('atom:author', NS):
-            name = author.find('atom:name', NS).text
-            authors.append(name)
-        # Primary category
-        primary = entry.find('arxiv:primary_category', NS).attrib.get('term')
-        # All categories
-        cats = [c.attrib.get('term') for c in entry.findall('atom:category', NS)]
-        # PDF link
-        pdf_url = ''
-        for link in entry.findall('atom:link', NS):
-            if link.attrib.get('title') == 'pdf':
-                pdf_url = link.attrib.get('href')
-                break
-        entries.append({
-            'id': arxiv_id,
-            'title': title,
-            'summary': summary,
-            'published': published,
-            'authors': authors,
-            'primary_category': primary,
-            'categories': cats,
-            'pdf_url': pdf_url
-        })
+    # Pure: callers store batches with put_many
+    return list(iter_arxiv_entries(xml_text))
+
+# === 2b. Search + parse, served from the article store when possible ===
+@metrics.timed('search_arxiv')
+def fetch_arxiv_results(query, max_results=100, categories=None, use_cache=True):
+    # The Atom feed carries full entries, so a cached id list for this exact
+    # query lets us skip arXiv entirely when every entry is still fresh
+    store = get_store() if use_cache else None
+    cache_key = f"{query}|{','.join(categories or [])}"
+    if store:
+        ids = store.get_search('arxiv', cache_key, max_results)
+        if ids is not None:
+            cached = store.get_fresh('arxiv', ids)
+            if len(cached) == len(ids):
+                return [cached[i] for i in ids]
+
+    entries = search_arxiv(query, max_results, categories)
+    if store:
+        store.put_many('arxiv', entries, 'id')
+        store.put_search('arxiv', cache_key, [e['id'] for e in entries],
+                         exhausted=len(entries) < max_results)
     return entries
 
+# === 2c. OAI-PMH: whole categories, no 30k cap ===
+def iter_oai_pages(set_spec, from_date=None, until=None, token=None):
+    """Yield (resumption_token, complete_list_size, records, deleted_ids) per page.
+
+    `set_spec` is an arXiv OAI set such as "cs" or "physics:hep-th"; pass the
+    token from a checkpoint to continue an interrupted harvest.
+    """
+    while True:
+        if token:
+            params = {'verb': 'ListRecords', 'resumptionToken': token}
+        else:
+            params = {'verb': 'ListRecords', 'metadataPrefix': 'arXiv', 'set': set_spec}
+            if from_date:
+                params['from'] = from_date
+            if until:
+                params['until'] = until
+        limiter.wait()
+        response = get_session().get(ARXIV_OAI_URL, params=params, stream=True)
+        metrics.record_response('arxiv', response, stream=True)
+        response.raise_for_status()
+        state = {}
+        with response:
+            records = list(iter_oai_records(response.iter_content(STREAM_CHUNK), state))
+        metrics.record_bytes('arxiv', response)
+        token = state['token']
+        deleted = [arxiv_key(i) for i in state.get('deleted', [])]
+        yield token, state.get('complete_list_size'), records, deleted
+        if not token:
+            return
+
 # === 3. Save results to JSON ===
 def save_results(query, entries):
     os.makedirs('data/raw', exist_ok=True)
@@ -81,21 +192,111 @@ def save_results(query, entries):
         json.dump(entries, f, indent=2)
     print(f"✅ Saved {len(entries)} entries to {path}")
 
+# === 3b. Resumable bulk harvest to JSONL ===
+def normalize_stored_ids(store):
+    # Stores from before arxiv_key hold API entries under versioned ids,
+    # which OAI deletions and later versions would never match
+    rows = store.conn.execute(
+        "SELECT source_id FROM articles WHERE source = 'arxiv' AND source_id GLOB '*v[0-9]*'"
+    )
+    renames = {sid: arxiv_key(sid) for sid, in rows if arxiv_key(sid) != sid}
+    if renames:
+        store.rekey('arxiv', renames, 'id')
+        print(f"🔑 Moved {len(renames)} arXiv records to unversioned ids")
+    return len(renames)
+
+def harvest(out_path, key, pages):
+    """Stream pages to JSONL, checkpointing after every page.
+
+    `pages(resume)` yields (resume, total, records, deleted); `resume` is
+    what the source needs to carry on (API start offset or OAI token), and
+    None once there is nothing left.
+    """
+    checkpoint_path = out_path + '.checkpoint'
+    store = get_store()
+    normalize_stored_ids(store)
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+
+    checkpoint = load_checkpoint(checkpoint_path, key)
+    if checkpoint:
+        print(f"↩️  Resuming after {checkpoint['written']} entries")
+    else:
+        checkpoint = {'query': key, 'resume': None, 'total': None, 'offset': 0, 'written': 0}
+
+    with open(out_path, 'a+b') as out:
+        # Drop anything written after the last checkpoint (e.g. a crash mid-page)
+        out.truncate(checkpoint['offset'])
+        out.seek(checkpoint['offset'])
+
+        progress = tqdm(total=checkpoint['total'], initial=checkpoint['written'], desc='Harvesting arXiv')
+        for resume, total, records, deleted in pages(checkpoint['resume']):
+            store.put_many('arxiv', records, 'id')
+            if deleted:
+                store.delete_many('arxiv', deleted)
+            for record in records:
+                out.write((json.dumps(record) + '\n').encode('utf-8'))
+            out.flush()
+            os.fsync(out.fileno())
+
+            progress.total = total
+            progress.update(len(records))
+            checkpoint.update(resume=resume, total=total, offset=out.tell(),
+                              written=checkpoint['written'] + len(records))
+            save_checkpoint(checkpoint_path, checkpoint)
+            if resume is None:
+                break
+        progress.close()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"✅ Done. {checkpoint['written']} entries streamed to {out_path}")
+
+def run_harvest(query, categories, out_path, max_results=None):
+    def pages(start):
+        for next_start, total, entries in iter_arxiv_pages(query, categories, start or 0, max_results):
+            yield next_start, min(total, MAX_API_RESULTS, max_results or total), entries, []
+
+    if max_results is None or max_results > MAX_API_RESULTS:
+        print(f"⚠️  The arXiv API stops at {MAX_API_RESULTS} results; use --oai for whole categories")
+    harvest(out_path, arxiv_search_query(query, categories), pages)
+
+def run_oai_harvest(set_spec, out_path, from_date=None, until=None):
+    def pages(token):
+        return iter_oai_pages(set_spec, from_date, until, token)
+
+    harvest(out_path, f"oai:{set_spec}:{from_date or ''}:{until or ''}", pages)
+
 # === 4. Main CLI ===
 def run(query, max_results, categories):
     print(f"🔍 Querying arXiv for: {query} (max {max_results})")
-    xml_text = search_arxiv(query, max_results, categories)
-    entries = parse_arxiv_feed(xml_text)
+    entries = fetch_arxiv_results(query, max_results, categories)
     save_results(query, entries)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Fetch papers from arXiv')
-    parser.add_argument('--query', type=str, required=True, help='Search query for arXiv')
-    parser.add_argument('--max_results', type=int, default=100, help='Max number of results')
+    parser.add_argument('--query', type=str, default='', help='Search query for arXiv')
+    parser.add_argument('--max_results', type=int, default=100,
+                        help='Max number of results (-1 = everything, with --harvest)')
     parser.add_argument('--categories', type=str, default=None,
                         help='Comma-separated list of arXiv categories (e.g., cs.LG, q-bio.BM)')
+    parser.add_argument('--harvest', action='store_true',
+                        help='Page through all results into a resumable JSONL file')
+    parser.add_argument('--oai', type=str, default=None, metavar='SET',
+                        help='Bulk-harvest a whole OAI-PMH set (e.g. cs, physics:hep-th)')
+    parser.add_argument('--from', dest='from_date', default=None, help='OAI: records changed since YYYY-MM-DD')
+    parser.add_argument('--until', default=None, help='OAI: records changed until YYYY-MM-DD')
+    parser.add_argument('--out', default=None, help='JSONL output for --harvest / --oai')
     args = parser.parse_args()
 
     cats = args.categories.split(',') if args.categories else None
-    run(args.query, args.max_results, cats)
-
+    if args.oai:
+        out = args.out or f"data/raw/arxiv_oai_{args.oai.replace(':', '_')}.jsonl"
+        run_oai_harvest(args.oai, out, args.from_date, args.until)
+    elif not args.query and not cats:
+        parser.error('--query or --categories is required (or --oai SET)')
+    elif args.harvest:
+        name = args.query or ','.join(cats)
+        out = args.out or f"data/raw/arxiv_{name.replace(' ', '_')}.jsonl"
+        run_harvest(args.query, cats, out, None if args.max_results < 0 else args.max_results)
+    else:
+        run(args.query, args.max_results, cats)
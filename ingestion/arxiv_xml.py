@@ -0,0 +1,135 @@
+# ingestion/arxiv_xml.py
+
+import re
+import xml.etree.ElementTree as ET
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV = "{http://arxiv.org/schemas/atom}"
+OPENSEARCH = "{http://a9.com/-/spec/opensearch/1.1/}"
+OAI = "{http://www.openarchives.org/OAI/2.0/}"
+ARXIV_OAI = "{http://arxiv.org/OAI/arXiv/}"
+ABS_URL = "http://arxiv.org/abs/"
+VERSION_RE = re.compile(r"v\d+$")
+
+def arxiv_key(arxiv_id):
+    """The id every arXiv record is stored under: the unversioned abs URL.
+
+    The API names entries by version (http://arxiv.org/abs/2301.01234v2),
+    OAI-PMH by bare id (2301.01234) and deletions by OAI identifier
+    (oai:arXiv.org:2301.01234); all three map to http://arxiv.org/abs/2301.01234,
+    so a later version or an OAI deletion finds the row the API stored.
+    """
+    arxiv_id = arxiv_id.strip().rsplit("/abs/", 1)[-1]
+    if arxiv_id.startswith("oai:"):
+        arxiv_id = arxiv_id.split(":", 2)[-1]
+    return ABS_URL + VERSION_RE.sub("", arxiv_id)
+
+def _iter_elements(chunks, tags):
+    # Pull-parse the document once, yielding each finished element whose tag
+    # is in `tags`; callers clear what they are done with
+    if isinstance(chunks, (str, bytes)):
+        chunks = [chunks]
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = elem
+            elif elem.tag in tags:
+                yield root, elem
+    parser.close()
+
+# === 1. Atom feed from the query API ===
+def iter_arxiv_entries(chunks, feed=None):
+    """Yield one record per Atom <entry> from an iterable of XML chunks.
+
+    Entries are cleared as soon as they are converted, so a 2,000-entry page
+    never sits in memory as a tree. The opensearch totals (total_results,
+    start_index, items_per_page) are stored in `feed` if given.
+    """
+    totals = {
+        OPENSEARCH + "totalResults": "total_results",
+        OPENSEARCH + "startIndex": "start_index",
+        OPENSEARCH + "itemsPerPage": "items_per_page",
+    }
+    for root, elem in _iter_elements(chunks, {ATOM + "entry", *totals}):
+        if elem.tag in totals:
+            if feed is not None:
+                feed[totals[elem.tag]] = int(elem.text or 0)
+            continue
+        if "/api/errors" in elem.findtext(ATOM + "id", ""):
+            # arXiv reports bad queries as a single "Error" entry
+            raise ValueError(f"arXiv API error: {elem.findtext(ATOM + 'summary', '').strip()}")
+        record = entry_to_record(elem)
+        root.remove(elem)
+        yield record
+
+def entry_to_record(entry):
+    primary = entry.find(ARXIV + "primary_category")
+    pdf_url = next((link.get("href") for link in entry.findall(ATOM + "link")
+                    if link.get("title") == "pdf"), "")
+    return {
+        "id": arxiv_key(entry.findtext(ATOM + "id", "")),
+        "title": entry.findtext(ATOM + "title", "").strip(),
+        "summary": entry.findtext(ATOM + "summary", "").strip(),
+        "published": entry.findtext(ATOM + "published", ""),
+        "authors": [a.findtext(ATOM + "name", "") for a in entry.findall(ATOM + "author")],
+        "primary_category": primary.get("term") if primary is not None else "",
+        "categories": [c.get("term") for c in entry.findall(ATOM + "category")],
+        "pdf_url": pdf_url,
+        "doi": entry.findtext(ARXIV + "doi", "").strip(),
+    }
+
+# === 2. OAI-PMH ListRecords (metadataPrefix=arXiv) ===
+def iter_oai_records(chunks, state):
+    """Yield records from one ListRecords response.
+
+    `state` receives the resumptionToken ("token", None on the last page),
+    "complete_list_size" when arXiv sends it, and ids of deleted records
+    under "deleted".
+    """
+    tags = {OAI + "record", OAI + "resumptionToken", OAI + "error"}
+    state["token"] = None
+    for root, elem in _iter_elements(chunks, tags):
+        if elem.tag == OAI + "error":
+            if elem.get("code") == "noRecordsMatch":
+                continue
+            raise ValueError(f"OAI-PMH error {elem.get('code')}: {(elem.text or '').strip()}")
+        if elem.tag == OAI + "resumptionToken":
+            state["token"] = (elem.text or "").strip() or None
+            if elem.get("completeListSize"):
+                state["complete_list_size"] = int(elem.get("completeListSize"))
+            continue
+        header = elem.find(OAI + "header")
+        if header is not None and header.get("status") == "deleted":
+            state.setdefault("deleted", []).append(header.findtext(OAI + "identifier", ""))
+        else:
+            metadata = elem.find(f"{OAI}metadata/{ARXIV_OAI}arXiv")
+            if metadata is not None:
+                yield oai_to_record(metadata)
+        elem.clear()
+        for parent in root.iter(OAI + "ListRecords"):
+            parent.remove(elem)
+
+def oai_to_record(meta):
+    # Same shape as entry_to_record, so both modes feed the same store
+    arxiv_id = meta.findtext(ARXIV_OAI + "id", "").strip()
+    categories = meta.findtext(ARXIV_OAI + "categories", "").split()
+    authors = []
+    for author in meta.findall(f"{ARXIV_OAI}authors/{ARXIV_OAI}author"):
+        name = " ".join(filter(None, (author.findtext(ARXIV_OAI + "forenames"),
+                                      author.findtext(ARXIV_OAI + "keyname"))))
+        authors.append(name)
+    return {
+        "id": arxiv_key(arxiv_id),
+        "title": " ".join(meta.findtext(ARXIV_OAI + "title", "").split()),
+        "summary": meta.findtext(ARXIV_OAI + "abstract", "").strip(),
+        "published": meta.findtext(ARXIV_OAI + "created", ""),
+        "authors": authors,
+        "primary_category": categories[0] if categories else "",
+        "categories": categories,
+        "pdf_url": f"http://arxiv.org/pdf/{arxiv_id}",
+        "doi": meta.findtext(ARXIV_OAI + "doi", "").strip(),
+    }
@@ -0,0 +1,79 @@
+# ingestion/async_http.py
+#
+# One application-lifetime httpx.AsyncClient shared by the async ingestor
+# functions: keep-alive pooling, HTTP/2 when the `h2` package is installed,
+# and retry with backoff on 429/5xx.
+
+import asyncio
+import random
+from urllib.parse import urlsplit
+
+import httpx
+
+from utils import metrics
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE = 20
+TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+MAX_RETRIES = 3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_client = None
+
+def get_async_client():
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2,
+            timeout=TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE),
+            headers={"User-Agent": "LiteratureReviewApp/1.0"},
+        )
+    return _client
+
+async def close_async_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def request(method, url, limiter=None, source=None, **kwargs):
+    """Rate-limited request with retries on 429/5xx; raises on final failure.
+
+    Responses, bytes and retries are counted under `source` (default: the host).
+    """
+    source = source or urlsplit(url).hostname
+    client = get_async_client()
+    for attempt in range(MAX_RETRIES + 1):
+        if limiter:
+            await limiter.wait()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            if attempt == MAX_RETRIES:
+                raise
+            metrics.UPSTREAM_RETRIES.inc(source=source, reason="transport")
+            await asyncio.sleep(2 ** attempt * random.uniform(0.5, 1.0))
+            continue
+        metrics.record_response(source, response)
+        if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+            metrics.UPSTREAM_RETRIES.inc(source=source, reason=metrics.retry_reason(response.status_code))
+            retry_after = response.headers.get("retry-after")
+            retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+            if limiter and limiter.adaptive:
+                # Slows every caller of the source, sync ones included; the
+                # next limiter.wait() holds us until Retry-After has passed
+                limiter.backoff(retry_after)
+            else:
+                await asyncio.sleep(retry_after if retry_after is not None else 2 ** attempt * random.uniform(0.5, 1.0))
+            continue
+        response.raise_for_status()
+        if limiter:
+            limiter.success()
+        return response
@@ -0,0 +1,278 @@
+# ingestion/dedup.py
+#
+# The same paper often shows up as an arXiv preprint, a Semantic Scholar
+# entry and a PubMed record. Dedup runs in two passes over federated
+# articles (see ingestion/federated.py for the record shape):
+#   1. exact joins on DOI, PMID, arXiv id and normalized title + year
+#   2. fuzzy matches on title + abstract: MinHash signatures, LSH banding
+#      to find candidate pairs, signature similarity to confirm them
+# Banding keeps pass 2 roughly linear in the number of records instead of
+# comparing every pair. Duplicates collapse into one canonical article that
+# keeps every source id and the keys of the records merged into it.
+
+import re
+from array import array
+from hashlib import shake_128
+from itertools import chain, islice
+from operator import eq
+
+try:
+    import numpy as np
+except ImportError:  # optional; signatures are just slower to compute
+    np = None
+
+NUM_PERM = 128        # MinHash permutations per signature
+BANDS = 42            # LSH bands of NUM_PERM // BANDS rows: catches pairs from ~0.3 Jaccard
+TITLE_BANDS = 32      # stricter banding for titles: catches pairs from ~0.4
+SHINGLE_SIZE = 3      # words per shingle
+TITLE_SHINGLE_SIZE = 5  # characters per title shingle
+THRESHOLD = 0.5       # estimated Jaccard on title + abstract to call a duplicate
+TITLE_THRESHOLD = 0.7 # title-only match, used when one side has no abstract
+YEAR_SLACK = 1        # preprint and journal version may be a year apart
+
+# === 1. Identifiers ===
+def short_arxiv_id(arxiv_id):
+    # http://arxiv.org/abs/2301.01234v2 -> 2301.01234
+    arxiv_id = (arxiv_id or "").rsplit("/abs/", 1)[-1]
+    return re.sub(r"v\d+$", "", arxiv_id)
+
+def normalize_title(title):
+    return re.sub(r"[^a-z0-9]+", " ", (title or "").lower()).strip()
+
+def merge_keys(article):
+    # Every identifier that can prove two records are the same paper
+    keys = []
+    if article.get("doi"):
+        keys.append("doi:" + article["doi"].lower())
+    ids = article.get("ids") or {}
+    if ids.get("pubmed"):
+        keys.append("pmid:" + ids["pubmed"])
+    if ids.get("arxiv"):
+        keys.append("arxiv:" + short_arxiv_id(ids["arxiv"]))
+    # A title alone doesn't: "Machine learning in medicine" is many papers.
+    # Only the same title in the same year counts; versions published a
+    # year apart are left to the fuzzy pass, which compares abstracts
+    title = normalize_title(article.get("title"))
+    if len(title) > 20 and article.get("year"):
+        keys.append(f"title:{title}:{article['year']}")
+    return keys
+
+def years_conflict(a, b):
+    return bool(a.get("year") and b.get("year")) and abs(int(a["year"]) - int(b["year"])) > YEAR_SLACK
+
+def merge_into(canonical, article):
+    # The canonical record wins; the other one only fills gaps
+    for field in ("title", "abstract", "authors", "venue", "published", "year", "doi", "url"):
+        if not canonical.get(field) and article.get(field):
+            canonical[field] = article[field]
+    for name, value in (article.get("ids") or {}).items():
+        canonical.setdefault("ids", {}).setdefault(name, value)
+    for source in article.get("sources") or []:
+        if source not in canonical.setdefault("sources", []):
+            canonical["sources"].append(source)
+
+# === 2. MinHash ===
+def shingles(text, k=SHINGLE_SIZE):
+    # Word k-grams as tuples; zip keeps the whole thing in C
+    words = normalize_title(text).split()
+    if len(words) <= k:
+        return {tuple(words)} if words else set()
+    return set(zip(*(words[i:] for i in range(k))))
+
+def title_shingles(title, k=TITLE_SHINGLE_SIZE):
+    # Titles are short; character shingles survive a changed word far
+    # better than word shingles do
+    text = normalize_title(title)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+def _permutations(num_perm, seed=1):
+    # Multiply-shift hash family: ((a * h + b) mod 2**64) >> 32, a odd
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2**63, num_perm, dtype=np.uint64) * np.uint64(2)
+    return a, b
+
+_PERMS = {}
+SIGNATURE_BATCH = 64  # shingle sets per numpy pass; bigger batches fall out of cache
+
+def _to_bytes(shingle):
+    return hash(shingle).to_bytes(8, "little", signed=True)
+
+def minhash_many(shingle_sets, num_perm=NUM_PERM):
+    """One signature per shingle set (None for empty sets).
+
+    A signature is the per-permutation minimum of the shingles' hashes.
+    With numpy every shingle is hashed once and permuted num_perm ways with
+    multiply-shift, a batch of sets at a time; without it, shake_128 hands
+    out num_perm independent 32-bit hashes per shingle in one C call.
+    shingle_sets may be a generator; only one batch is held in memory.
+    """
+    if np is None:
+        return [
+            array("I", map(min, zip(*(array("I", shake_128(_to_bytes(s)).digest(4 * num_perm)) for s in st))))
+            if st else None
+            for st in shingle_sets
+        ]
+
+    if num_perm not in _PERMS:
+        _PERMS[num_perm] = _permutations(num_perm)
+    a, b = _PERMS[num_perm]
+    signatures = []
+    shingle_sets = iter(shingle_sets)
+    while True:
+        chunk = list(islice(shingle_sets, SIGNATURE_BATCH))
+        if not chunk:
+            return signatures
+        start = len(signatures)
+        signatures.extend([None] * len(chunk))
+        batch = [(i, st) for i, st in enumerate(chunk, start) if st]
+        if not batch:
+            continue
+        # Python's own str hash is salted per process, which is fine:
+        # signatures are only ever compared within one run
+        base = np.array(list(map(hash, chain.from_iterable(st for _, st in batch))), dtype=np.int64).view(np.uint64)
+        offsets = np.cumsum([0] + [len(st) for _, st in batch[:-1]])
+        # permutations x shingles, computed in place to keep it in cache
+        values = a[:, None] * base[None, :]
+        values += b[:, None]
+        values >>= np.uint64(32)
+        mins = np.minimum.reduceat(values, offsets, axis=1).T.astype(np.uint32)
+        for (i, _), row in zip(batch, mins):
+            signatures[i] = array("I", row.tobytes())
+
+def minhash(shingle_set, num_perm=NUM_PERM):
+    return minhash_many([shingle_set], num_perm)[0]
+
+def similarity(sig_a, sig_b):
+    # Fraction of agreeing permutations estimates the Jaccard similarity
+    return sum(map(eq, sig_a, sig_b)) / len(sig_a)
+
+class LSHIndex:
+    """Buckets signatures by band; records sharing any bucket are candidates."""
+
+    def __init__(self, bands=BANDS, num_perm=NUM_PERM):
+        self.bands = bands
+        self.width = (num_perm // bands) * 4  # bytes per band of uint32 rows
+        self.buckets = [{} for _ in range(bands)]
+
+    def keys(self, signature):
+        raw = signature.tobytes()
+        return [raw[i:i + self.width] for i in range(0, self.bands * self.width, self.width)]
+
+    def query(self, keys):
+        candidates = set()
+        for buckets, key in zip(self.buckets, keys):
+            members = buckets.get(key)
+            if members:
+                candidates.update(members)
+        return candidates
+
+    def insert(self, idx, keys):
+        for buckets, key in zip(self.buckets, keys):
+            members = buckets.get(key)
+            if members is None:
+                buckets[key] = [idx]
+            else:
+                members.append(idx)
+
+# === 3. Clustering ===
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        self.parent[max(a, b)] = min(a, b)
+        return True
+
+def find_duplicates(articles, threshold=THRESHOLD, title_threshold=TITLE_THRESHOLD,
+                    num_perm=NUM_PERM, bands=BANDS):
+    """Group articles that are the same paper.
+
+    Returns (clusters, stats): clusters are lists of indexes into articles,
+    in input order; stats counts the merges each pass made.
+    """
+    uf = _UnionFind(len(articles))
+    stats = {"identifier": 0, "fuzzy": 0, "candidates": 0}
+
+    # Pass 1: exact identifier joins
+    owner = {}
+    for i, article in enumerate(articles):
+        for key in merge_keys(article):
+            if key in owner:
+                stats["identifier"] += uf.union(owner[key], i)
+            else:
+                owner[key] = i
+
+    # Pass 2: MinHash/LSH on title + abstract. Records without an abstract
+    # (Semantic Scholar often omits it) can only be matched on the title,
+    # so titles are indexed too and compared only when one side lacks one
+    full_index = LSHIndex(bands, num_perm)
+    title_index = LSHIndex(TITLE_BANDS, num_perm)        # every title
+    bare_title_index = LSHIndex(TITLE_BANDS, num_perm)   # titles without abstracts
+    title_sigs = minhash_many((title_shingles(a.get("title")) for a in articles), num_perm)
+    full_sigs = minhash_many((shingles(a.get("title")) | shingles(a["abstract"]) if a.get("abstract") else None
+                              for a in articles), num_perm)
+    for i, article in enumerate(articles):
+        if title_sigs[i] is None:
+            continue
+        title_keys = title_index.keys(title_sigs[i])
+        if full_sigs[i] is not None:
+            full_keys = full_index.keys(full_sigs[i])
+            checks = [(j, full_sigs, threshold) for j in full_index.query(full_keys)]
+            checks += [(j, title_sigs, title_threshold) for j in bare_title_index.query(title_keys)]
+            full_index.insert(i, full_keys)
+        else:
+            checks = [(j, title_sigs, title_threshold) for j in title_index.query(title_keys)]
+            bare_title_index.insert(i, title_keys)
+        title_index.insert(i, title_keys)
+
+        for j, sigs, limit in checks:
+            if uf.find(i) == uf.find(j):
+                continue
+            # Title-only evidence is weak; don't let it join papers years apart
+            if sigs is title_sigs and years_conflict(article, articles[j]):
+                continue
+            stats["candidates"] += 1
+            if similarity(sigs[i], sigs[j]) >= limit:
+                stats["fuzzy"] += uf.union(i, j)
+
+    clusters = {}
+    for i in range(len(articles)):
+        clusters.setdefault(uf.find(i), []).append(i)
+    return list(clusters.values()), stats
+
+def _completeness(article):
+    return (bool(article.get("doi")), len(article.get("ids") or {}), len(article.get("abstract") or ""))
+
+def dedupe(articles, **kwargs):
+    """Collapse duplicates into canonical articles, keeping provenance.
+
+    The most complete record of each cluster becomes canonical, the rest
+    fill its gaps; "merged_from" lists the keys of the records folded in.
+    """
+    clusters, _ = find_duplicates(articles, **kwargs)
+    canonical = []
+    for members in clusters:
+        if len(members) == 1:
+            canonical.append(articles[members[0]])
+            continue
+        ordered = sorted(members, key=lambda i: _completeness(articles[i]), reverse=True)
+        base = dict(articles[ordered[0]], ids=dict(articles[ordered[0]].get("ids") or {}),
+                    sources=list(articles[ordered[0]].get("sources") or []))
+        base["merged_from"] = list(base.get("merged_from") or [])
+        for i in ordered[1:]:
+            merge_into(base, articles[i])
+            base["merged_from"].append(articles[i].get("key", str(i)))
+        canonical.append(base)
+    return canonical
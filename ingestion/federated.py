@@ -0,0 +1,237 @@
+# ingestion/federated.py
+#
+# One query, three sources. PubMed, arXiv and Semantic Scholar are searched
+# concurrently, each within its own time budget, and their records are
+# normalized into one shape and merged (same DOI / PMID / arXiv id / title
+# = same paper) as they arrive; near-duplicates are folded in at the end
+# (ingestion/dedup.py). A slow source only costs its own budget:
+# when it runs out, whatever arrived is returned and the source is marked
+# "timeout".
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from ingestion.pubmed_ingestor import async_search_pubmed, async_fetch_batch, BATCH_SIZE
+from ingestion.arxiv_ingestor import async_fetch_arxiv_results
+from ingestion.arxiv_xml import arxiv_key
+from ingestion.semantic_ingestor import async_fetch_semantic_results
+from ingestion.dedup import merge_keys, merge_into, dedupe as dedupe_articles
+from storage.article_store import get_store
+
+# Seconds each source gets before we stop waiting for it
+SOURCE_BUDGET = float(os.getenv("FEDERATED_BUDGET", "8"))
+
+# === 1. One record shape for every source ===
+def _year(text):
+    match = re.search(r"\b(1[89]\d\d|20\d\d)\b", str(text or ""))
+    return int(match.group(1)) if match else None
+
+def normalize_record(source, record):
+    """Map a pubmed / arxiv / semantic record onto the federated schema."""
+    if source == "pubmed":
+        return {
+            "title": record.get("title") or "",
+            "abstract": record.get("abstract") or "",
+            "authors": [a for a in record.get("authors") or [] if a],
+            "venue": record.get("journal") or "",
+            "published": record.get("pubdate") or "",
+            "year": _year(record.get("pubdate")),
+            "doi": record.get("doi") or "",
+            "url": f"https://pubmed.ncbi.nlm.nih.gov/{record['pmid']}/",
+            "ids": {"pubmed": record["pmid"]},
+        }
+    if source == "arxiv":
+        return {
+            "title": " ".join((record.get("title") or "").split()),
+            "abstract": record.get("summary") or "",
+            "authors": [a for a in record.get("authors") or [] if a],
+            "venue": record.get("primary_category") or "",
+            "published": record.get("published") or "",
+            "year": _year(record.get("published")),
+            "doi": record.get("doi") or "",
+            "url": record["id"],
+            "ids": {"arxiv": record["id"]},
+        }
+    if source == "semantic":
+        external = record.get("external_ids") or {}
+        ids = {"semantic": record["paper_id"]}
+        if external.get("PubMed"):
+            ids["pubmed"] = str(external["PubMed"])
+        if external.get("ArXiv"):
+            ids["arxiv"] = arxiv_key(external["ArXiv"])
+        return {
+            "title": record.get("title") or "",
+            "abstract": record.get("abstract") or "",
+            "authors": [a for a in record.get("authors") or [] if a],
+            "venue": record.get("venue") or "",
+            "published": str(record.get("year") or ""),
+            "year": record.get("year"),
+            "doi": external.get("DOI") or "",
+            "url": record.get("url") or "",
+            "ids": ids,
+        }
+    raise ValueError(f"Unknown source: {source}")
+
+# === 2. Merge records across sources as they arrive ===
+class FederatedMerger:
+    def __init__(self):
+        self.articles = []
+        self.by_key = {}
+
+    def add(self, source, records):
+        """Merge one source's records; returns (new, updated) articles."""
+        new, updated = [], []
+        for record in records:
+            article = normalize_record(source, record)
+            keys = merge_keys(article)
+            existing = next((self.by_key[k] for k in keys if k in self.by_key), None)
+            if existing is None:
+                article["key"] = keys[0] if keys else f"{source}:{len(self.articles)}"
+                article["sources"] = [source]
+                self.articles.append(article)
+                new.append(article)
+                existing = article
+            else:
+                merge_into(existing, dict(article, sources=[source]))
+                if all(existing is not a for a in new + updated):
+                    updated.append(existing)
+            for key in merge_keys(existing):
+                self.by_key.setdefault(key, existing)
+        return new, updated
+
+# === 3. Per-source fetchers: call emit(records) as records arrive ===
+async def fetch_pubmed(query, max_results, emit):
+    pmids = await async_search_pubmed(query, max_results)
+    store = get_store()
+    cached = await asyncio.to_thread(store.get_fresh, "pubmed", pmids)
+    if cached:
+        await emit([cached[pid] for pid in pmids if pid in cached])
+
+    to_fetch = [pid for pid in pmids if pid not in cached]
+    batches = [to_fetch[i:i + BATCH_SIZE] for i in range(0, len(to_fetch), BATCH_SIZE)]
+    tasks = [asyncio.ensure_future(async_fetch_batch(batch)) for batch in batches]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            records = [r for r in await next_done if r["title"] or r["abstract"]]
+            await asyncio.to_thread(store.put_many, "pubmed", records, "pmid")
+            await emit(records)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def fetch_arxiv(query, max_results, emit):
+    await emit(await async_fetch_arxiv_results(query, max_results))
+
+async def fetch_semantic(query, max_results, emit):
+    papers = await async_fetch_semantic_results(query, max_results)
+    await emit([p for p in papers if p["paper_id"]])
+
+FETCHERS = {
+    "pubmed": fetch_pubmed,
+    "arxiv": fetch_arxiv,
+    "semantic": fetch_semantic,
+}
+
+async def _run_source(source, query, max_results, budget, queue):
+    started = time.monotonic()
+    count = 0
+
+    async def emit(records):
+        nonlocal count
+        count += len(records)
+        await queue.put(("records", source, records))
+
+    status, error = "ok", None
+    try:
+        await asyncio.wait_for(FETCHERS[source](query, max_results, emit), budget)
+    except asyncio.TimeoutError:
+        status = "timeout"
+    except Exception as e:
+        status, error = "error", f"{type(e).__name__}: {e}"
+    await queue.put(("status", source, {
+        "status": status,
+        "count": count,
+        "elapsed": round(time.monotonic() - started, 3),
+        "error": error,
+    }))
+
+# === 4. Federated search ===
+async def iter_federated(query, max_results=20, sources=None, budget=None):
+    """Yield articles/status/done events while the sources answer.
+
+    "articles" events carry newly seen papers plus papers that a later
+    source merged into (both keyed by "key"); one "status" event per source
+    reports ok / timeout / error; "done" closes the stream.
+    """
+    sources = list(sources or FETCHERS)
+    unknown = [s for s in sources if s not in FETCHERS]
+    if unknown:
+        raise ValueError(f"Unknown sources: {', '.join(unknown)}")
+    if not isinstance(budget, dict):
+        budget = {s: budget or SOURCE_BUDGET for s in sources}
+
+    queue = asyncio.Queue()
+    merger = FederatedMerger()
+    statuses = {}
+    tasks = [
+        asyncio.ensure_future(_run_source(s, query, max_results, budget.get(s, SOURCE_BUDGET), queue))
+        for s in sources
+    ]
+    try:
+        while len(statuses) < len(tasks):
+            kind, source, payload = await queue.get()
+            if kind == "status":
+                statuses[source] = payload
+                yield {"type": "status", "source": source, **payload}
+            else:
+                new, updated = merger.add(source, payload)
+                if new or updated:
+                    yield {"type": "articles", "source": source, "new": new, "updated": updated}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    yield {"type": "done", "total": len(merger.articles), "sources": statuses}
+
+async def federated_search(query, max_results=20, sources=None, budget=None, dedupe=True):
+    # Streaming merges on exact ids only; the fuzzy MinHash pass needs the
+    # full result set, so it runs once everything is in
+    articles = {}
+    async for event in iter_federated(query, max_results, sources, budget):
+        if event["type"] == "articles":
+            for article in event["new"]:
+                articles[article["key"]] = article
+        elif event["type"] == "done":
+            results = list(articles.values())
+            if dedupe:
+                results = await asyncio.to_thread(dedupe_articles, results)
+            return {"results": results, "sources": event["sources"]}
+
+# === 5. CLI ===
+def run(query, max_results, sources, budget):
+    print(f"🔍 Federated search for: {query} (max {max_results} per source)")
+    result = asyncio.run(federated_search(query, max_results, sources, budget))
+    for source, status in result["sources"].items():
+        print(f"   {source:<9} {status['status']:<8} {status['count']:>5} records in {status['elapsed']:.2f}s"
+              + (f" ({status['error']})" if status["error"] else ""))
+
+    os.makedirs("data/raw", exist_ok=True)
+    path = os.path.join("data/raw", f"federated_{query.replace(' ', '_')}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"✅ Saved {len(result['results'])} merged articles to {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search PubMed, arXiv and Semantic Scholar together")
+    parser.add_argument("--query", type=str, required=True, help="Search query")
+    parser.add_argument("--max_results", type=int, default=20, help="Max results per source")
+    parser.add_argument("--sources", type=str, default=None,
+                        help="Comma-separated subset of pubmed,arxiv,semantic")
+    parser.add_argument("--budget", type=float, default=SOURCE_BUDGET, help="Seconds allowed per source")
+    args = parser.parse_args()
+
+    sources = args.sources.split(",") if args.sources else None
+    run(args.query, args.max_results, sources, args.budget)
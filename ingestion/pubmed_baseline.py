@@ -0,0 +1,133 @@
+# ingestion/pubmed_baseline.py
+#
+# Offline ingestion of a local mirror of the PubMed baseline/update files
+# (pubmedNNnNNNN.xml.gz). Usage:
+#
+#   python -m ingestion.pubmed_baseline --dir /mirror/baseline --dir /mirror/updatefiles --workers 8
+
+import argparse
+import glob
+import gzip
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ingestion.pubmed_xml import iter_pubmed_articles
+from storage.article_store import ArticleStore, DB_PATH
+from utils.stats_matcher import default_matcher
+
+FILE_RE = re.compile(r"pubmed\d{2}n(\d{4})\.xml\.gz$")
+READ_CHUNK = 1024 * 1024  # decompressed bytes fed to the parser at a time
+FILES_AHEAD = 2           # parsed files per worker allowed to wait for the writer
+
+APPLIED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS applied_files (
+    name       TEXT PRIMARY KEY,
+    records    INTEGER NOT NULL,
+    deleted    INTEGER NOT NULL,
+    applied_at REAL NOT NULL
+);
+"""
+
+# === 1. Find files, in the order NLM says to apply them ===
+def list_files(dirs):
+    # Update files continue the baseline numbering, so sorting by file number
+    # gives baseline first, then every update in publication order
+    paths = []
+    for d in dirs:
+        paths.extend(p for p in glob.glob(os.path.join(d, "*.xml.gz")) if FILE_RE.search(p))
+    return sorted(paths, key=lambda p: int(FILE_RE.search(p).group(1)))
+
+# === 2. Worker: decompress + parse + filter one file ===
+def _read_chunks(path):
+    with gzip.open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            yield chunk
+
+def parse_file(path, filter_stats=True):
+    """Parse one file in a worker process.
+
+    Returns (path, kept_records, removed_pmids, parsed_count, cpu_seconds).
+    `removed_pmids` holds <DeleteCitation> PMIDs plus, when filtering, the
+    PMIDs of revised records that no longer pass the filter, so an update
+    can never leave a stale earlier version behind in the store. Most of
+    the latter were never stored; the store only touches the ones that were.
+    """
+    start = time.process_time()
+    removed = []
+    kept = []
+    parsed = 0
+    for record in iter_pubmed_articles(_read_chunks(path), deleted=removed):
+        parsed += 1
+        if not filter_stats or default_matcher.mentions(record["abstract"]):
+            kept.append(record)
+        else:
+            removed.append(record["pmid"])
+    return path, kept, removed, parsed, time.process_time() - start
+
+# === 3. Apply results to the article store, strictly in file order ===
+def apply_result(store, result):
+    """Write one parsed file; returns (parsed, kept, deleted, cpu_seconds)."""
+    path, kept, removed, parsed, cpu = result
+    name = os.path.basename(path)
+    # Records first, then deletions: NLM lists <DeleteCitation> after the
+    # file's articles, so a PMID both revised and deleted ends up deleted
+    store.put_many("pubmed", kept, "pmid")
+    deleted = store.delete_many("pubmed", removed)
+    with store.conn:
+        store.conn.execute(
+            "INSERT OR REPLACE INTO applied_files (name, records, deleted, applied_at) VALUES (?, ?, ?, ?)",
+            (name, len(kept), deleted, time.time()),
+        )
+    print(f"  {name}: {parsed} parsed, {len(kept)} kept, {deleted} deleted "
+          f"({parsed / cpu if cpu else 0:,.0f} records/s/core)")
+    return parsed, len(kept), deleted, cpu
+
+def ingest(dirs, workers=None, filter_stats=True, db_path=DB_PATH, force=False):
+    store = ArticleStore(db_path)
+    store.conn.executescript(APPLIED_SCHEMA)
+    applied = {row[0] for row in store.conn.execute("SELECT name FROM applied_files")}
+
+    files = [p for p in list_files(dirs) if force or os.path.basename(p) not in applied]
+    if not files:
+        print("✅ Nothing to do; every file is already applied")
+        return
+
+    workers = workers or os.cpu_count()
+    print(f"📦 Ingesting {len(files)} files with {workers} workers")
+
+    wall_start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Apply in submission (= file) order, with at most FILES_AHEAD parsed
+        # files per worker held in memory waiting for the single writer
+        pending = deque()
+        for path in files:
+            pending.append(pool.submit(parse_file, path, filter_stats))
+            if len(pending) >= workers * FILES_AHEAD:
+                results.append(apply_result(store, pending.popleft().result()))
+        while pending:
+            results.append(apply_result(store, pending.popleft().result()))
+
+    wall = time.perf_counter() - wall_start
+    total_parsed, total_kept, total_deleted, cpu_seconds = (sum(col) for col in zip(*results))
+    print(f"📄 {total_parsed} parsed, {total_kept} stored, {total_deleted} deleted")
+    print(f"⏱️  {total_parsed / wall:,.0f} records/s overall, "
+          f"{total_parsed / cpu_seconds if cpu_seconds else 0:,.0f} records/s per core (parse + filter)")
+    return {"parsed": total_parsed, "stored": total_kept, "deleted": total_deleted}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest local PubMed baseline/update XML.gz files")
+    parser.add_argument("--dir", action="append", required=True, help="Directory of pubmedNNnNNNN.xml.gz files (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--no_filter", action="store_true", help="Store every article, not just ones mentioning statistics")
+    parser.add_argument("--db", default=DB_PATH, help="Article store path")
+    parser.add_argument("--force", action="store_true", help="Re-apply files that were already ingested")
+    args = parser.parse_args()
+
+    ingest(args.dir, args.workers, not args.no_filter, args.db, args.force)
@@ -2,104 +2,179 @@
 
 import requests
 import argparse
-import time
+import asyncio
 import json
 import os
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from tqdm import tqdm
+from utils.rate_limit import RateLimiter, AsyncRateLimiter
+from ingestion.pubmed_xml import iter_pubmed_articles
+from ingestion.async_http import request as async_request
+from storage.article_store import get_store
+from utils.stats_matcher import default_matcher
+from utils.checkpoint import load_checkpoint, save_checkpoint
+from utils import metrics
+
+BASE_URL = os.getenv("NCBI_BASE_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils")
+NCBI_API_KEY = os.getenv("NCBI_API_KEY")
+BATCH_SIZE = 200  # PMIDs per efetch (POSTed, so no URL length limit)
+MAX_WORKERS = 4   # concurrent batches; the rate limiter is the real throttle
+STREAM_CHUNK = 64 * 1024  # bytes fed to the XML pull parser at a time
+HISTORY_WINDOW = 1000     # records per efetch page in bulk (history server) mode
 
-BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+# NCBI allows 3 requests/s without an API key and 10/s with one
+# (NCBI_RATE_LIMIT overrides this, e.g. for local stand-in servers)
+NCBI_RATE = float(os.getenv("NCBI_RATE_LIMIT", "10" if NCBI_API_KEY else "3"))
+limiter = RateLimiter(NCBI_RATE)
+async_limiter = AsyncRateLimiter(limiter)  # same budget as the sync path
+
+_session = None
+
+# === 0. Shared HTTP session ===
+def get_session():
+    global _session
+    if _session is None:
+        retry = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "POST"]),
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["User-Agent"] = "LiteratureReviewApp/1.0"
+        _session = session
+    return _session
+
+def ncbi_request(endpoint, params, method="GET", stream=False):
+    params = dict(params)
+    if NCBI_API_KEY:
+        params["api_key"] = NCBI_API_KEY
+    limiter.wait()
+    session = get_session()
+    if method == "POST":
+        response = session.post(f"{BASE_URL}/{endpoint}", data=params, stream=stream)
+    else:
+        response = session.get(f"{BASE_URL}/{endpoint}", params=params, stream=stream)
+    # Streamed bodies are counted by the caller once read (metrics.record_bytes)
+    metrics.record_response("pubmed", response, stream)
+    response.raise_for_status()
+    return response
 
 # === 1. Search PubMed for PMIDs ===
-def search_pubmed(query, max_results=100):
+def date_params(mindate=None, maxdate=None, datetype="edat"):
+    # esearch date window (YYYY/MM/DD, both ends inclusive); edat is the
+    # date a record entered PubMed, mdat the date it was last modified
+    if not mindate and not maxdate:
+        return {}
+    return {"datetype": datetype, "mindate": mindate or "1800/01/01", "maxdate": maxdate or "3000/12/31"}
+
+def search_cache_key(query, dates):
+    return f"{query}|{dates['datetype']}:{dates['mindate']}-{dates['maxdate']}" if dates else query
+
+@metrics.timed("search_pubmed")
+def search_pubmed(query, max_results=100, use_cache=True, mindate=None, maxdate=None, datetype="edat",
+                  counts=None):
+    """PMIDs for the query, at most max_results of them.
+
+    If `counts` is a dict it receives esearch's total as "count" (when the
+    search went upstream), so callers can tell a truncated list apart.
+    """
+    dates = date_params(mindate, maxdate, datetype)
+    store = get_store() if use_cache else None
+    if store:
+        cached = store.get_search("pubmed", search_cache_key(query, dates), max_results)
+        if cached is not None:
+            return cached
+
     pmids = []
     retstart = 0
     retmax = 100  # fetch 100 at a time
 
-    headers = {"Accept": "application/json"}
-
     while len(pmids) < max_results:
         params = {
             "db": "pubmed",
             "term": query,
             "retstart": retstart,
             "retmax": min(retmax, max_results - len(pmids)),
-            "retmode": "json"
+            "retmode": "json",
+            **dates
         }
-        response = requests.get(f"{BASE_URL}/esearch.fcgi", params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = ncbi_request("esearch.fcgi", params).json()
         ids = data["esearchresult"]["idlist"]
+        if counts is not None:
+            counts["count"] = int(data["esearchresult"]["count"])
         if not ids:
             break
         pmids.extend(ids)
         retstart += retmax
-        time.sleep(0.5)  # be nice to NCBI
+
+    if store:
+        store.put_search("pubmed", search_cache_key(query, dates), pmids, exhausted=len(pmids) < max_results)
     return pmids
 
 # === 2. Fetch Metadata for PMIDs ===
-def fetch_details(pmids):
-    BATCH_SIZE = 50
-    all_results = []
+@metrics.timed("fetch_details")
+def fetch_details(pmids, max_workers=MAX_WORKERS, use_cache=True):
+    # Only go upstream for PMIDs that are missing from the store or stale
+    store = get_store() if use_cache else None
+    cached = store.get_fresh("pubmed", pmids) if store else {}
+    to_fetch = [pid for pid in pmids if pid not in cached]
 
-    for i in tqdm(range(0, len(pmids), BATCH_SIZE), desc="Fetching abstracts"):
-        batch = pmids[i:i + BATCH_SIZE]
-        params = {
-            "db": "pubmed",
-            "id": ",".join(batch),
-            "retmode": "json",
-            "rettype": "abstract"
-        }
-        response = requests.get(f"{BASE_URL}/esummary.fcgi", params=params)
-        response.raise_for_status()
-        summaries = response.json()["result"]
+    fetched = {r["pmid"]: r for r in fetch_uncached(to_fetch, max_workers)}
+    if store:
+        store.put_many("pubmed", [r for r in fetched.values() if r["title"] or r["abstract"]], "pmid")
 
-        # use efetch to get full abstracts
-        fetch_params = {
-            "db": "pubmed",
-            "id": ",".join(batch),
-            "retmode": "xml"
-        }
-        fetch_response = requests.get(f"{BASE_URL}/efetch.fcgi", params=fetch_params)
-        fetch_response.raise_for_status()
-        xml_data = fetch_response.text
-
-        for pid in batch:
-            summary = summaries.get(pid, {})
-            title = summary.get("title", "")
-            journal = summary.get("fulljournalname", "")
-            pubdate = summary.get("pubdate", "")
-            authors = summary.get("authors", [])
-            author_names = [a['name'] for a in authors if 'name' in a]
-            abstract = extract_abstract_from_xml(xml_data, pid)
-
-            all_results.append({
-                "pmid": pid,
-                "title": title,
-                "journal": journal,
-                "pubdate": pubdate,
-                "authors": author_names,
-                "abstract": abstract,
-            })
-        time.sleep(0.5)
-    return all_results
-
-# === 3. Extract Abstracts from efetch XML ===
-def extract_abstract_from_xml(xml_text, pmid):
-    pattern = re.compile(rf"<ArticleId IdType=\"pubmed\">{pmid}</ArticleId>.*?<Abstract>(.*?)</Abstract>", re.DOTALL)
-    match = pattern.search(xml_text)
-    if match:
-        raw = match.group(1)
-        clean = re.sub(r"<.*?>", "", raw)
-        return clean.strip()
-    return ""
-
-# === 4. Regex Filter: Does Abstract Mention Stats? ===
+    return [cached.get(pid) or fetched[pid] for pid in pmids]
+
+def fetch_uncached(pmids, max_workers=MAX_WORKERS):
+    if not pmids:
+        return []
+    batches = [pmids[i:i + BATCH_SIZE] for i in range(0, len(pmids), BATCH_SIZE)]
+    batch_results = [None] * len(batches)
+
+    # Batches run concurrently; the shared limiter keeps us under NCBI's rate
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_batch, batch): idx for idx, batch in enumerate(batches)}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Fetching abstracts"):
+            batch_results[futures[future]] = future.result()
+
+    return [record for batch in batch_results for record in batch]
+
+def fetch_batch(batch):
+    # One efetch round trip gives title, journal, pubdate, authors and abstract
+    response = ncbi_request("efetch.fcgi", {
+        "db": "pubmed",
+        "id": ",".join(batch),
+        "retmode": "xml"
+    }, method="POST", stream=True)
+    with response:
+        parsed = {r["pmid"]: r for r in iter_pubmed_articles(response.iter_content(STREAM_CHUNK))}
+    metrics.record_bytes("pubmed", response)
+
+    # Keep the requested order and an entry for every PMID, as before
+    return [parsed.get(pid) or empty_record(pid) for pid in batch]
+
+def empty_record(pmid):
+    return {
+        "pmid": pmid,
+        "title": "",
+        "journal": "",
+        "pubdate": "",
+        "authors": [],
+        "abstract": "",
+        "abstract_sections": [],
+        "doi": "",
+    }
+
+# === 3. Regex Filter: Does Abstract Mention Stats? ===
 def mentions_statistics(text):
-    if not text:
-        return False
-    pattern = re.compile(r"(p-?value|regression|anova|odds ratio|confidence interval|multivariate|statistical significance)", re.I)
-    return bool(pattern.search(text))
+    return default_matcher.mentions(text)
 
 # === 5. Main Function ===
 # === NEW: Get Total Available Results ===
@@ -110,17 +185,261 @@ def get_total_result_count(query):
         "retmode": "json",
         "rettype": "count"
     }
-    response = requests.get(f"{BASE_URL}/esearch.fcgi", params=params)
-    response.raise_for_status()
-    data = response.json()
+    data = ncbi_request("esearch.fcgi", params).json()
     return int(data["esearchresult"]["count"])
 
+# === Search + fetch in one call (used by main.py and api/app.py) ===
+def fetch_pubmed_results(query, max_results=100):
+    pmids = search_pubmed(query, max_results=max_results)
+    if not pmids:
+        return []
+    return fetch_details(pmids)
+
+# === Async counterparts (shared httpx client, for the FastAPI apps) ===
+async def async_ncbi_request(endpoint, params, method="GET"):
+    params = dict(params)
+    if NCBI_API_KEY:
+        params["api_key"] = NCBI_API_KEY
+    if method == "POST":
+        return await async_request("POST", f"{BASE_URL}/{endpoint}", limiter=async_limiter,
+                                   source="pubmed", data=params)
+    return await async_request("GET", f"{BASE_URL}/{endpoint}", limiter=async_limiter, source="pubmed",
+                               params=params)
+
+@metrics.timed("search_pubmed")
+async def async_search_pubmed(query, max_results=100, use_cache=True, mindate=None, maxdate=None, datetype="edat",
+                              counts=None):
+    # Same as search_pubmed, including `counts`
+    dates = date_params(mindate, maxdate, datetype)
+    store = get_store() if use_cache else None
+    if store:
+        cached = await asyncio.to_thread(store.get_search, "pubmed", search_cache_key(query, dates), max_results)
+        if cached is not None:
+            return cached
+
+    pmids = []
+    retstart = 0
+    retmax = 100
+    while len(pmids) < max_results:
+        params = {
+            "db": "pubmed",
+            "term": query,
+            "retstart": retstart,
+            "retmax": min(retmax, max_results - len(pmids)),
+            "retmode": "json",
+            **dates
+        }
+        data = (await async_ncbi_request("esearch.fcgi", params)).json()
+        ids = data["esearchresult"]["idlist"]
+        if counts is not None:
+            counts["count"] = int(data["esearchresult"]["count"])
+        if not ids:
+            break
+        pmids.extend(ids)
+        retstart += retmax
+
+    if store:
+        await asyncio.to_thread(store.put_search, "pubmed", search_cache_key(query, dates), pmids,
+                                len(pmids) < max_results)
+    return pmids
+
+async def async_fetch_batch(batch):
+    response = await async_ncbi_request("efetch.fcgi", {
+        "db": "pubmed",
+        "id": ",".join(batch),
+        "retmode": "xml"
+    }, method="POST")
+    # Parsing is CPU work; keep it off the event loop
+    records = await asyncio.to_thread(lambda: list(iter_pubmed_articles([response.content])))
+    parsed = {r["pmid"]: r for r in records}
+    return [parsed.get(pid) or empty_record(pid) for pid in batch]
+
+@metrics.timed("fetch_details")
+async def async_fetch_details(pmids, use_cache=True):
+    store = get_store() if use_cache else None
+    cached = await asyncio.to_thread(store.get_fresh, "pubmed", pmids) if store else {}
+    to_fetch = [pid for pid in pmids if pid not in cached]
+
+    # The shared limiter paces requests; gather just keeps them all queued
+    batches = [to_fetch[i:i + BATCH_SIZE] for i in range(0, len(to_fetch), BATCH_SIZE)]
+    results = await asyncio.gather(*(async_fetch_batch(b) for b in batches))
+    fetched = {r["pmid"]: r for batch in results for r in batch}
+    if store:
+        await asyncio.to_thread(store.put_many, "pubmed",
+                                [r for r in fetched.values() if r["title"] or r["abstract"]], "pmid")
+
+    return [cached.get(pid) or fetched[pid] for pid in pmids]
+
+async def async_fetch_pubmed_results(query, max_results=100):
+    pmids = await async_search_pubmed(query, max_results=max_results)
+    if not pmids:
+        return []
+    return await async_fetch_details(pmids)
+
+async def async_esearch_history(query, dates=None):
+    params = {"db": "pubmed", "term": query, "usehistory": "y", "retmax": 0, "retmode": "json", **(dates or {})}
+    result = (await async_ncbi_request("esearch.fcgi", params)).json()["esearchresult"]
+    return int(result["count"]), result["webenv"], result["querykey"]
+
+async def async_fetch_history_window(webenv, query_key, retstart, retmax=HISTORY_WINDOW):
+    response = await async_ncbi_request("efetch.fcgi", {
+        "db": "pubmed",
+        "WebEnv": webenv,
+        "query_key": query_key,
+        "retstart": retstart,
+        "retmax": retmax,
+        "retmode": "xml"
+    }, method="POST")
+    return await asyncio.to_thread(lambda: list(iter_pubmed_articles([response.content])))
+
+async def async_iter_history_windows(query, start=0, concurrency=MAX_WORKERS, limit=None,
+                                     mindate=None, maxdate=None, datetype="edat", counts=None):
+    """Async iter_history_windows, with an optional esearch date window.
+
+    The history server has no 10,000-PMID paging cap. If `counts` is a
+    dict it receives esearch's total as "count", before `limit` applies.
+    """
+    count, webenv, query_key = await async_esearch_history(query, date_params(mindate, maxdate, datetype))
+    if counts is not None:
+        counts["count"] = count
+    if limit is not None and limit >= 0:
+        count = min(count, limit)
+    starts = list(range(start, count, HISTORY_WINDOW))
+    for i in range(0, len(starts), concurrency):
+        group = starts[i:i + concurrency]
+        windows = await asyncio.gather(*(
+            async_fetch_history_window(webenv, query_key, retstart, min(HISTORY_WINDOW, count - retstart))
+            for retstart in group
+        ))
+        for retstart, records in zip(group, windows):
+            yield min(retstart + HISTORY_WINDOW, count), count, records
+
+# === Bulk mode: history server, JSONL streaming, resumable ===
+def esearch_history(query, dates=None):
+    # Park the full result set on the history server; we page it with efetch
+    params = {
+        "db": "pubmed",
+        "term": query,
+        "usehistory": "y",
+        "retmax": 0,
+        "retmode": "json",
+        **(dates or {})
+    }
+    result = ncbi_request("esearch.fcgi", params).json()["esearchresult"]
+    return int(result["count"]), result["webenv"], result["querykey"]
+
+def fetch_history_window(webenv, query_key, retstart, retmax=HISTORY_WINDOW):
+    response = ncbi_request("efetch.fcgi", {
+        "db": "pubmed",
+        "WebEnv": webenv,
+        "query_key": query_key,
+        "retstart": retstart,
+        "retmax": retmax,
+        "retmode": "xml"
+    }, method="POST", stream=True)
+    with response:
+        records = list(iter_pubmed_articles(response.iter_content(STREAM_CHUNK)))
+    metrics.record_bytes("pubmed", response)
+    return records
+
+def history_alive(history, start):
+    # The history server drops a WebEnv after some hours unused; a one-record
+    # efetch tells whether it still holds the result set
+    if start >= history["count"]:
+        return True
+    try:
+        return bool(fetch_history_window(history["webenv"], history["query_key"], start, 1))
+    except requests.HTTPError:
+        return False
+
+def iter_history_windows(query, start=0, max_workers=MAX_WORKERS, limit=None, history=None):
+    """Yield (next_retstart, count, records) for every efetch window from `start` on.
+
+    Windows are fetched `max_workers` at a time but yielded in order, so the
+    caller can checkpoint `next_retstart` after each one. `limit` caps the
+    number of records (and so `count`).
+
+    `history` is a dict checkpointed next to `next_retstart`: empty, it gets
+    the search's WebEnv, query_key, count and date; passed back on resume,
+    the same result set is paged again, so the offset still means the same
+    records. If the server has dropped it, the search is rerun bounded to
+    records that had entered PubMed (edat) by the original search date, so
+    records added since can't shift the offsets.
+    """
+    if history is None:
+        history = {}
+    if history.get("webenv") and history_alive(history, start):
+        count, webenv, query_key = history["count"], history["webenv"], history["query_key"]
+    else:
+        searched = history.get("searched") or time.strftime("%Y/%m/%d")
+        dates = date_params(maxdate=searched) if history.get("searched") else None
+        count, webenv, query_key = esearch_history(query, dates)
+        history.update(webenv=webenv, query_key=query_key, count=count, searched=searched)
+    if limit is not None and limit >= 0:
+        count = min(count, limit)
+    starts = list(range(start, count, HISTORY_WINDOW))
+
+    def fetch(retstart):
+        return fetch_history_window(webenv, query_key, retstart, min(HISTORY_WINDOW, count - retstart))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for i in range(0, len(starts), max_workers):
+            group = starts[i:i + max_workers]
+            windows = pool.map(fetch, group)
+            for retstart, records in zip(group, windows):
+                yield min(retstart + HISTORY_WINDOW, count), count, records
+
+def filter_statistics(records):
+    return default_matcher.filter_records(records)
+
+def run_bulk(query, out_path="data/raw/pubmed_filtered.jsonl"):
+    checkpoint_path = out_path + ".checkpoint"
+    store = get_store()
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+
+    checkpoint = load_checkpoint(checkpoint_path, query)
+    if checkpoint:
+        print(f"↩️  Resuming at record {checkpoint['retstart']} of {checkpoint['count']}")
+    else:
+        checkpoint = {"query": query, "retstart": 0, "count": None, "offset": 0, "written": 0}
+    history = checkpoint.setdefault("history", {})
+
+    with open(out_path, "a+b") as out:
+        # Drop anything written after the last checkpoint (e.g. a crash mid-window)
+        out.truncate(checkpoint["offset"])
+        out.seek(checkpoint["offset"])
+
+        progress = None
+        for next_start, count, records in iter_history_windows(query, start=checkpoint["retstart"], history=history):
+            if progress is None:
+                print(f"✅ Total matching articles: {count}")
+                progress = tqdm(total=count, initial=checkpoint["retstart"], desc="Fetching abstracts")
+
+            store.put_many("pubmed", records, "pmid")
+            for record in filter_statistics(records):
+                out.write((json.dumps(record) + "\n").encode("utf-8"))
+                checkpoint["written"] += 1
+            out.flush()
+            os.fsync(out.fileno())
+
+            progress.update(next_start - checkpoint["retstart"])
+            checkpoint.update(retstart=next_start, count=count, offset=out.tell())
+            save_checkpoint(checkpoint_path, checkpoint)
+
+        if progress is not None:
+            progress.close()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"📄 {checkpoint['written']} results mention statistical analysis")
+    print(f"✅ Done. Filtered results streamed to {out_path}")
+
 # === Updated Main Function ===
 def run(query, max_results):
     if max_results == -1:
-        print(f"🔍 Getting total available results for: {query}")
-        max_results = get_total_result_count(query)
-        print(f"✅ Total matching articles: {max_results}")
+        # Fetch everything through the history server, streaming to disk
+        run_bulk(query)
+        return
 
     print(f"🔎 Searching PubMed for: {query}")
     pmids = search_pubmed(query, max_results=max_results)
@@ -128,7 +447,7 @@ def run(query, max_results):
 
     results = fetch_details(pmids)
     print(f"🧠 Filtering for statistical analysis mentions...")
-    filtered = [r for r in results if mentions_statistics(r["abstract"])]
+    filtered = list(filter_statistics(results))
 
     print(f"📄 {len(filtered)} results mention statistical analysis")
 
@@ -146,7 +465,7 @@ if __name__ == "__main__":
         "--max_results", 
         type=int, 
         default=100, 
-        help="Number of articles to retrieve (use -1 for all available)"
+        help="Number of articles to retrieve (use -1 for all available, streamed to JSONL and resumable)"
     )
     args = parser.parse_args()
 
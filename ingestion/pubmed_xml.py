@@ -0,0 +1,97 @@
+# ingestion/pubmed_xml.py
+
+import xml.etree.ElementTree as ET
+
+# === 1. Stream PubmedArticle records out of efetch XML ===
+def iter_pubmed_articles(chunks, deleted=None):
+    """Yield one record per <PubmedArticle> from an iterable of XML chunks.
+
+    The document is walked once with a pull parser; each article is cleared
+    (and detached from the root) as soon as it has been turned into a record,
+    so memory stays flat however large the payload is. PMIDs listed under
+    <DeleteCitation> (update files) are appended to `deleted` if given.
+    """
+    if isinstance(chunks, (str, bytes)):
+        chunks = [chunks]
+
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag == "PubmedArticle":
+                yield article_to_record(elem)
+                elem.clear()
+                root.clear()
+            elif elem.tag == "DeleteCitation":
+                if deleted is not None:
+                    deleted.extend(p.text.strip() for p in elem.findall("PMID") if p.text)
+                root.clear()
+    parser.close()
+
+# === 2. Turn one <PubmedArticle> element into our record dict ===
+def article_to_record(article):
+    citation = article.find("MedlineCitation")
+    art = citation.find("Article")
+    journal = art.find("Journal")
+    sections = abstract_sections(art.find("Abstract"))
+
+    return {
+        "pmid": citation.findtext("PMID", "").strip(),
+        "title": _text(art.find("ArticleTitle")),
+        "journal": journal.findtext("Title", "") if journal is not None else "",
+        "pubdate": _pubdate(journal.find("JournalIssue/PubDate") if journal is not None else None),
+        "authors": [name for name in (_author_name(a) for a in art.findall("AuthorList/Author")) if name],
+        "abstract": " ".join(s["text"] for s in sections if s["text"]),
+        "abstract_sections": sections,
+        "doi": _doi(article),
+    }
+
+def abstract_sections(abstract):
+    # Structured abstracts carry Label/NlmCategory (BACKGROUND, METHODS, ...)
+    if abstract is None:
+        return []
+    return [
+        {
+            "label": t.get("Label", ""),
+            "category": t.get("NlmCategory", ""),
+            "text": _text(t),
+        }
+        for t in abstract.findall("AbstractText")
+    ]
+
+def _text(elem):
+    return "".join(elem.itertext()).strip() if elem is not None else ""
+
+def _pubdate(elem):
+    # Same "2024 Jan 15" shape esummary used to return
+    if elem is None:
+        return ""
+    medline = elem.findtext("MedlineDate")
+    if medline:
+        return medline
+    parts = [elem.findtext(tag) for tag in ("Year", "Month", "Day")]
+    return " ".join(p for p in parts if p)
+
+def _author_name(author):
+    # esummary style: "Smith J"; consortia keep their collective name
+    collective = author.findtext("CollectiveName")
+    if collective:
+        return collective
+    last = author.findtext("LastName", "")
+    initials = author.findtext("Initials", "")
+    return f"{last} {initials}".strip()
+
+def _doi(article):
+    # PubmedData carries the canonical id list; ELocationID is the fallback
+    for elem in article.findall("PubmedData/ArticleIdList/ArticleId"):
+        if elem.get("IdType") == "doi" and elem.text:
+            return elem.text.strip()
+    for elem in article.findall("MedlineCitation/Article/ELocationID"):
+        if elem.get("EIdType") == "doi" and elem.text:
+            return elem.text.strip()
+    return ""
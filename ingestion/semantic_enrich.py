@@ -0,0 +1,137 @@
+# ingestion/semantic_enrich.py
+#
+# Adds Semantic Scholar data (citation counts, open-access PDF, fields of
+# study) to records we already have, via the batch paper endpoint: up to
+# BATCH_SIZE PMIDs/DOIs/arXiv ids per POST instead of one search per paper.
+# Results are written back into the article store under record["s2"], so a
+# record is only looked up again once ENRICH_TTL has passed.
+#
+#   python -m ingestion.semantic_enrich --query "sepsis machine learning" --max_results 1000
+#   python -m ingestion.semantic_enrich --stored        # everything in the store
+
+import argparse
+import time
+
+from tqdm import tqdm
+
+from ingestion.dedup import short_arxiv_id
+from ingestion.semantic_ingestor import S2_API_URL, parse_paper, s2_request
+from storage.article_store import get_store
+from utils import metrics
+
+BATCH_URL = f"{S2_API_URL}/paper/batch"
+BATCH_SIZE = 500             # the batch endpoint's per-request maximum
+ENRICH_TTL = 7 * 24 * 3600   # citation counts move; look again after a week
+BATCH_FIELDS = ",".join([
+    "paperId", "title", "abstract", "authors", "year", "venue", "url", "externalIds",
+    "citationCount", "influentialCitationCount", "isOpenAccess", "openAccessPdf", "fieldsOfStudy"
+])
+ID_KEYS = {"pubmed": "pmid", "arxiv": "id"}
+
+# === 1. Lookup ids ===
+def lookup_id(source, record):
+    # PMID first: S2 resolves it more reliably than the DOI PubMed carries
+    if source == "pubmed" and record.get("pmid"):
+        return f"PMID:{record['pmid']}"
+    if source == "arxiv" and record.get("id"):
+        return f"ARXIV:{short_arxiv_id(record['id'])}"
+    if record.get("doi"):
+        return f"DOI:{record['doi']}"
+    return None
+
+def needs_enrichment(record, now=None):
+    s2 = record.get("s2")
+    return not s2 or s2.get("enriched_at", 0) < (now or time.time()) - ENRICH_TTL
+
+# === 2. Batch lookup ===
+def fetch_paper_batch(ids):
+    """Papers for up to BATCH_SIZE ids, in order; None where S2 has no match."""
+    response = s2_request("POST", BATCH_URL, params={"fields": BATCH_FIELDS}, json={"ids": list(ids)})
+    papers = response.json()
+    if len(papers) != len(ids):
+        raise ValueError(f"Semantic Scholar returned {len(papers)} papers for {len(ids)} ids")
+    return papers
+
+def s2_summary(paper, now):
+    if paper is None:
+        # Remember the miss too, so it is not asked for again every run
+        return {"found": False, "enriched_at": now}
+    return {
+        "found": True,
+        "paper_id": paper.get("paperId"),
+        "citation_count": paper.get("citationCount") or 0,
+        "influential_citation_count": paper.get("influentialCitationCount") or 0,
+        "is_open_access": bool(paper.get("isOpenAccess")),
+        "open_access_pdf": (paper.get("openAccessPdf") or {}).get("url"),
+        "fields_of_study": paper.get("fieldsOfStudy") or [],
+        "enriched_at": now,
+    }
+
+# === 3. Enrich records ===
+@metrics.timed("enrich")
+def enrich_records(records, source="pubmed", force=False, batch_size=BATCH_SIZE, progress=False):
+    """Set record["s2"] on every record (in place) and store the results.
+
+    Records enriched within ENRICH_TTL are left alone unless `force`.
+    Returns {"looked_up", "found", "skipped"}.
+    """
+    store = get_store()
+    id_key = ID_KEYS[source]
+    now = time.time()
+    todo = [(lookup_id(source, r), r) for r in records if force or needs_enrichment(r, now)]
+    todo = [(lookup, r) for lookup, r in todo if lookup]
+    stats = {"looked_up": 0, "found": 0, "skipped": len(records) - len(todo)}
+
+    bar = tqdm(total=len(todo), desc="Enriching from Semantic Scholar", disable=not progress)
+    for i in range(0, len(todo), batch_size):
+        batch = todo[i:i + batch_size]
+        papers = fetch_paper_batch([lookup for lookup, _ in batch])
+        now = time.time()
+        for (_, record), paper in zip(batch, papers):
+            record["s2"] = s2_summary(paper, now)
+        found = [parse_paper(p) for p in papers if p]
+        # Only "s2" is new: the record itself wasn't refetched, so its
+        # fetched_at (and the article cache TTL) must not move
+        store.put_field(source, [r for _, r in batch], id_key, "s2")
+        store.put_many("semantic", found, "paper_id")
+        stats["looked_up"] += len(batch)
+        stats["found"] += len(found)
+        bar.update(len(batch))
+    bar.close()
+    return stats
+
+def iter_stored(source, chunk=BATCH_SIZE * 4):
+    # Ids up front: enriching rewrites the rows a live cursor would be reading
+    conn = get_store().conn
+    ids = [r[0] for r in conn.execute("SELECT source_id FROM articles WHERE source = ?", (source,))]
+    for i in range(0, len(ids), chunk):
+        records = [get_store().get_record(source, sid) for sid in ids[i:i + chunk]]
+        yield [r for r in records if r]
+
+# === 4. CLI ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add Semantic Scholar citations / OA links to stored articles")
+    parser.add_argument("--query", type=str, default=None, help="Fetch these PubMed results, then enrich them")
+    parser.add_argument("--max_results", type=int, default=100)
+    parser.add_argument("--stored", action="store_true", help="Enrich every stored PubMed and arXiv record")
+    parser.add_argument("--force", action="store_true", help="Ignore the enrichment TTL")
+    args = parser.parse_args()
+
+    if args.query:
+        from ingestion.pubmed_ingestor import fetch_pubmed_results
+        articles = fetch_pubmed_results(args.query, args.max_results)
+        stats = enrich_records(articles, force=args.force, progress=True)
+        print(f"✅ {stats['found']}/{stats['looked_up']} found on Semantic Scholar "
+              f"({stats['skipped']} already enriched)")
+        cited = sorted(articles, key=lambda a: (a.get("s2") or {}).get("citation_count", 0), reverse=True)
+        for a in cited[:10]:
+            print(f"  {(a.get('s2') or {}).get('citation_count', 0):>6}  {a['title'][:90]}")
+    elif args.stored:
+        for source in ID_KEYS:
+            totals = {"looked_up": 0, "found": 0, "skipped": 0}
+            for records in iter_stored(source):
+                for key, value in enrich_records(records, source, args.force, progress=True).items():
+                    totals[key] += value
+            print(f"✅ {source}: {totals['found']}/{totals['looked_up']} found ({totals['skipped']} fresh)")
+    else:
+        parser.error("--query or --stored is required")
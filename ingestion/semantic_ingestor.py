@@ -2,41 +2,94 @@
 
 import os
 import json
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from tqdm import tqdm
-
-BASE_URL = "https://api.semanticscholar.org/graph/v1/paper/search"
+from storage.article_store import get_store
+from ingestion.async_http import request as async_request
+from utils.rate_limit import AdaptiveRateLimiter, AsyncRateLimiter
+from utils import metrics
+
+S2_API_URL = os.getenv("S2_API_URL", "https://api.semanticscholar.org/graph/v1")
+BASE_URL = os.getenv("S2_SEARCH_URL", f"{S2_API_URL}/paper/search")
+S2_API_KEY = os.getenv("S2_API_KEY")
+MAX_RETRIES = 6
+
+# Semantic Scholar's shared pool allows roughly 1 request/s per key
+# (S2_RATE_LIMIT overrides this, e.g. for local stand-in servers)
+S2_RATE = float(os.getenv("S2_RATE_LIMIT", "1"))
+limiter = AdaptiveRateLimiter(S2_RATE)
+async_limiter = AsyncRateLimiter(limiter)  # same budget and 429 backoff as s2_request
 FIELDS = ",".join([
     "paperId", "title", "abstract", "authors", "year", "venue", "url",
     "citationCount", "isOpenAccess", "openAccessPdf", "externalIds", "fieldsOfStudy"
 ])
 
-def search_semantic_scholar(query, max_results=20, fields_of_study=None, pub_type=None):
-    headers = {
-        "x-api-key": "YOUR_API_KEY_HERE",
-        "User-Agent": "LiteratureReviewApp/1.0"
+_session = None
+
+def s2_headers():
+    headers = {"User-Agent": "LiteratureReviewApp/1.0"}
+    if S2_API_KEY:
+        headers["x-api-key"] = S2_API_KEY
+    return headers
+
+# === 0. Shared HTTP session ===
+def get_session():
+    global _session
+    if _session is None:
+        # Connection errors only; 429/5xx go through s2_request so the
+        # shared limiter hears about them
+        retry = Retry(total=3, connect=3, read=0, status=0, backoff_factor=1,
+                      respect_retry_after_header=False, raise_on_status=False)
+        adapter = HTTPAdapter(max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(s2_headers())
+        _session = session
+    return _session
+
+def s2_request(method, url, **kwargs):
+    """Rate-limited request; on 429/5xx backs off (honouring Retry-After) and retries."""
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.wait()
+        response = get_session().request(method, url, timeout=60, **kwargs)
+        metrics.record_response("semantic", response)
+        if response.status_code in (429, 500, 502, 503, 504) and attempt < MAX_RETRIES:
+            metrics.UPSTREAM_RETRIES.inc(source="semantic", reason=metrics.retry_reason(response.status_code))
+            retry_after = response.headers.get("Retry-After")
+            limiter.backoff(float(retry_after) if retry_after and retry_after.isdigit() else None)
+            continue
+        if response.status_code != 200:
+            raise requests.HTTPError(
+                f"Semantic Scholar API error: {response.status_code} - {response.text[:200]}", response=response)
+        limiter.success()
+        return response
+
+def s2_params(query, limit, offset, fields_of_study=None, pub_type=None):
+    params = {
+        "query": query,
+        "limit": limit,
+        "offset": offset,
+        "fields": FIELDS
     }
+    if fields_of_study:
+        params["fieldsOfStudy"] = fields_of_study
+    if pub_type:
+        params["publicationTypes"] = pub_type
+    return params
 
+def search_semantic_scholar(query, max_results=20, fields_of_study=None, pub_type=None):
     results = []
     offset = 0
     page_size = min(max_results, 100)  
 
     while len(results) < max_results:
-        params = {
-            "query": query,
-            "limit": page_size,
-            "offset": offset,
-            "fields": FIELDS
-        }
-        if fields_of_study:
-            params["fieldsOfStudy"] = fields_of_study
-        if pub_type:
-            params["publicationTypes"] = pub_type
-
-        response = requests.get(BASE_URL, headers=headers, params=params)
-        if response.status_code != 200:
-            raise Exception(f"Semantic Scholar API error: {response.status_code} - {response.text}")
+        params = s2_params(query, page_size, offset, fields_of_study, pub_type)
 
+        response = s2_request("GET", BASE_URL, params=params)
         batch = response.json().get("data", [])
         if not batch:
             print("No more results found.")
@@ -47,22 +100,65 @@ def search_semantic_scholar(query, max_results=20, fields_of_study=None, pub_typ
 
     return results[:max_results]
 
+@metrics.timed("search_semantic")
+async def async_search_semantic_scholar(query, max_results=20, fields_of_study=None, pub_type=None):
+    results = []
+    offset = 0
+    page_size = min(max_results, 100)
+    while len(results) < max_results:
+        response = await async_request("GET", BASE_URL, limiter=async_limiter, source="semantic",
+                                       headers=s2_headers(),
+                                       params=s2_params(query, page_size, offset, fields_of_study, pub_type))
+        batch = response.json().get("data", [])
+        if not batch:
+            break
+        results.extend(batch)
+        offset += page_size
+    return results[:max_results]
+
+async def async_fetch_semantic_results(query, max_results=20, fields_of_study=None, pub_type=None):
+    raw_results = await async_search_semantic_scholar(query, max_results, fields_of_study, pub_type)
+    parsed = [parse_paper(p) for p in raw_results]
+    await asyncio.to_thread(get_store().put_many, "semantic", parsed, "paper_id")
+    return parsed
+
 def parse_paper(paper):
+    # Pure: callers store batches with put_many
     return {
         "paper_id": paper.get("paperId"),
         "title": paper.get("title", ""),
         "abstract": paper.get("abstract", ""),
-        "authors": [author.get("name") for author in paper.get("authors", [])],
+        "authors": [author.get("name") for author in paper.get("authors") or []],
         "year": paper.get("year"),
         "venue": paper.get("venue"),
         "url": paper.get("url"),
         "citation_count": paper.get("citationCount", 0),
         "is_open_access": paper.get("isOpenAccess", False),
-        "open_access_pdf": paper.get("openAccessPdf", {}).get("url"),
-        "external_ids": paper.get("externalIds", {}),
-        "fields_of_study": paper.get("fieldsOfStudy", [])
+        "open_access_pdf": (paper.get("openAccessPdf") or {}).get("url"),
+        "external_ids": paper.get("externalIds") or {},
+        "fields_of_study": paper.get("fieldsOfStudy") or []
     }
 
+@metrics.timed("search_semantic")
+def fetch_semantic_results(query, max_results=20, fields_of_study=None, pub_type=None, use_cache=True):
+    # Search hits already carry full paper data; reuse them while fresh
+    store = get_store() if use_cache else None
+    cache_key = f"{query}|{fields_of_study or ''}|{pub_type or ''}"
+    if store:
+        ids = store.get_search("semantic", cache_key, max_results)
+        if ids is not None:
+            cached = store.get_fresh("semantic", ids)
+            if len(cached) == len(ids):
+                return [cached[i] for i in ids]
+
+    raw_results = search_semantic_scholar(query, max_results, fields_of_study, pub_type)
+    parsed = [parse_paper(p) for p in tqdm(raw_results)]
+    if store:
+        store.put_many("semantic", parsed, "paper_id")
+        store.put_search("semantic", cache_key, [p["paper_id"] for p in parsed if p["paper_id"]],
+                         exhausted=len(parsed) < max_results)
+    return parsed
+
 def save_results(query, papers):
     os.makedirs("data/raw", exist_ok=True)
     filename = f"semantic_{query.replace(' ', '_')}.json"
@@ -72,13 +168,12 @@ def save_results(query, papers):
     print(f"Saved {len(papers)} papers to {file_path}")
 
 def run(query, max_results, field, pub_type):
-    raw_results = search_semantic_scholar(
+    parsed = fetch_semantic_results(
         query=query,
         max_results=max_results,
         fields_of_study=field,
         pub_type=pub_type
     )
-    parsed = [parse_paper(p) for p in tqdm(raw_results)]
     save_results(query, parsed)
 
 if __name__ == "__main__":
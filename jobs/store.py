@@ -0,0 +1,332 @@
+# jobs/store.py
+#
+# Persistent job state. SQLite by default (no broker needed); set
+# JOB_BACKEND=redis (and REDIS_URL) to share jobs across machines.
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "data/jobs.db")
+JOB_BACKEND = os.getenv("JOB_BACKEND", "sqlite")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+# A running job whose owner hasn't heartbeaten for this long is presumed
+# dead (crashed or killed worker) and goes back to the queue
+STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "60"))  # seconds
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id               TEXT PRIMARY KEY,
+    params           TEXT NOT NULL,
+    status           TEXT NOT NULL,
+    step             TEXT,
+    state            TEXT NOT NULL,
+    error            TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result_count     INTEGER NOT NULL DEFAULT 0,
+    created_at       REAL NOT NULL,
+    updated_at       REAL NOT NULL,
+    owner            TEXT,
+    heartbeat        REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    seq    INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+# Columns added after the first release, for stores created before them
+MIGRATIONS = (("owner", "TEXT"), ("heartbeat", "REAL"))
+
+def new_owner():
+    """Id for one worker pool: host + pid + a random suffix."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def _job_row(row):
+    keys = ("id", "params", "status", "step", "state", "error", "cancel_requested", "result_count",
+            "created_at", "updated_at", "owner", "heartbeat")
+    job = dict(zip(keys, row))
+    job["params"] = json.loads(job["params"])
+    job["state"] = json.loads(job["state"])
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
+
+class JobStore:
+    """SQLite job store. `state` is the per-step checkpoint a job resumes from."""
+
+    def __init__(self, path=JOB_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        with self.conn:
+            for name, kind in MIGRATIONS:
+                if name not in columns:
+                    self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, params):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO jobs (id, params, status, state, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(params), QUEUED, "{}", now, now),
+            )
+        return job_id
+
+    def get(self, job_id):
+        row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job_row(row) if row else None
+
+    def claim_next(self, owner):
+        """Oldest queued job -> running, owned by `owner`; None when the queue is empty.
+
+        The UPDATE only matches a job that is still queued, so when workers in
+        several processes race for the same job exactly one of them gets
+        rowcount 1 and the others move on to the next job.
+        """
+        while True:
+            row = self.conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            with self.conn:
+                claimed = self.conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, heartbeat = ?, updated_at = ? WHERE id = ? AND status = ?",
+                    (RUNNING, owner, now, now, row[0], QUEUED),
+                ).rowcount
+            if claimed:
+                return self.get(row[0])
+
+    def heartbeat(self, job_ids, owner):
+        """Mark `owner`'s running jobs alive."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE jobs SET heartbeat = ? WHERE id = ? AND owner = ? AND status = ?",
+                [(time.time(), job_id, owner, RUNNING) for job_id in job_ids],
+            )
+
+    def update(self, job_id, owner=None, **fields):
+        """Set fields on a job. With `owner`, only while that worker still
+        runs it; returns False when the job was requeued or taken over."""
+        if "state" in fields:
+            fields["state"] = json.dumps(fields["state"])
+        fields["updated_at"] = time.time()
+        where, args = "id = ?", [job_id]
+        if owner is not None:
+            where, args = "id = ? AND owner = ? AND status = ?", [job_id, owner, RUNNING]
+        with self.conn:
+            return self.conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE {where}",
+                [*fields.values(), *args],
+            ).rowcount > 0
+
+    def append_results(self, job_id, records, state, owner):
+        """Append records and move the checkpoint in one transaction, so a
+        crash can never leave results without the matching checkpoint.
+
+        Only `owner` may append while it runs the job: returns False (and
+        writes nothing) once the job has been requeued or claimed by another
+        worker, so a stalled worker can't interleave rows with its successor.
+        """
+        with self.conn:
+            # The UPDATE takes the write lock before result_count is read back
+            moved = self.conn.execute(
+                "UPDATE jobs SET result_count = result_count + ?, state = ?, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = ?",
+                (len(records), json.dumps(state), time.time(), job_id, owner, RUNNING),
+            ).rowcount
+            if not moved:
+                return False
+            count = self.conn.execute("SELECT result_count FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            start = count - len(records)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO job_results (job_id, seq, record) VALUES (?, ?, ?)",
+                [(job_id, start + i, json.dumps(r)) for i, r in enumerate(records)],
+            )
+        return True
+
+    def get_results(self, job_id, offset=0, limit=100):
+        rows = self.conn.execute(
+            "SELECT record FROM job_results WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+            (job_id, offset, limit),
+        )
+        return [json.loads(r[0]) for r in rows]
+
+    def iter_results(self, job_id, page=1000):
+        offset = 0
+        while True:
+            records = self.get_results(job_id, offset, page)
+            if not records:
+                return
+            yield from records
+            offset += len(records)
+
+    def request_cancel(self, job_id):
+        with self.conn:
+            self.conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            # A job nobody has picked up yet can be cancelled right away
+            self.conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                              (CANCELLED, time.time(), job_id, QUEUED))
+
+    def requeue_stale(self, stale_after=STALE_AFTER):
+        # Jobs whose worker died mid-run go back to the queue and resume from
+        # their checkpoint; jobs other live workers are running are left alone
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL WHERE status = ? AND (heartbeat IS NULL OR heartbeat < ?)",
+                (QUEUED, RUNNING, time.time() - stale_after),
+            ).rowcount
+
+class RedisJobStore:
+    """Same interface as JobStore, backed by Redis (optional `redis` package)."""
+
+    def __init__(self, url=REDIS_URL):
+        import redis  # optional dependency, only needed for this backend
+
+        self.r = redis.Redis.from_url(url, decode_responses=True)
+        self._watch_error = redis.WatchError
+
+    def _key(self, job_id, suffix=""):
+        return f"litjob:{job_id}{suffix}"
+
+    def create(self, params):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self.r.hset(self._key(job_id), mapping={
+            "id": job_id, "params": json.dumps(params), "status": QUEUED, "step": "", "state": "{}",
+            "error": "", "cancel_requested": 0, "result_count": 0, "created_at": now, "updated_at": now,
+            "owner": "", "heartbeat": "",
+        })
+        self.r.sadd("litjob:all", job_id)
+        self.r.rpush("litjob:queue", job_id)
+        return job_id
+
+    def get(self, job_id):
+        data = self.r.hgetall(self._key(job_id))
+        if not data:
+            return None
+        data["params"] = json.loads(data["params"])
+        data["state"] = json.loads(data["state"])
+        data["cancel_requested"] = data["cancel_requested"] == "1"
+        data["result_count"] = int(data["result_count"])
+        data["step"] = data["step"] or None
+        data["error"] = data["error"] or None
+        data["owner"] = data.get("owner") or None
+        data["heartbeat"] = float(data["heartbeat"]) if data.get("heartbeat") else None
+        return data
+
+    def claim_next(self, owner):
+        # LPOP hands each queued id to exactly one worker
+        while True:
+            job_id = self.r.lpop("litjob:queue")
+            if job_id is None:
+                return None
+            # Skip jobs cancelled while queued
+            if self.r.hget(self._key(job_id), "status") == QUEUED:
+                now = time.time()
+                self.r.hset(self._key(job_id), mapping={"status": RUNNING, "owner": owner, "heartbeat": now,
+                                                         "updated_at": now})
+                return self.get(job_id)
+
+    def heartbeat(self, job_ids, owner):
+        for job_id in job_ids:
+            if self.r.hget(self._key(job_id), "owner") == owner:
+                self.r.hset(self._key(job_id), "heartbeat", time.time())
+
+    def _owned_write(self, job_id, owner, write):
+        # WATCH the job hash so the owner check and the write are one
+        # transaction; a concurrent change to the job (a heartbeat, a
+        # requeue) aborts it and the check runs again
+        key = self._key(job_id)
+        with self.r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    if pipe.hmget(key, "owner", "status") != [owner, RUNNING]:
+                        return False
+                    pipe.multi()
+                    write(pipe)
+                    pipe.execute()
+                    return True
+                except self._watch_error:
+                    continue
+
+    def update(self, job_id, owner=None, **fields):
+        if "state" in fields:
+            fields["state"] = json.dumps(fields["state"])
+        fields["updated_at"] = time.time()
+        mapping = {k: "" if v is None else v for k, v in fields.items()}
+        if owner is not None:
+            return self._owned_write(job_id, owner, lambda pipe: pipe.hset(self._key(job_id), mapping=mapping))
+        self.r.hset(self._key(job_id), mapping=mapping)
+        return True
+
+    def append_results(self, job_id, records, state, owner):
+        def write(pipe):
+            if records:
+                pipe.rpush(self._key(job_id, ":results"), *(json.dumps(r) for r in records))
+            pipe.hincrby(self._key(job_id), "result_count", len(records))
+            pipe.hset(self._key(job_id), mapping={"state": json.dumps(state), "updated_at": time.time()})
+        return self._owned_write(job_id, owner, write)
+
+    def get_results(self, job_id, offset=0, limit=100):
+        return [json.loads(r) for r in self.r.lrange(self._key(job_id, ":results"), offset, offset + limit - 1)]
+
+    def iter_results(self, job_id, page=1000):
+        offset = 0
+        while True:
+            records = self.get_results(job_id, offset, page)
+            if not records:
+                return
+            yield from records
+            offset += len(records)
+
+    def request_cancel(self, job_id):
+        self.r.hset(self._key(job_id), "cancel_requested", 1)
+        if self.r.hget(self._key(job_id), "status") == QUEUED:
+            self.update(job_id, status=CANCELLED)
+
+    def requeue_stale(self, stale_after=STALE_AFTER):
+        requeued = 0
+        cutoff = time.time() - stale_after
+        for job_id in self.r.smembers("litjob:all"):
+            status, heartbeat = self.r.hmget(self._key(job_id), "status", "heartbeat")
+            if status == RUNNING and float(heartbeat or 0) < cutoff:
+                self.r.hset(self._key(job_id), mapping={"status": QUEUED, "owner": "", "updated_at": time.time()})
+                self.r.rpush("litjob:queue", job_id)
+                requeued += 1
+        return requeued
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_job_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RedisJobStore() if JOB_BACKEND == "redis" else JobStore()
+    return _store
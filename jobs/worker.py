@@ -0,0 +1,156 @@
+# jobs/worker.py
+#
+# Local worker pool for large literature pulls. Each job runs the main.py
+# pipeline as resumable steps:
+#   fetch     - esearch history + efetch windows, filter, append results
+#   summarize - incremental map-reduce review over the stored results
+# Progress is checkpointed in the job store after every window, so a job
+# interrupted by a restart continues where it stopped.
+#
+#   python -m jobs.worker --workers 4      # run workers without the API
+
+import argparse
+import threading
+import time
+
+from ingestion.pubmed_ingestor import iter_history_windows
+from jobs.store import get_job_store, new_owner, STALE_AFTER, SUCCEEDED, FAILED, CANCELLED
+from utils.stats_matcher import default_matcher
+
+POLL_INTERVAL = 1.0  # seconds between queue polls when idle
+HEARTBEAT_INTERVAL = STALE_AFTER / 4  # well inside the stale window, so a slow tick isn't fatal
+
+class JobCancelled(Exception):
+    pass
+
+class JobLost(Exception):
+    """The job was requeued (we missed heartbeats) and may be running
+    elsewhere; this worker must stop without writing to it again."""
+
+# === 1. Pipeline steps ===
+def step_fetch(store, job_id, owner, params, state):
+    # state["history"] pins the esearch result set that retstart indexes
+    for next_start, count, records in iter_history_windows(
+        params["query"], start=state.get("retstart", 0), limit=params.get("max_results", -1),
+        history=state.setdefault("history", {}),
+    ):
+        if store.get(job_id)["cancel_requested"]:
+            raise JobCancelled()
+        kept = list(default_matcher.filter_records(records)) if params.get("filter_stats", True) else records
+        state.update(retstart=next_start, total=count, fetched=next_start)
+        if not store.append_results(job_id, kept, state, owner):
+            raise JobLost()
+    state["fetch_done"] = True
+    if not store.update(job_id, owner, state=state):
+        raise JobLost()
+
+def step_summarize(store, job_id, owner, params, state):
+    from summarization.map_reduce import build_review
+
+    if store.get(job_id)["cancel_requested"]:
+        raise JobCancelled()
+    # Already-summarized chunks come back from the summary node store, so a
+    # restarted job only pays for what it had not finished
+    result = build_review(list(store.iter_results(job_id)))
+    state.update(
+        summary=result["review"],
+        summary_calls=result["llm_calls"],
+        summary_failures=result["failures"],
+        summary_missing_ids=result["missing_ids"],
+        summarize_done=True,
+    )
+    if not store.update(job_id, owner, state=state):
+        raise JobLost()
+
+def run_job(store, job):
+    job_id, owner, params, state = job["id"], job["owner"], job["params"], job["state"]
+    if not state.get("fetch_done"):
+        if not store.update(job_id, owner, step="fetch"):
+            raise JobLost()
+        step_fetch(store, job_id, owner, params, state)
+    if params.get("summarize") and not state.get("summarize_done"):
+        if not store.update(job_id, owner, step="summarize"):
+            raise JobLost()
+        step_summarize(store, job_id, owner, params, state)
+
+# === 2. Worker pool ===
+class WorkerPool:
+    def __init__(self, store=None, workers=2):
+        self.store = store or get_job_store()
+        self.workers = workers
+        self.owner = new_owner()
+        self._running = set()  # ids of jobs this pool is running
+        self._running_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        # Only jobs whose worker stopped heartbeating; other pools sharing the
+        # store keep theirs
+        self._requeue_stale()
+        targets = [(self._loop, f"job-worker-{i}") for i in range(self.workers)]
+        targets.append((self._heartbeat_loop, "job-heartbeat"))
+        for target, name in targets:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _requeue_stale(self):
+        requeued = self.store.requeue_stale()
+        if requeued:
+            print(f"↩️  Resuming {requeued} interrupted jobs")
+
+    def _heartbeat_loop(self):
+        # Keep our jobs alive, and pick up the ones a crashed pool left behind
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            with self._running_lock:
+                running = list(self._running)
+            try:
+                if running:
+                    self.store.heartbeat(running, self.owner)
+                self._requeue_stale()
+            except Exception as e:
+                print(f"⚠️  Job heartbeat failed: {type(e).__name__}: {e}")
+
+    def stop(self, timeout=5):
+        # Running jobs keep their checkpoint and resume on the next start
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            job = self.store.claim_next(self.owner)
+            if job is None:
+                self._stop.wait(POLL_INTERVAL)
+                continue
+            with self._running_lock:
+                self._running.add(job["id"])
+            # Final statuses are owner-checked too: a job we lost is
+            # somebody else's to finish
+            try:
+                run_job(self.store, job)
+                self.store.update(job["id"], self.owner, status=SUCCEEDED, step=None)
+            except JobLost:
+                print(f"⚠️  Job {job['id']} was requeued while this worker ran it; leaving it to its new owner")
+            except JobCancelled:
+                self.store.update(job["id"], self.owner, status=CANCELLED)
+            except Exception as e:
+                self.store.update(job["id"], self.owner, status=FAILED, error=f"{type(e).__name__}: {e}")
+            finally:
+                with self._running_lock:
+                    self._running.discard(job["id"])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run literature-pull job workers")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    pool = WorkerPool(workers=args.workers)
+    pool.start()
+    print(f"👷 {args.workers} job workers running")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop()
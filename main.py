@@ -3,26 +3,73 @@
 import argparse
 from ingestion.pubmed_ingestor import fetch_pubmed_results
 from utils.filters import abstract_mentions_statistics
-from summarization.summarizer import summarize_articles
-from nlp.query_interpreter import interpret_query
+from summarization.summarizer import summarize_articles, report_failures
+from nlp.query_interpreter import interpret
+from storage.vector_index import rerank
+from ingestion.semantic_enrich import enrich_records
+from nlp.mesh import get_mesh_index
+from utils import metrics
+import cProfile
 import json
+import time
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--prompt", type=str, required=True, help="Natural language search prompt")
     parser.add_argument("--max_results", type=int, default=100, help="Max number of results to fetch")
+    parser.add_argument("--top_k", type=int, default=0,
+                        help="Summarize only the N most relevant articles (default 0: all, most relevant first)")
+    parser.add_argument("--enrich", action="store_true", help="Add Semantic Scholar citation counts / OA links")
+    parser.add_argument("--no_llm", action="store_true", help="Interpret the prompt with the local rules only")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="PROF_FILE",
+                        help="Print a per-stage time breakdown; with a file name, also dump cProfile stats "
+                             "there (open with snakeviz, or flameprof for a flame graph)")
     args = parser.parse_args()
 
-    # Step 1: Interpret user query with LLM
-    print(f"🤖 Interpreting prompt: {args.prompt}\n")
-    interpreted = interpret_query(args.prompt)
+    if args.profile is None:
+        run(args)
+    else:
+        profile(args)
+
+def profile(args):
+    trace = metrics.start_trace()
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
     try:
-        parsed = json.loads(interpreted)
-    except json.JSONDecodeError:
-        print("❌ Failed to parse LLM output as JSON. Response was:")
-        print(interpreted)
+        run(args)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        print("\n⏱️  Stage breakdown:")
+        print(metrics.stage_breakdown(trace, time.perf_counter() - start))
+        report = metrics.upstream_report()
+        if report:
+            print("\n🌐 Upstream:")
+            print(report)
+        if profiler:
+            # cProfile sees the main thread only; fetch batches run in worker threads
+            print(f"\n💾 cProfile stats written to {args.profile}")
+
+def run(args):
+    # Step 1: Interpret user query (local rules, LLM for anything harder)
+    print(f"🤖 Interpreting prompt: {args.prompt}\n")
+    parsed = interpret(args.prompt, use_llm=not args.no_llm)
+    if parsed is None:
+        print("❌ Could not interpret the prompt (LLM unavailable or returned no usable JSON)")
         return
 
+    # Keep only suggested MeSH terms that exist, under their preferred names
+    mesh = get_mesh_index()
+    if mesh and parsed.get("suggested_mesh_terms"):
+        checked = mesh.validate(parsed["suggested_mesh_terms"])
+        dropped = [term for term, name in checked.items() if name is None]
+        if dropped:
+            print(f"⚠️  Not MeSH headings, dropped: {', '.join(dropped)}")
+        parsed["suggested_mesh_terms"] = [name for name in dict.fromkeys(checked.values()) if name]
+
     print("📄 Interpreted Query:")
     print(json.dumps(parsed, indent=2))
 
@@ -32,15 +79,26 @@ def main():
     # Step 2: Fetch from PubMed
     print(f"\n🔍 Searching PubMed for: {pubmed_query}")
     articles = fetch_pubmed_results(pubmed_query, max_results)
+    if args.enrich:
+        stats = enrich_records(articles)
+        print(f"📚 {stats['found']}/{stats['looked_up']} looked up on Semantic Scholar")
 
     # Step 3: Filter for stats relevance
-    filtered = [a for a in articles if abstract_mentions_statistics(a.get("abstract", ""))]
+    with metrics.stage("filter"):
+        filtered = [a for a in articles if abstract_mentions_statistics(a.get("abstract", ""))]
     print(f"✅ {len(filtered)} articles mention statistical analysis")
 
-    # Step 4: Summarize
-    summaries = summarize_articles(filtered)
-    for idx, entry in enumerate(summaries, 1):
-        print(f"\n📝 Summary #{idx}:\n{entry['summary']}")
+    # Step 4: Rerank by similarity to what the user actually asked for
+    ranked = rerank(filtered, parsed.get("user_intent") or args.prompt, top_k=args.top_k or None)
+    if args.top_k:
+        print(f"🎯 Summarizing the {len(ranked)} most relevant")
+
+    # Step 5: Summarize
+    summaries = summarize_articles(ranked)
+    for entry in summaries:
+        if entry["summary"]:
+            print(f"\n📝 Summary #{entry['chunk']}:\n{entry['summary']}")
+    report_failures(summaries)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,100 @@
+# nlp/embedder.py
+#
+# Offline text embeddings: no model download, no network. Words and word
+# pairs are hashed straight into a DIM-dimensional space: each feature
+# lands in HASHES_PER_FEATURE signed slots, a sparse random projection that
+# needs no fitting. Features are weighted by sublinear tf * idf and rows
+# L2-normalized, so cosine similarity is a dot product. Document
+# frequencies live in a hashed table the caller keeps up to date; a row's
+# idf is the one of the moment it was embedded (see storage/vector_index.py).
+
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from hashlib import blake2b
+
+import numpy as np
+
+DIM = int(os.getenv("EMBED_DIM", "384"))
+DF_BITS = 20
+DF_BUCKETS = 1 << DF_BITS # hashed document-frequency table size
+HASHES_PER_FEATURE = 4    # slots per feature; more = less collision noise
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9\-]*[a-z0-9]|[a-z]")
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from had has have in into is it its of on or that the their
+there these this those to was were which while with we our us not no than then also may can
+""".split())
+
+# === 1. Features ===
+def features(text):
+    tokens = [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+    return Counter(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+
+@lru_cache(maxsize=500_000)
+def _feature_hash(feature):
+    # Stable across runs (stored vectors depend on it), unlike hash()
+    return blake2b(feature.encode(), digest_size=8).digest()
+
+# Odd multipliers deriving the df bucket and each slot/sign from one hash
+# (one per slot, so HASHES_PER_FEATURE can go up to 4)
+_MIXERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9,
+                    0xD6E8FEB86659FD93, 0xFF51AFD7ED558CCD], dtype=np.uint64)[:1 + HASHES_PER_FEATURE]
+
+def article_text(source, record):
+    # The text we embed for each ingestor's record shape
+    abstract = record.get("summary") if source == "arxiv" else record.get("abstract")
+    return f"{record.get('title') or ''}. {abstract or ''}"
+
+# === 2. Embedder ===
+class HashingEmbedder:
+    def __init__(self, dim=DIM):
+        self.dim = dim
+
+    def _hashed(self, texts):
+        # (doc index, mixed hashes, tf) per distinct feature of each text
+        doc_ids, hashes, counts = [], [], []
+        for i, text in enumerate(texts):
+            for feature, count in features(text).items():
+                doc_ids.append(i)
+                hashes.append(_feature_hash(feature))
+                counts.append(count)
+        if not hashes:
+            return doc_ids, None, counts
+        return doc_ids, np.frombuffer(b"".join(hashes), dtype=np.uint64)[:, None] * _MIXERS, counts
+
+    def count_df(self, texts, df):
+        """Add the texts' features to df (in place) without embedding them."""
+        _, mixed, _ = self._hashed(texts)
+        if mixed is not None:
+            df += np.bincount((mixed[:, 0] >> np.uint64(64 - DF_BITS)).astype(np.intp),
+                              minlength=DF_BUCKETS).astype(df.dtype)
+
+    def embed(self, texts, df=None, n_docs=0, count_df=False):
+        """float32 matrix (len(texts), dim), rows L2-normalized.
+
+        With count_df, this batch's features are first added to df (in place)
+        so new documents count towards their own idf.
+        """
+        doc_ids, mixed, counts = self._hashed(texts)
+        if mixed is None:
+            return np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        buckets = (mixed[:, 0] >> np.uint64(64 - DF_BITS)).astype(np.intp)
+        slots = ((mixed[:, 1:] >> np.uint64(32)) % np.uint64(self.dim)).astype(np.intp)
+        signs = np.where((mixed[:, 1:] >> np.uint64(31)) & np.uint64(1), 1.0, -1.0)
+
+        if df is not None and count_df:
+            df += np.bincount(buckets, minlength=DF_BUCKETS).astype(df.dtype)
+        weights = (1 + np.log(np.array(counts, dtype=np.float64))) / math.sqrt(HASHES_PER_FEATURE)
+        if df is not None and n_docs:
+            weights *= np.log((1 + n_docs) / (1 + df[buckets].astype(np.float64))) + 1
+
+        flat = np.array(doc_ids, dtype=np.intp)[:, None] * self.dim + slots
+        matrix = np.bincount(flat.ravel(), weights=(signs * weights[:, None]).ravel(),
+                             minlength=len(texts) * self.dim).reshape(len(texts), self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return (matrix / norms).astype(np.float32)
@@ -0,0 +1,277 @@
+# nlp/mesh.py
+#
+# Local MeSH descriptor index: validation, entry-term (synonym) expansion,
+# descendant explosion and prefix autocomplete without an LLM round trip.
+#
+# `build` streams NLM's descriptor XML (desc20XX.xml[.gz] from
+# https://nlmpubs.nlm.nih.gov/projects/mesh/MESH_FILES/xmlmesh/) once into
+# data/mesh/index/: sorted string tables (utf-8 blob + offsets) and int32
+# link arrays saved as .npy. MeshIndex memory-maps them, so opening the
+# index costs milliseconds and lookups are binary searches over the sorted
+# tables:
+#   term  -> descriptor    sorted normalized entry terms (a flat prefix index)
+#   tree  -> descriptor    sorted tree numbers; descendants are a prefix range
+#
+#   python -m nlp.mesh build data/mesh/desc2025.xml.gz
+#   python -m nlp.mesh complete "breast neo"
+#   python -m nlp.mesh expand "Breast Neoplasms" --explode
+
+import argparse
+import gzip
+import json
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from bisect import bisect_left
+
+import numpy as np
+
+INDEX_DIR = os.getenv("MESH_INDEX_DIR", "data/mesh/index")
+MAX_SCAN = 256  # prefix matches ranked per autocomplete call
+UI_RE = re.compile(r"^D\d{6,9}$")
+
+def normalize(term):
+    return " ".join((term or "").casefold().split())
+
+# === 1. Parse the descriptor XML ===
+def iter_descriptors(path):
+    """Yield {ui, name, tree_numbers, entry_terms} per DescriptorRecord."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        for _, elem in ET.iterparse(f, events=("end",)):
+            if elem.tag != "DescriptorRecord":
+                continue
+            name = elem.findtext("DescriptorName/String", "").strip()
+            terms = [t.text.strip() for t in elem.iterfind("ConceptList/Concept/TermList/Term/String") if t.text]
+            yield {
+                "ui": elem.findtext("DescriptorUI", "").strip(),
+                "name": name,
+                "tree_numbers": [t.text.strip() for t in elem.iterfind("TreeNumberList/TreeNumber") if t.text],
+                "entry_terms": list(dict.fromkeys(t for t in terms if t != name)),
+            }
+            elem.clear()
+
+# === 2. Build the on-disk index ===
+def _string_table(strings):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def _links(groups):
+    # Ragged int lists -> (offsets, flat values)
+    offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+    np.cumsum([len(g) for g in groups], out=offsets[1:])
+    return offsets, np.array([v for g in groups for v in g], dtype=np.int32)
+
+def build_index(xml_path, out_dir=INDEX_DIR):
+    descriptors = sorted(iter_descriptors(xml_path), key=lambda d: d["ui"])
+
+    # Every name and entry term, normalized; a term shared by several
+    # descriptors gets one row per descriptor
+    terms = {}
+    for i, d in enumerate(descriptors):
+        for label in [d["name"], *d["entry_terms"]]:
+            terms.setdefault((normalize(label), i), (label, label == d["name"]))
+    term_keys = sorted(terms)
+    desc_terms = [[] for _ in descriptors]
+    for row, key in enumerate(term_keys):
+        desc_terms[key[1]].append(row)
+
+    trees = sorted((t, i) for i, d in enumerate(descriptors) for t in d["tree_numbers"])
+    desc_trees = [[] for _ in descriptors]
+    for row, (_, i) in enumerate(trees):
+        desc_trees[i].append(row)
+
+    arrays = {}
+    for name, strings in (("ui", [d["ui"] for d in descriptors]),
+                          ("name", [d["name"] for d in descriptors]),
+                          ("term", [k[0] for k in term_keys]),
+                          ("term_label", [terms[k][0] for k in term_keys]),
+                          ("tree", [t for t, _ in trees])):
+        arrays[f"{name}_blob"], arrays[f"{name}_off"] = _string_table(strings)
+    arrays["term_desc"] = np.array([k[1] for k in term_keys], dtype=np.int32)
+    arrays["term_preferred"] = np.array([terms[k][1] for k in term_keys], dtype=np.bool_)
+    arrays["tree_desc"] = np.array([i for _, i in trees], dtype=np.int32)
+    arrays["desc_terms_off"], arrays["desc_terms"] = _links(desc_terms)
+    arrays["desc_trees_off"], arrays["desc_trees"] = _links(desc_trees)
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), array)
+    meta = {"source": os.path.basename(xml_path), "built_at": time.time(),
+            "descriptors": len(descriptors), "terms": len(term_keys), "tree_numbers": len(trees)}
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return meta
+
+# === 3. Memory-mapped index ===
+class _Strings:
+    """Sequence view over a utf-8 blob + offsets; sorted tables bisect directly."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def prefix_range(self, prefix):
+        # [lo, hi) of the rows starting with prefix (the table is sorted)
+        if not prefix:
+            return 0, len(self)
+        keys = range(len(self))
+        lo = bisect_left(keys, prefix, key=self.__getitem__)
+        hi = bisect_left(keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo=lo, key=self.__getitem__)
+        return lo, hi
+
+class MeshIndex:
+    def __init__(self, path=INDEX_DIR):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.ui, self.name, self.term, self.term_label, self.tree = (
+            _Strings(load(f"{n}_blob"), load(f"{n}_off")) for n in ("ui", "name", "term", "term_label", "tree")
+        )
+        self.term_desc = load("term_desc")
+        self.term_preferred = load("term_preferred")
+        self.tree_desc = load("tree_desc")
+        self.desc_terms_off, self.desc_terms = load("desc_terms_off"), load("desc_terms")
+        self.desc_trees_off, self.desc_trees = load("desc_trees_off"), load("desc_trees")
+
+    def __len__(self):
+        return len(self.ui)
+
+    # --- lookup ---
+    def find(self, term):
+        """Descriptor index for a name, entry term or UI; None if not MeSH."""
+        if UI_RE.match(term or ""):
+            i = bisect_left(range(len(self.ui)), term, key=self.ui.__getitem__)
+            return i if i < len(self.ui) and self.ui[i] == term else None
+        key = normalize(term)
+        row = bisect_left(range(len(self.term)), key, key=self.term.__getitem__) if key else len(self.term)
+        matches = []
+        while row < len(self.term) and self.term[row] == key:
+            matches.append(row)
+            row += 1
+        if not matches:
+            return None
+        # Prefer the descriptor this is the preferred name of
+        return int(self.term_desc[max(matches, key=lambda r: self.term_preferred[r])])
+
+    def validate(self, terms):
+        """Map each term to its descriptor's preferred name (None if unknown)."""
+        found = {}
+        for term in terms:
+            i = self.find(term)
+            found[term] = self.name[i] if i is not None else None
+        return found
+
+    def complete(self, prefix, limit=10):
+        """Descriptors with a name or entry term starting with `prefix`."""
+        key = normalize(prefix)
+        if not key:
+            return []
+        lo, hi = self.term.prefix_range(key)
+        candidates = {}
+        for row in range(lo, min(hi, lo + MAX_SCAN)):
+            i = int(self.term_desc[row])
+            label = self.term_label[row]
+            rank = (self.term[row] != key, not self.term_preferred[row], len(label))
+            if i not in candidates or rank < candidates[i][0]:
+                candidates[i] = (rank, label)
+        ranked = sorted(candidates.items(), key=lambda item: item[1][0])[:limit]
+        return [{"ui": self.ui[i], "name": self.name[i], "match": label} for i, (_, label) in ranked]
+
+    # --- expansion ---
+    def entry_terms(self, i):
+        rows = self.desc_terms[self.desc_terms_off[i]:self.desc_terms_off[i + 1]]
+        return [self.term_label[int(r)] for r in rows if not self.term_preferred[r]]
+
+    def tree_numbers(self, i):
+        rows = self.desc_trees[self.desc_trees_off[i]:self.desc_trees_off[i + 1]]
+        return [self.tree[int(r)] for r in rows]
+
+    def explode(self, i, max_depth=None):
+        """Indexes of every descriptor below i in any of its trees."""
+        found = []
+        for number in self.tree_numbers(i):
+            lo, hi = self.tree.prefix_range(number + ".")
+            depth = number.count(".")
+            for row in range(lo, hi):
+                if max_depth is None or self.tree[row].count(".") - depth <= max_depth:
+                    found.append(int(self.tree_desc[row]))
+        return [d for d in dict.fromkeys(found) if d != i]
+
+    def descriptor(self, i, explode=False, max_depth=None):
+        result = {"ui": self.ui[i], "name": self.name[i],
+                  "tree_numbers": self.tree_numbers(i), "entry_terms": self.entry_terms(i)}
+        if explode:
+            result["narrower"] = [self.name[d] for d in self.explode(i, max_depth)]
+        return result
+
+    def pubmed_clause(self, term, synonyms=True):
+        """PubMed query fragment for a term: its MeSH heading (PubMed explodes
+        [Mesh] itself) OR'ed with its entry terms as title/abstract words."""
+        i = self.find(term)
+        if i is None:
+            return f'"{term}"[tiab]'
+        parts = [f'"{self.name[i]}"[Mesh]']
+        if synonyms:
+            parts += [f'"{t}"[tiab]' for t in self.entry_terms(i) if "," not in t]
+        return "(" + " OR ".join(parts) + ")" if len(parts) > 1 else parts[0]
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_mesh_index():
+    """The prebuilt index, opened once; None when it hasn't been built."""
+    global _index
+    with _index_lock:
+        if _index is None and os.path.exists(os.path.join(INDEX_DIR, "meta.json")):
+            _index = MeshIndex()
+    return _index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local MeSH descriptor index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="Build the index from desc20XX.xml[.gz]")
+    build_cmd.add_argument("xml_path")
+    build_cmd.add_argument("--out", default=INDEX_DIR)
+    complete_cmd = sub.add_parser("complete", help="Autocomplete a prefix")
+    complete_cmd.add_argument("prefix")
+    complete_cmd.add_argument("--limit", type=int, default=10)
+    expand_cmd = sub.add_parser("expand", help="Show a descriptor's entry terms and tree")
+    expand_cmd.add_argument("term")
+    expand_cmd.add_argument("--explode", action="store_true", help="Also list narrower descriptors")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        meta = build_index(args.xml_path, args.out)
+        print(f"✅ {meta['descriptors']} descriptors, {meta['terms']} terms, {meta['tree_numbers']} tree numbers "
+              f"indexed in {time.perf_counter() - start:.1f}s -> {args.out}")
+    else:
+        index = get_mesh_index()
+        if index is None:
+            raise SystemExit(f"❌ No MeSH index in {INDEX_DIR}; run `python -m nlp.mesh build desc20XX.xml` first")
+        if args.command == "complete":
+            start = time.perf_counter()
+            suggestions = index.complete(args.prefix, args.limit)
+            elapsed = (time.perf_counter() - start) * 1000
+            for s in suggestions:
+                print(f"  {s['ui']}  {s['name']}" + (f"  (via {s['match']})" if s["match"] != s["name"] else ""))
+            print(f"⏱️  {elapsed:.2f} ms")
+        else:
+            i = index.find(args.term)
+            if i is None:
+                raise SystemExit(f"❌ '{args.term}' is not a MeSH heading or entry term")
+            print(json.dumps(index.descriptor(i, explode=args.explode), indent=2))
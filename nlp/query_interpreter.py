@@ -1,13 +1,19 @@
 # query_interpreter.py
 
 import openai
+import json
 import os
+import re
+import time
 from dotenv import load_dotenv
+from utils.llm_cache import chat_completion, achat_completion
+from utils.metrics import Counter, Histogram, timed
+from nlp.rule_interpreter import interpret_rules
 
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-def interpret_query(user_input):
+def build_messages(user_input):
     prompt = f"""
 You are a biomedical research assistant. Your job is to convert user research prompts into structured search instructions for a PubMed-based literature review tool.
 
@@ -24,16 +30,31 @@ Break it down into the following fields:
 Respond with a JSON object.
 """
 
-    messages = [
+    return [
         {"role": "system", "content": "You are a biomedical NLP assistant."},
         {"role": "user", "content": prompt}
     ]
 
+def interpret_query(user_input):
+    try:
+        response = chat_completion(
+            model="gpt-4",
+            messages=build_messages(user_input),
+            temperature=0,  # deterministic, so it can be served from the LLM cache
+            max_tokens=400
+        )
+        return response['choices'][0]['message']['content']
+    except Exception as e:
+        print("❌ LLM query interpretation failed:", e)
+        return None
+
+async def ainterpret_query(user_input):
+    # Same as interpret_query, without blocking the event loop
     try:
-        response = openai.ChatCompletion.create(
+        response = await achat_completion(
             model="gpt-4",
-            messages=messages,
-            temperature=0.3,
+            messages=build_messages(user_input),
+            temperature=0,
             max_tokens=400
         )
         return response['choices'][0]['message']['content']
@@ -41,6 +62,66 @@ Respond with a JSON object.
         print("❌ LLM query interpretation failed:", e)
         return None
 
+# === Fast path: rules first, LLM only when they aren't confident ===
+INTERPRET_REQUESTS = Counter("interpret_requests_total",
+                             "Prompts interpreted, by path (rules, llm, fallback, failed)")
+INTERPRET_LATENCY = Histogram("interpret_latency_seconds", "Prompt interpretation latency, by path")
+
+def parse_llm_output(content):
+    # The model sometimes wraps its JSON in a ```json fence or adds prose
+    if not content:
+        return None
+    match = re.search(r"\{.*\}", content, re.S)
+    try:
+        parsed = json.loads(match.group() if match else content)
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) and parsed.get("pubmed_query") else None
+
+def _finish(result, path, start):
+    INTERPRET_REQUESTS.inc(path=path)
+    INTERPRET_LATENCY.observe(time.perf_counter() - start, path=path)
+    if result is not None:
+        result["interpreter"] = path
+    return result
+
+@timed("interpret")
+def interpret(user_input, use_llm=True):
+    """Structured query dict, or None if neither the rules nor the LLM managed.
+
+    "interpreter" says which path answered: "rules", "llm", or "fallback"
+    (the LLM failed and the rules' best guess was used).
+    """
+    start = time.perf_counter()
+    result, confident = interpret_rules(user_input)
+    if confident or not use_llm:
+        return _finish(result, "rules" if result else "failed", start)
+    parsed = parse_llm_output(interpret_query(user_input))
+    if parsed is not None:
+        return _finish(parsed, "llm", start)
+    return _finish(result, "fallback" if result else "failed", start)
+
+@timed("interpret")
+async def ainterpret(user_input, use_llm=True):
+    start = time.perf_counter()
+    result, confident = interpret_rules(user_input)
+    if confident or not use_llm:
+        return _finish(result, "rules" if result else "failed", start)
+    parsed = parse_llm_output(await ainterpret_query(user_input))
+    if parsed is not None:
+        return _finish(parsed, "llm", start)
+    return _finish(result, "fallback" if result else "failed", start)
+
+def interpreter_stats():
+    """Share of prompts each path served, and its latency distribution."""
+    counts = {path: INTERPRET_REQUESTS.total(path=path) for path in ("rules", "llm", "fallback", "failed")}
+    total = sum(counts.values())
+    return {
+        "requests": counts,
+        "fast_path_fraction": counts["rules"] / total if total else None,
+        "latency_seconds": {path: INTERPRET_LATENCY.summary(path=path) for path in counts if counts[path]},
+    }
+
 # Example usage
 if __name__ == "__main__":
     query = "How many articles have used machine learning in breast cancer and what was the statistical evaluation used in them?"
@@ -0,0 +1,198 @@
+# nlp/rule_interpreter.py
+#
+# Rule-based interpreter for prompts that don't need an LLM: boolean queries
+# ("machine learning AND breast cancer") and short keyword prompts ("deep
+# learning for diabetic retinopathy screening"). Produces the same fields as
+# nlp/query_interpreter's LLM prompt; MeSH terms come from the local index
+# (nlp/mesh.py) when it is built.
+#
+# interpret_rules returns (result, confident). Questions, comparisons and
+# long prompts are not confident and go to the LLM; the result is still
+# filled in as well as the rules can, as a fallback if the LLM call fails.
+
+import re
+import unicodedata
+
+from nlp.mesh import get_mesh_index
+from utils.stats_matcher import default_matcher
+
+MAX_CONCEPTS = 4
+MAX_CONCEPT_WORDS = 4
+
+BOOLEAN_RE = re.compile(r'\b(?:AND|OR|NOT)\b|\[[A-Za-z ]+\]|"')
+BOOLEAN_OPERATOR_RE = re.compile(r'\b(?:AND|OR|NOT)\b')
+FIELD_TAG_RE = re.compile(r'\[[^\]]*\]')
+# Words start with any letter or digit, not just ASCII ones ("α-synuclein")
+WORD_RE = re.compile(r"[^\W_][\w'\-/+.]*[\w+]|[^\W_]|,")
+# Multi-word connectors, replaced by a concept break before tokenizing
+CONNECTOR_PHRASE_RE = re.compile(r"\b(?:by means of|by way of|such as|as well as)\b", re.I)
+
+# Request phrasing around the actual topic
+FILLER = frozenset("""
+find search show me get list fetch give look lookup retrieve pull please i we want need like looking
+papers paper articles article studies study literature research publications publication trials trial
+reviews review evidence work recent latest new all any some
+""".split())
+# Split concepts: "X in Y", "X for Y", "X, Y", "X vs Y"
+CONNECTORS = frozenset("and in for with using on about regarding among within into to vs versus ,".split())
+# Lowercase logic ("diabetes or obesity", "aspirin not warfarin") ends a
+# concept too, but joining the concepts with AND would change what was asked
+# for, so such prompts go to the LLM
+LOGIC_WORDS = frozenset("or nor not without except excluding".split())
+# Words that carry no topic; they end a concept
+STOPWORDS = frozenset("""
+a an the of that this these those them it its their there have has had been was were is are be being
+used use uses applied apply based related many much more most
+""".split())
+# Anything the rules shouldn't guess at
+QUESTION_WORDS = frozenset("""
+how what which why when where who whom whose does do did is are can could should would will
+compare comparing comparison versus vs summarize summarise explain describe difference differences
+effect effects impact association between whether
+""".split())
+STATS_RE = re.compile(r"\bstatistic(?:s|al)?(?: (?:methods?|analys[ie]s|evaluations?|tests?|techniques?|models?))?\b",
+                      re.I)
+# Matches of this kind stay in the prompt: "mean"/"median" there is far more
+# often part of the topic ("mean arterial pressure") than a request
+DESCRIPTIVE = "descriptive statistics"
+# Top-level MeSH tree letter -> field
+FIELD_BY_TREE = {"A": "anatomy", "B": "biology", "C": "medicine", "D": "pharmacology", "E": "medicine",
+                 "F": "psychology", "G": "biology", "H": "medicine", "L": "information science",
+                 "N": "public health"}
+
+# === 1. Pieces of the prompt ===
+def stats_keywords(text):
+    """Statistical methods named in the prompt (the post-filter keywords)."""
+    return default_matcher.methods(text)
+
+def _is_break(word):
+    # Text edge, comma, or a word that ends a concept anyway
+    lower = (word or ",").lower()
+    return (lower == "," or lower in CONNECTORS or lower in LOGIC_WORDS or lower in STOPWORDS
+            or lower in QUESTION_WORDS or lower in FILLER)
+
+def _strip_stats(text):
+    """(text without the statistical methods it names, clean).
+
+    Only specific methods are stripped, never descriptive mean/median. Not
+    clean when a method sat inside a concept ("sepsis logistic regression
+    mortality": cutting it out leaves two half concepts) or the prompt asks
+    for descriptive statistics, which the rules leave to the LLM.
+    """
+    matches = default_matcher.find(text)
+    clean = not any(m.method == DESCRIPTIVE for m in matches)
+    spans = sorted([(m.start, m.end) for m in matches if m.method != DESCRIPTIVE] +
+                   [m.span() for m in STATS_RE.finditer(text)])
+    merged = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    for start, end in reversed(merged):
+        before = WORD_RE.findall(text[:start])
+        after = WORD_RE.findall(text[end:])
+        if not (_is_break(before[-1] if before else None) and _is_break(after[0] if after else None)):
+            clean = False
+        text = text[:start] + " , " + text[end:]
+    return text, clean
+
+def _drops_letters(text):
+    # A letter or mark WORD_RE leaves out (e.g. a combining accent) would
+    # silently change the query
+    covered = set()
+    for m in WORD_RE.finditer(text):
+        covered.update(range(m.start(), m.end()))
+    return any(i not in covered and unicodedata.category(ch)[0] in "LM" for i, ch in enumerate(text))
+
+def _strip_grouping(operand):
+    # Grouping parentheses sit at operand edges and are unbalanced there;
+    # "Neural Networks (Computer)" keeps its own
+    operand = operand.strip(' "')
+    while operand.startswith("(") and operand.count("(") > operand.count(")"):
+        operand = operand[1:].strip(' "')
+    while operand.endswith(")") and operand.count(")") > operand.count("("):
+        operand = operand[:-1].strip(' "')
+    return operand
+
+def boolean_concepts(query):
+    cleaned = FIELD_TAG_RE.sub(" ", query)
+    operands = [_strip_grouping(o) for o in BOOLEAN_OPERATOR_RE.split(cleaned)]
+    return [o for o in operands if o]
+
+def is_wellformed(query):
+    depth = 0
+    for ch in query:
+        depth += {"(": 1, ")": -1}.get(ch, 0)
+        if depth < 0:
+            return False
+    return depth == 0 and query.count('"') % 2 == 0 and not re.search(r"\b(?:AND|OR|NOT)\s*$", query)
+
+def keyword_concepts(text):
+    """(concepts, question words seen, clean) from a plain-language prompt.
+
+    `clean` is False when the concepts may not say what the prompt did:
+    see _strip_stats, lowercase or/not (LOGIC_WORDS), or a letter dropped
+    on the way.
+    """
+    text, clean = _strip_stats(CONNECTOR_PHRASE_RE.sub(" , ", text))
+    clean = clean and not _drops_letters(text)
+    concepts, current, questions = [], [], []
+    for word in WORD_RE.findall(text):
+        lower = word.lower()
+        if lower in QUESTION_WORDS:
+            questions.append(lower)
+        if lower in LOGIC_WORDS:
+            clean = False
+        if _is_break(word):
+            if current:
+                concepts.append(" ".join(current))
+            current = []
+        else:
+            current.append(word)
+    if current:
+        concepts.append(" ".join(current))
+    return list(dict.fromkeys(concepts)), questions, clean
+
+# === 2. Interpret ===
+def interpret_rules(prompt):
+    """(result dict, confident); result is None when nothing usable was found."""
+    text = unicodedata.normalize("NFC", " ".join((prompt or "").split())).rstrip("?.!")
+    keywords = stats_keywords(text)
+
+    if BOOLEAN_RE.search(text):
+        # Already a PubMed query: pass it through untouched when it is well formed
+        query = text
+        concepts = boolean_concepts(text)
+        # Lowercase or/not are plain search terms to PubMed, likely not what was meant
+        confident = (is_wellformed(text) and bool(concepts)
+                     and not any(w in LOGIC_WORDS for w in WORD_RE.findall(text)))
+    else:
+        concepts, questions, clean = keyword_concepts(text)
+        confident = (clean and not questions and 0 < len(concepts) <= MAX_CONCEPTS
+                     and all(len(c.split()) <= MAX_CONCEPT_WORDS for c in concepts))
+        query = " AND ".join(concepts)
+    if not concepts:
+        return None, False
+
+    mesh_terms, field = [], None
+    index = get_mesh_index()
+    if index is not None:
+        for concept in concepts:
+            i = index.find(concept)
+            if i is not None:
+                mesh_terms.append(index.name[i])
+                trees = index.tree_numbers(i)
+                field = field or (FIELD_BY_TREE.get(trees[0][0]) if trees else None)
+
+    intent = f"find studies on {' and '.join(concepts)}"
+    if keywords:
+        intent += f" that report {', '.join(keywords)}"
+    result = {
+        "pubmed_query": query,
+        "field": field,
+        "post_filter_keywords": keywords,
+        "suggested_mesh_terms": list(dict.fromkeys(mesh_terms)),
+        "user_intent": intent,
+    }
+    return result, confident
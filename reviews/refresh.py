@@ -0,0 +1,237 @@
+# reviews/refresh.py
+#
+# Living reviews: saved PubMed queries refreshed incrementally. The first
+# refresh of a query is a full baseline; after that each refresh asks
+# esearch only for the window since the stored watermark:
+#   datetype=edat  records that entered PubMed in the window (new)
+#   datetype=mdat  records modified in the window (updated)
+# Results are paged off the NCBI history server (no 10,000-PMID cap), diffed
+# against the PMIDs the query has already seen, and the statistics filter
+# and rerank run on the delta alone, one page at a time. Each page is
+# staged in the review store with its relevance, so only PMIDs are held
+# across pages; the top_k records are loaded back for summarization. A
+# seen PMID only counts as updated when its title or abstract changed, so
+# metadata-only edits (and the overlap day) aren't summarized again.
+# The watermark only moves when a refresh succeeds and retrieved every
+# record esearch counted; a run cut short by max_results is "incomplete".
+#
+#   python -m reviews.refresh save sepsis-ml --query "machine learning AND sepsis"
+#   python -m reviews.refresh save ckd --prompt "deep learning for chronic kidney disease"
+#   python -m reviews.refresh refresh sepsis-ml
+#   python -m reviews.refresh refresh --all --every 168   # scheduler: weekly, until stopped
+#   python -m reviews.refresh list | show NAME | delete NAME
+
+import argparse
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from ingestion.async_http import close_async_client
+from ingestion.pubmed_ingestor import async_iter_history_windows
+from nlp.query_interpreter import interpret
+from reviews.store import get_review_store
+from storage.article_store import get_store
+from storage.vector_index import rerank
+from summarization.summarizer import TOKENS_PER_MINUTE, summarize_articles_async
+from utils import metrics
+from utils.rate_limit import AsyncTokenBudget
+from utils.stats_matcher import default_matcher
+
+REFRESH_CONCURRENCY = 4  # saved queries refreshed at once; NCBI pacing is shared regardless
+DATE_FORMAT = "%Y/%m/%d"
+
+# === 1. Save a query ===
+def save_query(name, query=None, prompt=None, filter_stats=True, max_results=None, top_k=30):
+    """Save (or update) a query; a prompt is interpreted once, here.
+    max_results caps the records per esearch window (None = all of them)."""
+    intent = None
+    if prompt:
+        parsed = interpret(prompt)
+        if parsed is None or not parsed.get("pubmed_query"):
+            raise ValueError(f"Could not interpret the prompt: {prompt}")
+        query, intent = parsed["pubmed_query"], parsed.get("user_intent") or prompt
+    return get_review_store().save(name, query, intent, filter_stats=filter_stats,
+                                   max_results=max_results, top_k=top_k)
+
+# === 2. Refresh one query ===
+def today():
+    return datetime.now(timezone.utc).strftime(DATE_FORMAT)
+
+def window_searches(mindate, maxdate):
+    # esearch date params for the window; the whole query when there is no watermark.
+    # The window starts on the watermark day itself (esearch dates are whole
+    # days, both ends inclusive); records already seen that day drop out in the diff
+    if not mindate:
+        return [{}]
+    return [{"mindate": mindate, "maxdate": maxdate, "datetype": datetype} for datetype in ("edat", "mdat")]
+
+def digest(record):
+    text = f"{record.get('title') or ''}\n{record.get('abstract') or ''}"
+    return hashlib.sha1(text.encode()).hexdigest()
+
+@metrics.timed("refresh")
+async def refresh(saved, budget=None, summarize=True):
+    """Refresh one saved query (a dict from ReviewStore.get); returns the run stats."""
+    store = get_review_store()
+    params = saved["params"]
+    max_results = params.get("max_results")
+    mindate, maxdate = saved["watermark"], today()
+    run_id = await asyncio.to_thread(store.start_run, saved["name"], mindate, maxdate)
+    try:
+        retrieved = set()  # PMIDs only; the records go to the stores page by page
+        new = updated = kept = missed = 0
+        for dates in window_searches(mindate, maxdate):
+            counts = {}
+            async for _, _, window in async_iter_history_windows(saved["query"], limit=max_results, counts=counts,
+                                                                 **dates):
+                window = [r for r in window if r["pmid"] not in retrieved and (r["title"] or r["abstract"])]
+                retrieved.update(r["pmid"] for r in window)
+                await asyncio.to_thread(get_store().put_many, "pubmed", window, "pmid")
+                seen = await asyncio.to_thread(store.seen, saved["name"], [r["pmid"] for r in window])
+                changed = [r for r in window if seen.get(r["pmid"]) != digest(r)]
+                updated += sum(r["pmid"] in seen for r in changed)
+                new += sum(r["pmid"] not in seen for r in changed)
+                passed = changed
+                if params.get("filter_stats", True):
+                    with metrics.stage("filter"):
+                        passed = list(default_matcher.filter_records(changed))
+                if passed and saved["intent"]:
+                    passed = await asyncio.to_thread(rerank, passed, saved["intent"])
+                relevance = {r["pmid"]: r.get("relevance") for r in passed}
+                await asyncio.to_thread(store.stage_results, run_id, [
+                    (r["pmid"], r["pmid"] in relevance, digest(r), relevance.get(r["pmid"])) for r in changed
+                ])
+                kept += len(passed)
+            # esearch counted more than max_results let us page through
+            missed += max(0, counts["count"] - max_results) if max_results is not None else 0
+
+        # Without an intent there is nothing to rank by, so everything kept is summarized
+        top_k = (params.get("top_k") or None) if saved["intent"] else None
+        ranked_ids = await asyncio.to_thread(store.ranked_results, run_id, top_k)
+        summaries = []
+        if ranked_ids and summarize:
+            records = await asyncio.to_thread(get_store().get_fresh, "pubmed", ranked_ids)
+            ranked = [records[pmid] for pmid in ranked_ids if pmid in records]
+            summarized = await summarize_articles_async(ranked, budget=budget)
+            summaries = [{"summary": r["summary"], "error": r["error"], "ids": r["ids"]} for r in summarized]
+
+        stats = {"searched": len(retrieved), "new": new, "updated": updated, "kept": kept,
+                 "summarized": len(ranked_ids) if summarize else 0, "missed": missed}
+        await asyncio.to_thread(store.finish_run, run_id, saved["name"], stats, summaries, maxdate,
+                                complete=not missed)
+        return {"name": saved["name"], "mindate": mindate, "maxdate": maxdate, **stats}
+    except Exception as e:
+        await asyncio.to_thread(store.fail_run, run_id, f"{type(e).__name__}: {e}")
+        raise
+
+# === 3. Scheduler ===
+async def refresh_all(names=None, concurrency=REFRESH_CONCURRENCY, tokens_per_minute=TOKENS_PER_MINUTE,
+                      summarize=True):
+    """Refresh saved queries concurrently in one event loop.
+
+    All of them share the NCBI rate limiter (pubmed_ingestor.async_limiter)
+    and one LLM token budget, so running more queries at once never pushes
+    either upstream past its limit. Returns {name: stats dict or exception}.
+    """
+    store = get_review_store()
+    saved = store.list() if names is None else [store.get(n) for n in names]
+    missing = [n for n, s in zip(names or [], saved) if s is None]
+    if missing:
+        raise KeyError(f"No saved query named {', '.join(missing)}")
+    semaphore = asyncio.Semaphore(concurrency)
+    budget = AsyncTokenBudget(tokens_per_minute) if tokens_per_minute else None
+
+    async def one(s):
+        async with semaphore:
+            return await refresh(s, budget, summarize)
+
+    try:
+        results = await asyncio.gather(*(one(s) for s in saved), return_exceptions=True)
+        return {s["name"]: result for s, result in zip(saved, results)}
+    finally:
+        await close_async_client()
+
+def report(results):
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            print(f"❌ {name}: {type(result).__name__}: {result}")
+        else:
+            since = f"since {result['mindate']}" if result["mindate"] else "baseline"
+            print(f"🔄 {name} ({since}): {result['new']} new, {result['updated']} updated, "
+                  f"{result['kept']} kept, {result['summarized']} summarized")
+            if result["missed"]:
+                print(f"⚠️  {name}: {result['missed']} matching records were past max_results and not retrieved; "
+                      f"the watermark stays at {result['mindate'] or '(none)'}. Raise --max_results or narrow the query")
+
+def run_scheduler(names, concurrency, every_hours, summarize=True):
+    while True:
+        report(asyncio.run(refresh_all(names, concurrency, summarize=summarize)))
+        if not every_hours:
+            return
+        print(f"⏳ Next refresh in {every_hours:g}h")
+        time.sleep(every_hours * 3600)
+
+# === 4. CLI ===
+def show(name):
+    store = get_review_store()
+    saved = store.get(name)
+    if saved is None:
+        print(f"❌ No saved query named {name}")
+        return
+    print(f"📌 {name}: {saved['query']}")
+    print(f"   watermark {saved['watermark'] or '(none, next refresh is a baseline)'}, "
+          f"{store.result_count(name)} kept of {store.result_count(name, kept_only=False)} seen")
+    for run in store.runs(name):
+        window = f"{run['mindate'] or 'baseline'} → {run['maxdate']}"
+        print(f"\n🗓️  Run {run['id']} ({window}): {run['status']} {run['stats'] or ''}")
+        if run["error"]:
+            print(f"   {run['error']}")
+        for entry in run["summaries"]:
+            if entry["summary"]:
+                print(f"\n📝 {entry['summary']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Saved queries with incremental (living review) refresh")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    save = commands.add_parser("save", help="Save or update a query")
+    save.add_argument("name")
+    source = save.add_mutually_exclusive_group(required=True)
+    source.add_argument("--query", help="PubMed query, used as is")
+    source.add_argument("--prompt", help="Natural language prompt, interpreted once")
+    save.add_argument("--no_filter", action="store_true", help="Keep articles that don't mention statistics")
+    save.add_argument("--max_results", type=int, default=None,
+                      help="Cap on records per esearch window (default: all)")
+    save.add_argument("--top_k", type=int, default=30, help="Most relevant new articles to summarize (0 = all)")
+
+    refresh_cmd = commands.add_parser("refresh", help="Refresh saved queries since their last run")
+    refresh_cmd.add_argument("names", nargs="*")
+    refresh_cmd.add_argument("--all", action="store_true", help="Every saved query")
+    refresh_cmd.add_argument("--concurrency", type=int, default=REFRESH_CONCURRENCY)
+    refresh_cmd.add_argument("--every", type=float, default=None, metavar="HOURS",
+                             help="Keep running, refreshing again every HOURS")
+    refresh_cmd.add_argument("--no_summary", action="store_true", help="Fetch and filter the delta only")
+
+    commands.add_parser("list", help="List saved queries")
+    commands.add_parser("show", help="A saved query's recent runs and summaries").add_argument("name")
+    commands.add_parser("delete", help="Delete a saved query and its history").add_argument("name")
+    args = parser.parse_args()
+
+    if args.command == "save":
+        saved = save_query(args.name, args.query, args.prompt, not args.no_filter, args.max_results, args.top_k)
+        print(f"💾 Saved {saved['name']}: {saved['query']}")
+    elif args.command == "refresh":
+        if not args.all and not args.names:
+            parser.error("refresh needs saved query names or --all")
+        try:
+            run_scheduler(None if args.all else args.names, args.concurrency, args.every, not args.no_summary)
+        except KeyError as e:
+            print(f"❌ {e.args[0]}")
+    elif args.command == "list":
+        for saved in get_review_store().list():
+            print(f"📌 {saved['name']:20s} watermark {saved['watermark'] or '-':10s}  {saved['query']}")
+    elif args.command == "show":
+        show(args.name)
+    elif args.command == "delete":
+        print("🗑️  Deleted" if get_review_store().delete(args.name) else f"❌ No saved query named {args.name}")
@@ -0,0 +1,213 @@
+# reviews/store.py
+#
+# Saved queries for living reviews: the PubMed query, its watermark (the
+# last esearch maxdate a refresh covered), every PMID seen so far, and a
+# log of refresh runs with their summaries. A running refresh stages the
+# PMIDs it has diffed in refresh_run_results; they join the saved query's
+# results only when the run finishes.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+REVIEW_DB_PATH = os.getenv("REVIEW_DB_PATH", "data/reviews.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS saved_queries (
+    name         TEXT PRIMARY KEY,
+    query        TEXT NOT NULL,
+    intent       TEXT,
+    params       TEXT NOT NULL,
+    watermark    TEXT,
+    created_at   REAL NOT NULL,
+    last_run_at  REAL
+);
+CREATE TABLE IF NOT EXISTS saved_query_results (
+    name       TEXT NOT NULL,
+    pmid       TEXT NOT NULL,
+    kept       INTEGER NOT NULL,
+    digest     TEXT NOT NULL,
+    first_run  INTEGER NOT NULL,
+    last_run   INTEGER NOT NULL,
+    PRIMARY KEY (name, pmid)
+);
+CREATE TABLE IF NOT EXISTS refresh_runs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    name        TEXT NOT NULL,
+    mindate     TEXT,
+    maxdate     TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    stats       TEXT NOT NULL DEFAULT '{}',
+    summaries   TEXT NOT NULL DEFAULT '[]',
+    error       TEXT,
+    started_at  REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS refresh_runs_name ON refresh_runs (name, id);
+CREATE TABLE IF NOT EXISTS refresh_run_results (
+    run_id    INTEGER NOT NULL,
+    pmid      TEXT NOT NULL,
+    kept      INTEGER NOT NULL,
+    digest    TEXT NOT NULL,
+    relevance REAL,
+    PRIMARY KEY (run_id, pmid)
+);
+"""
+
+RUNNING, SUCCEEDED, INCOMPLETE, FAILED = "running", "succeeded", "incomplete", "failed"
+
+def _saved_row(row):
+    keys = ("name", "query", "intent", "params", "watermark", "created_at", "last_run_at")
+    saved = dict(zip(keys, row))
+    saved["params"] = json.loads(saved["params"])
+    return saved
+
+def _run_row(row):
+    keys = ("id", "name", "mindate", "maxdate", "status", "stats", "summaries", "error", "started_at", "finished_at")
+    run = dict(zip(keys, row))
+    run["stats"] = json.loads(run["stats"])
+    run["summaries"] = json.loads(run["summaries"])
+    return run
+
+class ReviewStore:
+    """SQLite store of saved queries, the PMIDs each has seen, and refresh runs."""
+
+    def __init__(self, path=REVIEW_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn.executescript(SCHEMA)
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # --- saved queries ---
+    def save(self, name, query, intent=None, **params):
+        """Create or update a saved query. Changing the query text starts it
+        over: the watermark and seen PMIDs belong to the old query."""
+        existing = self.get(name)
+        with self.conn:
+            if existing and existing["query"] != query:
+                self.conn.execute("DELETE FROM saved_query_results WHERE name = ?", (name,))
+                existing = None
+            self.conn.execute(
+                "INSERT OR REPLACE INTO saved_queries (name, query, intent, params, watermark, created_at, last_run_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, query, intent, json.dumps(params),
+                 existing["watermark"] if existing else None,
+                 existing["created_at"] if existing else time.time(),
+                 existing["last_run_at"] if existing else None),
+            )
+        return self.get(name)
+
+    def get(self, name):
+        row = self.conn.execute("SELECT * FROM saved_queries WHERE name = ?", (name,)).fetchone()
+        return _saved_row(row) if row else None
+
+    def list(self):
+        return [_saved_row(r) for r in self.conn.execute("SELECT * FROM saved_queries ORDER BY name")]
+
+    def delete(self, name):
+        with self.conn:
+            self.conn.execute("DELETE FROM saved_query_results WHERE name = ?", (name,))
+            self.conn.execute("DELETE FROM refresh_runs WHERE name = ?", (name,))
+            return self.conn.execute("DELETE FROM saved_queries WHERE name = ?", (name,)).rowcount > 0
+
+    # --- seen PMIDs ---
+    def seen(self, name, pmids):
+        """{pmid: content digest} for the `pmids` this saved query has already seen."""
+        pmids = list(pmids)
+        found = {}
+        for i in range(0, len(pmids), 500):
+            chunk = pmids[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT pmid, digest FROM saved_query_results WHERE name = ? AND pmid IN ({','.join('?' * len(chunk))})",
+                [name, *chunk],
+            )
+            found.update(rows)
+        return found
+
+    def result_count(self, name, kept_only=True):
+        sql = "SELECT COUNT(*) FROM saved_query_results WHERE name = ?" + (" AND kept = 1" if kept_only else "")
+        return self.conn.execute(sql, (name,)).fetchone()[0]
+
+    # --- refresh runs ---
+    def start_run(self, name, mindate, maxdate):
+        with self.conn:
+            return self.conn.execute(
+                "INSERT INTO refresh_runs (name, mindate, maxdate, status, started_at) VALUES (?, ?, ?, ?, ?)",
+                (name, mindate, maxdate, RUNNING, time.time()),
+            ).lastrowid
+
+    def stage_results(self, run_id, rows):
+        """Stage a page of the run's changed PMIDs: [(pmid, kept, digest, relevance)]."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO refresh_run_results (run_id, pmid, kept, digest, relevance) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(run_id, pmid, int(kept), digest, relevance) for pmid, kept, digest, relevance in rows],
+            )
+
+    def ranked_results(self, run_id, limit=None):
+        """The run's kept PMIDs, most relevant first (staging order without scores)."""
+        rows = self.conn.execute(
+            "SELECT pmid FROM refresh_run_results WHERE run_id = ? AND kept = 1 "
+            "ORDER BY relevance DESC, rowid LIMIT ?",
+            (run_id, limit if limit else -1),
+        )
+        return [r[0] for r in rows]
+
+    def finish_run(self, run_id, name, stats, summaries, watermark, complete=True):
+        """Record the run's staged PMIDs and move the watermark in one
+        transaction, so a failed refresh leaves the next one to cover its window.
+        An incomplete run (it didn't retrieve everything esearch counted) keeps
+        what it saw but leaves the watermark where it was."""
+        now = time.time()
+        with self.conn:
+            # "WHERE true" tells SQLite's parser the ON CONFLICT is an upsert clause
+            self.conn.execute(
+                "INSERT INTO saved_query_results (name, pmid, kept, digest, first_run, last_run) "
+                "SELECT ?, pmid, kept, digest, run_id, run_id FROM refresh_run_results WHERE run_id = ? AND true "
+                "ON CONFLICT (name, pmid) DO UPDATE SET kept = excluded.kept, digest = excluded.digest, "
+                "last_run = excluded.last_run",
+                (name, run_id),
+            )
+            self.conn.execute("DELETE FROM refresh_run_results WHERE run_id = ?", (run_id,))
+            self.conn.execute(
+                "UPDATE refresh_runs SET status = ?, stats = ?, summaries = ?, finished_at = ? WHERE id = ?",
+                (SUCCEEDED if complete else INCOMPLETE, json.dumps(stats), json.dumps(summaries), now, run_id),
+            )
+            if complete:
+                self.conn.execute("UPDATE saved_queries SET watermark = ?, last_run_at = ? WHERE name = ?",
+                                  (watermark, now, name))
+            else:
+                self.conn.execute("UPDATE saved_queries SET last_run_at = ? WHERE name = ?", (now, name))
+
+    def fail_run(self, run_id, error):
+        with self.conn:
+            self.conn.execute("DELETE FROM refresh_run_results WHERE run_id = ?", (run_id,))
+            self.conn.execute("UPDATE refresh_runs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                              (FAILED, error, time.time(), run_id))
+
+    def runs(self, name, limit=10):
+        rows = self.conn.execute("SELECT * FROM refresh_runs WHERE name = ? ORDER BY id DESC LIMIT ?", (name, limit))
+        return [_run_row(r) for r in rows]
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_review_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ReviewStore()
+    return _store
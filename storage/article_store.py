@@ -0,0 +1,211 @@
+# storage/article_store.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from storage import search_index
+from utils import metrics
+
+DB_PATH = os.getenv("ARTICLE_DB_PATH", "data/articles.db")
+ARTICLE_TTL = 30 * 24 * 3600  # seconds before a stored record is refetched
+SEARCH_TTL = 12 * 3600        # seconds an esearch/search result list stays valid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    source     TEXT NOT NULL,
+    source_id  TEXT NOT NULL,
+    record     TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (source, source_id)
+);
+CREATE TABLE IF NOT EXISTS search_cache (
+    source    TEXT NOT NULL,
+    query     TEXT NOT NULL,
+    ids       TEXT NOT NULL,
+    exhausted INTEGER NOT NULL,
+    cached_at REAL NOT NULL,
+    PRIMARY KEY (source, query)
+);
+"""
+
+class ArticleStore:
+    """SQLite (WAL) store of article records keyed by (source, source_id).
+
+    `source` is "pubmed", "arxiv" or "semantic"; records are stored as the
+    dicts each ingestor produces, together with the time they were fetched.
+    """
+
+    def __init__(self, path=DB_PATH, article_ttl=ARTICLE_TTL, search_ttl=SEARCH_TTL):
+        self.path = path
+        self.article_ttl = article_ttl
+        self.search_ttl = search_ttl
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn.executescript(SCHEMA)
+        self.conn.executescript(search_index.SCHEMA)
+        search_index.ensure_index(self.conn)
+
+    @property
+    def conn(self):
+        # One connection per thread; WAL lets readers run alongside a writer
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- articles ---
+    def get_fresh(self, source, ids):
+        """Return {source_id: record} for ids stored within the TTL."""
+        cutoff = time.time() - self.article_ttl
+        found = {}
+        ids = list(ids)
+        for i in range(0, len(ids), 500):  # stay under SQLite's variable limit
+            chunk = ids[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT source_id, record FROM articles WHERE source = ? AND fetched_at >= ? "
+                f"AND source_id IN ({','.join('?' * len(chunk))})",
+                [source, cutoff, *chunk],
+            )
+            found.update((sid, json.loads(record)) for sid, record in rows)
+        metrics.record_cache("articles", len(found), len(ids) - len(found))
+        return found
+
+    def put_many(self, source, records, id_key):
+        now = time.time()
+        rows = [(source, str(r[id_key]), json.dumps(r), now) for r in records if r.get(id_key)]
+        with self.conn:
+            # An upsert keeps an existing article's rowid, which its index entry shares
+            self.conn.executemany(
+                "INSERT INTO articles (source, source_id, record, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (source, source_id) DO UPDATE SET record = excluded.record, fetched_at = excluded.fetched_at",
+                rows,
+            )
+            rowids = self._rowids(source, [row[1] for row in rows])
+            search_index.index_records(self.conn, source, records, id_key, rowids)
+
+    def put_field(self, source, records, id_key, field):
+        """Write record[field] into the stored rows, leaving the rest of each
+        stored record and its fetched_at alone (the article itself was not
+        refetched). Records that aren't stored yet are added whole. `field`
+        must not be one the search index reads (title, abstract, ...)."""
+        now = time.time()
+        rows = [(source, str(r[id_key]), json.dumps(r), now) for r in records if r.get(id_key)]
+        path = f"$.{field}"
+        with self.conn:
+            stored = self._rowids(source, [row[1] for row in rows])
+            self.conn.executemany(
+                "INSERT INTO articles (source, source_id, record, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (source, source_id) DO UPDATE SET "
+                "record = json_set(articles.record, ?, json(json_extract(excluded.record, ?)))",
+                [(*row, path, path) for row in rows],
+            )
+            # Stored rows' index entries are unchanged; only new rows need one
+            added = self._rowids(source, [row[1] for row in rows if row[1] not in stored])
+            search_index.index_records(self.conn, source, records, id_key, added)
+
+    def _rowids(self, source, ids):
+        """{source_id: rowid} for the ids that are stored."""
+        found = {}
+        ids = list(ids)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT source_id, rowid FROM articles WHERE source = ? AND source_id IN ({','.join('?' * len(chunk))})",
+                [source, *chunk],
+            )
+            found.update(rows)
+        return found
+
+    def delete_many(self, source, ids):
+        """Delete the stored ones among `ids`; returns how many there were."""
+        rowids = list(self._rowids(source, [str(i) for i in ids]).values())
+        with self.conn:
+            search_index.delete_rowids(self.conn, rowids)
+            for i in range(0, len(rowids), 500):
+                chunk = rowids[i:i + 500]
+                self.conn.execute(f"DELETE FROM articles WHERE rowid IN ({','.join('?' * len(chunk))})", chunk)
+        return len(rowids)
+
+    def rekey(self, source, renames, id_key):
+        """Move stored records to new ids ({old_id: new_id}), keeping when they
+        were fetched. Where several land on one id, the latest fetch wins."""
+        old_rowids = self._rowids(source, renames)
+        moved = []
+        for rowid in old_rowids.values():
+            old_id, record, fetched_at = self.conn.execute(
+                "SELECT source_id, record, fetched_at FROM articles WHERE rowid = ?", (rowid,)
+            ).fetchone()
+            record = json.loads(record)
+            record[id_key] = renames[old_id]
+            moved.append((source, renames[old_id], json.dumps(record), fetched_at))
+        with self.conn:
+            search_index.delete_rowids(self.conn, old_rowids.values())
+            self.conn.executemany("DELETE FROM articles WHERE rowid = ?", [(r,) for r in old_rowids.values()])
+            self.conn.executemany(
+                "INSERT INTO articles (source, source_id, record, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (source, source_id) DO UPDATE SET record = excluded.record, "
+                "fetched_at = excluded.fetched_at WHERE excluded.fetched_at > articles.fetched_at",
+                moved,
+            )
+            rowids = self._rowids(source, {new_id for _, new_id, _, _ in moved})
+            records = [self.get_record(source, sid) for sid in rowids]
+            search_index.index_records(self.conn, source, records, id_key, rowids)
+        return len(moved)
+
+    def get_record(self, source, source_id):
+        row = self.conn.execute(
+            "SELECT record FROM articles WHERE source = ? AND source_id = ?", (source, source_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # --- local full-text search ---
+    def search(self, pubmed_query, limit=20, sources=None):
+        """Ranked local search; returns [(source, record, score)]."""
+        hits = search_index.search(self.conn, pubmed_query, limit, sources)
+        results = []
+        for source, source_id, score in hits:
+            record = self.get_record(source, source_id)
+            if record is not None:
+                results.append((source, record, -score))
+        return results
+
+    # --- search result lists ---
+    def get_search(self, source, query, max_results):
+        """Cached id list for `query` if it is fresh and covers `max_results`."""
+        row = self.conn.execute(
+            "SELECT ids, exhausted, cached_at FROM search_cache WHERE source = ? AND query = ?",
+            (source, query),
+        ).fetchone()
+        if row is None or row[2] < time.time() - self.search_ttl:
+            metrics.record_cache("search_results", 0, 1)
+            return None
+        ids, exhausted = json.loads(row[0]), bool(row[1])
+        if len(ids) >= max_results or exhausted:
+            metrics.record_cache("search_results", 1)
+            return ids[:max_results]
+        metrics.record_cache("search_results", 0, 1)
+        return None
+
+    def put_search(self, source, query, ids, exhausted):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO search_cache (source, query, ids, exhausted, cached_at) VALUES (?, ?, ?, ?, ?)",
+                (source, query, json.dumps(list(ids)), int(exhausted), time.time()),
+            )
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArticleStore()
+    return _store
@@ -0,0 +1,308 @@
+# storage/corpus.py
+#
+# Compact on-disk corpus: one file per record key ("column"), each a run of
+# compressed blocks, plus meta.json with the block offsets.
+#
+#   my_corpus.corpus/
+#     meta.json     rows, codec, columns: [{name, file, block_rows, offsets}]
+#     0.col, 1.col  compressed blocks, one column each
+#
+# Small metadata columns (pmid, year, authors, ...) use large blocks; the
+# big text columns (abstracts) use small ones, so reading one row or only
+# the metadata never inflates a block of abstracts it doesn't need.
+# Column files are mmap'ed, so a block is a slice of the page cache until it
+# is decompressed. A decompressed block is
+#   uint32 n | uint32 offsets[n + 1] | JSON-encoded values
+# where an empty value means the key was absent from that record.
+#
+#   python -m storage.corpus convert data/raw/pubmed_machine_learning.json
+#   python -m storage.corpus info data/raw/pubmed_machine_learning.corpus
+
+import argparse
+import glob
+import json
+import mmap
+import os
+import zlib
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib otherwise
+    zstandard = None
+
+BLOCK_ROWS = 1024      # rows per block for metadata columns
+TEXT_BLOCK_ROWS = 128  # rows per block for TEXT_COLUMNS; must divide BLOCK_ROWS
+TEXT_COLUMNS = frozenset(["abstract", "summary", "abstract_sections"])
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+_MISSING = object()
+
+# === 1. Block codec ===
+def _compressor(codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("this corpus is zstd-compressed; pip install zstandard")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress
+    return lambda data: zlib.compress(data, ZLIB_LEVEL)
+
+def _decompressor(codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("this corpus is zstd-compressed; pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress
+    return zlib.decompress
+
+def encode_block(values):
+    parts = [b"" if v is _MISSING else json.dumps(v, ensure_ascii=False).encode("utf-8") for v in values]
+    offsets = np.zeros(len(parts) + 1, dtype=np.uint32)
+    np.cumsum([len(p) for p in parts], out=offsets[1:])
+    return np.uint32(len(parts)).tobytes() + offsets.tobytes() + b"".join(parts)
+
+class _Block:
+    __slots__ = ("data", "base", "offsets")
+
+    def __init__(self, raw):
+        n = int.from_bytes(raw[:4], "little")
+        self.offsets = np.frombuffer(raw, dtype=np.uint32, count=n + 1, offset=4).tolist()
+        self.base = 4 + 4 * (n + 1)
+        self.data = raw
+
+    def value(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        if start == end:
+            return _MISSING
+        return json.loads(self.data[self.base + start:self.base + end])
+
+# === 2. Writer ===
+class CorpusWriter:
+    """Append records, then close() (or use as a context manager).
+
+    Columns are the union of the records' keys; a key first seen late is
+    backfilled as absent for the earlier rows. meta.json is written last,
+    so an interrupted write never leaves a corpus that looks complete.
+    """
+
+    def __init__(self, path, codec=None):
+        self.path = path
+        self.codec = codec or ("zstd" if zstandard is not None else "zlib")
+        self._compress = _compressor(self.codec)
+        self.rows = 0
+        self.columns = {}  # name -> {"file", "block_rows", "offsets", "handle"}
+        self._buffer = []
+        os.makedirs(path, exist_ok=True)
+        # Overwriting: drop the old meta first, then its column files
+        # (listdir names, so it works for relative paths too)
+        names = os.listdir(path)
+        if "meta.json" in names:
+            os.remove(os.path.join(path, "meta.json"))
+        for name in names:
+            if name.endswith(".col"):
+                os.remove(os.path.join(path, name))
+
+    def write(self, record):
+        self._buffer.append(record)
+        if len(self._buffer) == BLOCK_ROWS:
+            self._flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def _add_column(self, name):
+        block_rows = TEXT_BLOCK_ROWS if name in TEXT_COLUMNS else BLOCK_ROWS
+        filename = f"{len(self.columns)}.col"
+        column = {"file": filename, "block_rows": block_rows, "offsets": [0],
+                  "handle": open(os.path.join(self.path, filename), "wb")}
+        self.columns[name] = column
+        # Rows written so far are always whole blocks
+        for _ in range(self.rows // block_rows):
+            self._write_block(column, [_MISSING] * block_rows)
+
+    def _write_block(self, column, values):
+        data = self._compress(encode_block(values))
+        column["handle"].write(data)
+        column["offsets"].append(column["offsets"][-1] + len(data))
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        for record in self._buffer:
+            for key in record:
+                if key not in self.columns:
+                    self._add_column(key)
+        for name, column in self.columns.items():
+            values = [r.get(name, _MISSING) for r in self._buffer]
+            step = column["block_rows"]
+            for i in range(0, len(values), step):
+                self._write_block(column, values[i:i + step])
+        self.rows += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        self._flush()
+        meta = {"version": 1, "rows": self.rows, "codec": self.codec, "columns": []}
+        for name, column in self.columns.items():
+            column["handle"].close()
+            meta["columns"].append({"name": name, "file": column["file"],
+                                    "block_rows": column["block_rows"], "offsets": column["offsets"]})
+        tmp_path = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_corpus(path, records, codec=None):
+    with CorpusWriter(path, codec) as writer:
+        writer.write_many(records)
+    return writer.rows
+
+# === 3. Reader ===
+class _Column:
+    def __init__(self, path, spec, decompress):
+        self.name = spec["name"]
+        self.block_rows = spec["block_rows"]
+        self.offsets = spec["offsets"]
+        self._decompress = decompress
+        self._file = open(os.path.join(path, spec["file"]), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._cached = (None, None)
+
+    def block(self, b):
+        if self._cached[0] != b:
+            raw = self._decompress(self._map[self.offsets[b]:self.offsets[b + 1]])
+            self._cached = (b, _Block(raw))
+        return self._cached[1]
+
+    def value(self, row):
+        return self.block(row // self.block_rows).value(row % self.block_rows)
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+class Corpus:
+    """Read-only, lazily decoded view of a corpus directory.
+
+    Behaves like a sequence of record dicts: len(), corpus[i] and iteration
+    (which decodes one block per column at a time). Pass `columns` to read
+    only those keys; the other column files are never touched.
+    """
+
+    def __init__(self, path, columns=None):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.path = path
+        self.rows = meta["rows"]
+        self.codec = meta["codec"]
+        self.all_columns = [c["name"] for c in meta["columns"]]
+        wanted = self.all_columns if columns is None else list(columns)
+        unknown = set(wanted) - set(self.all_columns)
+        if unknown:
+            raise KeyError(f"{path} has no column(s) {sorted(unknown)}; it has {self.all_columns}")
+        decompress = _decompressor(self.codec)
+        specs = {c["name"]: c for c in meta["columns"]}
+        self._columns = [_Column(path, specs[name], decompress) for name in wanted]
+
+    @property
+    def columns(self):
+        return [c.name for c in self._columns]
+
+    def __len__(self):
+        return self.rows
+
+    def _record(self, row):
+        record = {}
+        for column in self._columns:
+            value = column.value(row)
+            if value is not _MISSING:
+                record[column.name] = value
+        return record
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self._record(i) for i in range(*row.indices(self.rows))]
+        if row < 0:
+            row += self.rows
+        if not 0 <= row < self.rows:
+            raise IndexError(row)
+        return self._record(row)
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield self._record(row)
+
+    def column(self, name):
+        """Yield one column's values (None where absent)."""
+        column = next(c for c in self._columns if c.name == name)
+        for row in range(self.rows):
+            value = column.value(row)
+            yield None if value is _MISSING else value
+
+    def close(self):
+        for column in self._columns:
+            column.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def is_corpus(path):
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+def open_corpus(path, columns=None):
+    return Corpus(path, columns)
+
+# === 4. Conversion from data/raw JSON / JSONL ===
+def iter_json_records(path):
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path) as f:
+            yield from json.load(f)
+
+def corpus_path_for(path):
+    return os.path.splitext(path)[0] + ".corpus"
+
+def convert(path, out_path=None, codec=None):
+    out_path = out_path or corpus_path_for(path)
+    rows = write_corpus(out_path, iter_json_records(path), codec)
+    return out_path, rows
+
+def disk_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar compressed corpus files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert_cmd = sub.add_parser("convert", help="Convert JSON / JSONL files to .corpus directories")
+    convert_cmd.add_argument("paths", nargs="*", default=None, help="Defaults to data/raw/*.json")
+    convert_cmd.add_argument("--codec", choices=["zlib", "zstd"], default=None)
+    info_cmd = sub.add_parser("info", help="Rows, columns and size of a corpus")
+    info_cmd.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        for path in args.paths or sorted(glob.glob("data/raw/*.json")):
+            out_path, rows = convert(path, codec=args.codec)
+            print(f"✅ {path} -> {out_path}: {rows} records, "
+                  f"{os.path.getsize(path) / 1e6:.1f} MB -> {disk_size(out_path) / 1e6:.1f} MB")
+    else:
+        with open_corpus(args.path) as corpus:
+            print(f"📦 {len(corpus)} records, codec {corpus.codec}, {disk_size(args.path) / 1e6:.1f} MB")
+            for column in corpus.all_columns:
+                print(f"  - {column}")
@@ -0,0 +1,138 @@
+# storage/search_index.py
+
+import json
+import re
+import sqlite3
+
+# Full-text index over every record in the article store. It lives in the
+# same SQLite file and is kept in step by ArticleStore.put_many. Each FTS row
+# shares its article's rowid, so replacing or deleting an article's entry is
+# a rowid lookup (source/source_id are UNINDEXED: filtering on them would
+# scan the whole index).
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS article_fts USING fts5(
+    source UNINDEXED,
+    source_id UNINDEXED,
+    title,
+    abstract,
+    journal,
+    authors,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+"""
+INDEX_VERSION = 1  # PRAGMA user_version; 1 = FTS rowid is the articles rowid
+
+# Column weights for bm25(): title > abstract > journal/authors
+WEIGHTS = (0.0, 0.0, 4.0, 1.0, 0.5, 0.5)
+
+# Which record keys hold abstract/journal for each source
+SOURCE_FIELDS = {
+    "pubmed": ("abstract", "journal"),
+    "arxiv": ("summary", "primary_category"),
+    "semantic": ("abstract", "venue"),
+}
+
+# === 1. Keep the index in step with the store ===
+INSERT_SQL = ("INSERT INTO article_fts (rowid, source, source_id, title, abstract, journal, authors) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+def _row(rowid, source, source_id, record):
+    abstract_key, journal_key = SOURCE_FIELDS.get(source, ("abstract", "journal"))
+    return (
+        rowid,
+        source,
+        source_id,
+        record.get("title") or "",
+        record.get(abstract_key) or "",
+        record.get(journal_key) or "",
+        " ".join(a for a in record.get("authors") or [] if a),
+    )
+
+def delete_rowids(conn, rowids):
+    rowids = list(rowids)
+    for i in range(0, len(rowids), 500):
+        chunk = rowids[i:i + 500]
+        conn.execute(f"DELETE FROM article_fts WHERE rowid IN ({','.join('?' * len(chunk))})", chunk)
+
+def index_records(conn, source, records, id_key, rowids):
+    """(Re)index records under their articles rowids ({source_id: rowid})."""
+    latest = {str(r[id_key]): r for r in records if r.get(id_key)}
+    rows = [_row(rowids[sid], source, sid, r) for sid, r in latest.items() if sid in rowids]
+    delete_rowids(conn, [row[0] for row in rows])
+    conn.executemany(INSERT_SQL, rows)
+
+def ensure_index(conn):
+    # Rebuild stores indexed before INDEX_VERSION or filled before the index existed
+    outdated = conn.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION
+    has_articles = conn.execute("SELECT 1 FROM articles LIMIT 1").fetchone()
+    has_index = conn.execute("SELECT 1 FROM article_fts LIMIT 1").fetchone()
+    if has_articles and (outdated or not has_index):
+        rebuild(conn)
+    elif outdated:
+        conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+
+def rebuild(conn):
+    # Backfill from the articles table (e.g. a store created before the index)
+    with conn:
+        conn.execute("DELETE FROM article_fts")
+        rows = conn.execute("SELECT rowid, source, source_id, record FROM articles")
+        conn.executemany(
+            INSERT_SQL,
+            (_row(rowid, source, source_id, json.loads(record)) for rowid, source, source_id, record in rows),
+        )
+        conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+
+# === 2. PubMed boolean syntax -> FTS5 MATCH expression ===
+TOKEN_RE = re.compile(r'"[^"]*"|\(|\)|\[[^\]]*\]|[^\s()"\[]+')
+
+def to_fts_query(pubmed_query):
+    """Translate an `interpret_query` style boolean query for FTS5.
+
+    Keeps AND/OR/NOT, parentheses, quoted phrases and trailing `*` wildcards;
+    drops PubMed field tags such as [MeSH] or [tiab]. Bare words are quoted
+    so punctuation (p-value, COVID-19) cannot break the FTS5 parser.
+    """
+    out = []
+    for tok in TOKEN_RE.findall(pubmed_query):
+        if tok.startswith("["):
+            continue  # field tag
+        if tok.upper() in ("AND", "OR", "NOT"):
+            out.append(tok.upper())
+        elif tok in ("(", ")"):
+            out.append(tok)
+        else:
+            prefix = tok.endswith("*")
+            words = tok.strip('"').rstrip("*").replace('"', "")
+            if not words.strip():
+                continue
+            out.append(f'"{words}"' + ("*" if prefix else ""))
+    return " ".join(out)
+
+def _fallback_query(pubmed_query):
+    # Plain AND of every word, for queries whose boolean structure is broken
+    words = re.findall(r"\w+", re.sub(r"\[[^\]]*\]", " ", pubmed_query))
+    words = [w for w in words if w.upper() not in ("AND", "OR", "NOT")]
+    return " AND ".join(f'"{w}"' for w in words)
+
+# === 3. Ranked search ===
+def search(conn, pubmed_query, limit=20, sources=None):
+    """Return [(source, source_id, score)] ranked by BM25 (lower is better)."""
+    sql = (
+        f"SELECT source, source_id, bm25(article_fts, {', '.join(map(str, WEIGHTS))}) AS score "
+        f"FROM article_fts WHERE article_fts MATCH ?"
+    )
+    params = []
+    if sources:
+        sql += f" AND source IN ({','.join('?' * len(sources))})"
+        params.extend(sources)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+
+    for match in (to_fts_query(pubmed_query), _fallback_query(pubmed_query)):
+        if not match:
+            continue
+        try:
+            return conn.execute(sql, [match, *params]).fetchall()
+        except sqlite3.OperationalError:
+            continue  # malformed boolean expression; try the fallback
+    return []
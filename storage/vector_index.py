@@ -0,0 +1,321 @@
+# storage/vector_index.py
+#
+# Embeddings for stored articles, kept next to the article store:
+#   data/vectors/embeddings.f32  float32 rows, appended, read via np.memmap
+#   data/vectors/df.i32          hashed document frequencies for idf
+#   embeddings table             (source, source_id) -> row, in articles.db
+# Only articles without a row are embedded, so adding a fetch result costs
+# the new abstracts only. Search is brute-force cosine (one BLAS matvec
+# over the memmap); with hnswlib installed, large indexes use HNSW instead.
+# Writers (API workers, a --sync run) may be separate processes; appends
+# are serialized with a lock file next to the vectors.
+#
+# idf is baked into each row when it is embedded, against the document
+# frequencies of that moment, and rows are never re-weighted. As the corpus
+# grows, older rows keep the idf of a smaller corpus: the drift is mild
+# (idf is logarithmic) but it adds up, so --sync suggests a --rebuild once
+# the index has grown REBUILD_GROWTH times since idf was last computed.
+#
+#   python -m storage.vector_index --sync               # embed what's missing
+#   python -m storage.vector_index --query "..." --k 10
+
+import argparse
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from nlp.embedder import HashingEmbedder, article_text, DF_BUCKETS
+from storage.article_store import get_store
+from utils.metrics import timed
+
+try:
+    import hnswlib
+except ImportError:  # optional ANN; brute force otherwise
+    hnswlib = None
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; only the in-process lock applies there
+    fcntl = None
+
+VECTOR_DIR = os.getenv("VECTOR_DIR", "data/vectors")
+ANN_MIN_ROWS = int(os.getenv("ANN_MIN_ROWS", "50000"))  # below this, brute force wins anyway
+ID_KEYS = {"pubmed": "pmid", "arxiv": "id", "semantic": "paper_id"}
+REBUILD_GROWTH = 2.0  # rows now / rows when idf was last computed, before --sync suggests a rebuild
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    source    TEXT NOT NULL,
+    source_id TEXT NOT NULL,
+    row       INTEGER NOT NULL,
+    PRIMARY KEY (source, source_id)
+);
+"""
+
+class VectorIndex:
+    def __init__(self, store=None, path=VECTOR_DIR, embedder=None):
+        self.store = store or get_store()
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self.vec_path = os.path.join(path, "embeddings.f32")
+        self.df_path = os.path.join(path, "df.i32")
+        self.lock_path = os.path.join(path, "write.lock")
+        self.meta_path = os.path.join(path, "meta.json")
+        os.makedirs(path, exist_ok=True)
+        self.store.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._ann = None
+
+        # Under the write lock, so no other process sees a half-written file
+        with self._write_lock():
+            if not os.path.exists(self.df_path):
+                np.zeros(DF_BUCKETS, dtype=np.int32).tofile(self.df_path)
+            self.df = np.memmap(self.df_path, dtype=np.int32, mode="r+", shape=(DF_BUCKETS,))
+            if os.path.exists(self.vec_path) and os.path.getsize(self.vec_path) % (4 * self.dim):
+                raise ValueError(f"{self.vec_path} does not hold {self.dim}-d vectors; "
+                                 "run `python -m storage.vector_index --rebuild`")
+
+    @contextmanager
+    def _write_lock(self):
+        # Thread lock for this process, flock for the others sharing the files
+        with self._lock, open(self.lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield  # closing the file releases the flock
+
+    # --- idf bookkeeping ---
+    def _idf_rows(self):
+        if not os.path.exists(self.meta_path):
+            return 0
+        with open(self.meta_path) as f:
+            return json.load(f).get("idf_rows", 0)
+
+    def _set_idf_rows(self, rows):
+        with open(self.meta_path, "w") as f:
+            json.dump({"idf_rows": rows}, f)
+
+    def idf_stale(self):
+        """True once the index has outgrown the corpus its oldest idf weights came from."""
+        baseline = self._idf_rows()
+        return bool(baseline) and self.size > REBUILD_GROWTH * baseline
+
+    # --- rows ---
+    @property
+    def size(self):
+        return os.path.getsize(self.vec_path) // (4 * self.dim) if os.path.exists(self.vec_path) else 0
+
+    def matrix(self):
+        # Re-map only when rows were appended since the last call
+        size = self.size
+        if self._matrix is None or self._matrix.shape[0] != size:
+            self._matrix = (np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(size, self.dim))
+                            if size else np.zeros((0, self.dim), dtype=np.float32))
+        return self._matrix
+
+    def rows_for(self, source, ids):
+        found = {}
+        ids = [str(i) for i in ids]
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            found.update(self.store.conn.execute(
+                f"SELECT source_id, row FROM embeddings WHERE source = ? "
+                f"AND source_id IN ({','.join('?' * len(chunk))})",
+                [source, *chunk],
+            ))
+        return found
+
+    def add(self, source, records, id_key=None, n_docs=None):
+        """Embed records that have no row yet; returns how many were added.
+
+        With n_docs, df already counts these records (see rebuild) and idf
+        is taken over n_docs documents.
+        """
+        # Row numbers come from the file size, so the size read, the append
+        # and the row mapping must not interleave with another writer's
+        with self._write_lock():
+            return self._append(source, records, id_key or ID_KEYS[source], n_docs)
+
+    def _append(self, source, records, id_key, n_docs=None):
+        # add() without taking the write lock; the caller holds it
+        records = {str(r[id_key]): r for r in records if r.get(id_key)}
+        known = self.rows_for(source, records)
+        new = [(sid, r) for sid, r in records.items() if sid not in known]
+        if not new:
+            return 0
+        texts = [article_text(source, r) for _, r in new]
+        start = self.size
+        if n_docs is None:
+            vectors = self.embedder.embed(texts, self.df, start + len(new), count_df=True)
+        else:
+            vectors = self.embedder.embed(texts, self.df, n_docs)
+        self.df.flush()
+        if start == 0:
+            self._set_idf_rows(len(new))
+        with open(self.vec_path, "ab") as f:
+            f.write(vectors.tobytes())
+        with self.store.conn:
+            self.store.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (source, source_id, row) VALUES (?, ?, ?)",
+                [(source, sid, start + i) for i, (sid, _) in enumerate(new)],
+            )
+        return len(new)
+
+    def embed_query(self, text):
+        return self.embedder.embed([text], self.df, self.size)[0]
+
+    # --- search ---
+    def scores(self, query_vec, rows):
+        # Cosine similarity = dot product; rows are already unit length
+        if not rows:
+            return np.zeros(0, dtype=np.float32)
+        return self.matrix()[np.asarray(rows)] @ query_vec
+
+    def search(self, query, k=10, sources=None):
+        """Top-k [(source, source_id, score)] over every embedded article."""
+        query_vec = self.embed_query(query)
+        matrix = self.matrix()
+        if not len(matrix):
+            return []
+        # Over-fetch when filtering by source so k survive the filter
+        want = min(len(matrix), k * 4 if sources else k)
+        if hnswlib is not None and len(matrix) >= ANN_MIN_ROWS:
+            labels, distances = self._ann_index().knn_query(query_vec, k=want)
+            top, top_scores = labels[0], 1 - distances[0]
+        else:
+            all_scores = matrix @ query_vec
+            top = np.argpartition(-all_scores, want - 1)[:want]
+            top = top[np.argsort(-all_scores[top])]
+            top_scores = all_scores[top]
+
+        by_row = {row: (source, source_id) for row, source, source_id in self.store.conn.execute(
+            f"SELECT row, source, source_id FROM embeddings WHERE row IN ({','.join('?' * len(top))})",
+            [int(r) for r in top],
+        )}
+        hits = []
+        for row, score in zip(top, top_scores):
+            if int(row) not in by_row:
+                continue
+            source, source_id = by_row[int(row)]
+            if sources and source not in sources:
+                continue
+            hits.append((source, source_id, float(score)))
+        return hits[:k]
+
+    def _ann_index(self):
+        # HNSW built once, then topped up with rows appended since
+        matrix = self.matrix()
+        if self._ann is None:
+            self._ann = hnswlib.Index(space="ip", dim=self.dim)
+            self._ann.init_index(max_elements=len(matrix) * 2, ef_construction=200, M=16)
+            self._ann.set_ef(100)
+        count = self._ann.get_current_count()
+        if count < len(matrix):
+            if len(matrix) > self._ann.get_max_elements():
+                self._ann.resize_index(len(matrix) * 2)
+            self._ann.add_items(matrix[count:], np.arange(count, len(matrix)))
+        return self._ann
+
+    # --- maintenance ---
+    def _missing(self, batch):
+        # (source, records) batches of stored articles that have no vector
+        # yet. Each page is read in full and the next one starts after its
+        # last rowid, so callers may insert embeddings between pages.
+        for source in ID_KEYS:
+            after = 0
+            while True:
+                chunk = self.store.conn.execute(
+                    "SELECT a.rowid, a.record FROM articles a LEFT JOIN embeddings e "
+                    "ON e.source = a.source AND e.source_id = a.source_id "
+                    "WHERE a.source = ? AND a.rowid > ? AND e.row IS NULL ORDER BY a.rowid LIMIT ?",
+                    (source, after, batch),
+                ).fetchall()
+                if not chunk:
+                    break
+                after = chunk[-1][0]
+                yield source, [json.loads(r[1]) for r in chunk]
+
+    def sync(self, batch=2000, n_docs=None):
+        """Embed every stored article that has no vector yet."""
+        return sum(self.add(source, records, n_docs=n_docs) for source, records in self._missing(batch))
+
+    def rebuild(self, batch=2000):
+        """Embed everything again in two passes: the first counts document
+        frequencies, the second embeds every row with the final idf. Other
+        writers wait for both passes, so no row gets a different idf."""
+        with self._write_lock():
+            with self.store.conn:
+                self.store.conn.execute("DELETE FROM embeddings")
+            for path in (self.vec_path, self.meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            # Zeroed in place: other processes' memmaps of df.i32 see the new counts
+            self.df[:] = 0
+            self._matrix = None
+            self._ann = None
+            n_docs = 0
+            for source, records in self._missing(batch):
+                records = [r for r in records if r.get(ID_KEYS[source])]
+                self.embedder.count_df([article_text(source, r) for r in records], self.df)
+                n_docs += len(records)
+            self.df.flush()
+            added = sum(self._append(source, records, ID_KEYS[source], n_docs)
+                        for source, records in self._missing(batch))
+            self._set_idf_rows(self.size)
+        return added
+
+# === Reranking fetched articles ===
+@timed("rerank")
+def rerank(articles, intent, source="pubmed", top_k=None):
+    """Order articles by cosine similarity to intent; sets "relevance".
+
+    Missing embeddings are computed first (new articles only). Articles
+    without an id keep their place at the end.
+    """
+    if not articles or not intent:
+        return articles[:top_k] if top_k else articles
+    index = get_vector_index()
+    id_key = ID_KEYS[source]
+    index.add(source, articles, id_key)
+    rows = index.rows_for(source, [a[id_key] for a in articles if a.get(id_key)])
+    ranked = [a for a in articles if str(a.get(id_key)) in rows]
+    scores = index.scores(index.embed_query(intent), [rows[str(a[id_key])] for a in ranked])
+    for article, score in zip(ranked, scores):
+        article["relevance"] = round(float(score), 4)
+    ranked.sort(key=lambda a: a["relevance"], reverse=True)
+    ranked += [a for a in articles if str(a.get(id_key)) not in rows]
+    return ranked[:top_k] if top_k else ranked
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_vector_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VectorIndex()
+    return _index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local embedding index over the article store")
+    parser.add_argument("--sync", action="store_true", help="Embed stored articles that have no vector yet")
+    parser.add_argument("--rebuild", action="store_true", help="Drop all vectors and embed everything again")
+    parser.add_argument("--query", type=str, default=None, help="Search the index")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    index = get_vector_index()
+    if args.rebuild:
+        print(f"🔁 Re-embedded {index.rebuild()} articles")
+    elif args.sync:
+        print(f"✅ Embedded {index.sync()} new articles ({index.size} total)")
+        if index.idf_stale():
+            print(f"⚠️  The index has grown over {REBUILD_GROWTH:g}x since idf was computed; "
+                  "older rows are weighted for a smaller corpus. Run --rebuild to refresh them")
+    if args.query:
+        for source, source_id, score in index.search(args.query, args.k):
+            record = index.store.get_record(source, source_id) or {}
+            print(f"{score:.3f}  [{source}:{source_id}] {record.get('title', '')}")
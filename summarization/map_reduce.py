@@ -0,0 +1,228 @@
+# summarization/map_reduce.py
+#
+# Incremental map-reduce literature review:
+#   map    - each stable chunk of abstracts -> chunk summary
+#   reduce - groups of summaries -> higher-level summaries, up to one review
+# Every node is stored under a hash of what it was built from, so after the
+# article set changes only the affected chunks and their path to the root
+# are sent to the LLM again. A node whose summary failed leaves its parent
+# "partial": built from the other children, reported, and never stored, so
+# the next run retries the missing part.
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from summarization.packer import pack_stable, _stable_hash
+from summarization.summarizer import (
+    LLM_MODEL, CONCURRENCY, TOKENS_PER_MINUTE, PROMPT_TOKEN_BUDGET,
+    acomplete, build_messages, summarize_chunks_async, load_filtered_abstracts,
+)
+from utils.rate_limit import AsyncTokenBudget
+
+SUMMARY_DB_PATH = os.getenv("SUMMARY_DB_PATH", "data/summaries.db")
+REDUCE_FAN_IN = 8     # max summaries merged per reduce call
+REDUCE_BOUNDARY = 4   # content-defined group boundary, as in pack_stable
+PROMPT_VERSION = "v1"  # bump when the map/reduce prompts change
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summary_nodes (
+    node_hash  TEXT PRIMARY KEY,
+    level      INTEGER NOT NULL,
+    article_ids TEXT NOT NULL,
+    summary    TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+# ========== 1. Node store ==========
+class SummaryStore:
+    def __init__(self, path=SUMMARY_DB_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def get_many(self, hashes):
+        found = {}
+        hashes = list(hashes)
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT node_hash, summary FROM summary_nodes WHERE node_hash IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            found.update(rows)
+        return found
+
+    def put(self, node_hash, level, article_ids, summary):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO summary_nodes (node_hash, level, article_ids, summary, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (node_hash, level, json.dumps(article_ids), summary, time.time()),
+            )
+
+def node_hash(*parts):
+    digest = hashlib.sha256()
+    for part in (LLM_MODEL, PROMPT_VERSION, *parts):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+# ========== 2. Reduce prompt ==========
+def build_reduce_messages(summaries):
+    joined = "\n\n".join(f"### Part {i}\n{s}" for i, s in enumerate(summaries, 1))
+    prompt = f"""
+You are a scientific assistant writing a literature review.
+
+Below are summaries of groups of medical journal abstracts. Merge them into one
+coherent summary:
+- Consolidate the **statistical analysis** methods, noting how common each is
+- Merge **key findings**, keeping conflicting results visible
+- Keep the bracketed article IDs (e.g. [12345678]) as citations
+- Do not invent anything that is not in the summaries.
+
+Summaries:
+{joined}
+
+Respond in well-organized markdown format.
+"""
+    return [
+        {"role": "system", "content": "You are a helpful scientific assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
+async def areduce(summaries, budget=None):
+    return await acomplete(build_reduce_messages(summaries), budget)
+
+# ========== 3. Build the tree, reusing stored nodes ==========
+def group_nodes(nodes):
+    # Content-defined grouping so one changed child only moves its own group
+    groups, current = [], []
+    for node in nodes:
+        current.append(node)
+        if len(current) >= REDUCE_FAN_IN or (len(current) >= 2 and _stable_hash(node["hash"]) % REDUCE_BOUNDARY == 0):
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    return groups
+
+async def run_level(store, nodes, level, worker, concurrency, token_budget):
+    """Compute the summaries missing from `nodes`; returns (llm_calls, failures).
+
+    Partial nodes are neither looked up nor stored: their hash names the
+    complete set of children, which they weren't built from.
+    """
+    cached = store.get_many(n["hash"] for n in nodes if not n.get("partial"))
+    for node in nodes:
+        node["summary"] = cached.get(node["hash"])
+    todo = [n for n in nodes if n["summary"] is None]
+    if not todo:
+        return 0, []
+
+    results = await summarize_chunks_async([n["input"] for n in todo], concurrency, 0, worker,
+                                           budget=token_budget)
+    failures = []
+    for node, result in zip(todo, results):
+        if result["summary"] is None:
+            failures.append({"level": level, "ids": node["ids"], "error": result["error"]})
+            continue
+        node["summary"] = result["summary"]
+        if not node.get("partial"):
+            store.put(node["hash"], level, node["ids"], result["summary"])
+    return len(todo), failures
+
+async def build_review_async(articles, store=None, concurrency=CONCURRENCY, tokens_per_minute=TOKENS_PER_MINUTE,
+                             budget=PROMPT_TOKEN_BUDGET):
+    """Return {"review", "chunks", "llm_calls", "reused", "failures", "missing_ids"}.
+
+    `failures` lists the nodes that could not be summarized; the articles
+    under them (`missing_ids`) are not covered by the review.
+    """
+    store = store or SummaryStore()
+    chunks = pack_stable(articles, budget, LLM_MODEL)
+    # One token budget for every level of the tree, not one per level
+    token_budget = AsyncTokenBudget(tokens_per_minute) if tokens_per_minute else None
+
+    # Map: leaf hash covers the exact prompt text, i.e. member IDs + abstracts
+    nodes = [{"hash": node_hash("map", c["text"]), "ids": c["ids"], "input": c["text"]} for c in chunks]
+    calls, failures = await run_level(store, nodes, 0, lambda text, b: acomplete(build_messages(text), b),
+                                      concurrency, token_budget)
+    total_nodes = len(nodes)  # every map/reduce node needed, computed or reused
+
+    # Reduce until a single root remains. Failed nodes stay in place so the
+    # groups (and hashes) above them are the ones a complete run would have.
+    level = 0
+    while len(nodes) > 1:
+        level += 1
+        parents = []
+        for group in group_nodes(nodes):
+            if len(group) == 1:
+                parents.append(group[0])  # nothing to merge; carry up as-is
+                continue
+            done = [n for n in group if n["summary"] is not None]
+            parent = {
+                "hash": node_hash("reduce", *(n["hash"] for n in group)),
+                "ids": [i for n in group for i in n["ids"]],
+                "input": [n["summary"] for n in done],
+                "partial": len(done) < len(group) or any(n.get("partial") for n in group),
+            }
+            if not done:
+                parent["summary"] = None  # every child failed; nothing to merge
+            parents.append(parent)
+        new_nodes = [p for p in parents if "summary" not in p]
+        level_calls, level_failures = await run_level(store, new_nodes, level, areduce, concurrency, token_budget)
+        calls += level_calls
+        failures += level_failures
+        total_nodes += len(new_nodes)
+        nodes = parents
+
+    return {
+        "review": (nodes[0]["summary"] or "") if nodes else "",
+        "chunks": len(chunks),
+        "llm_calls": calls,
+        "reused": total_nodes - calls,
+        "failures": failures,
+        "missing_ids": list(dict.fromkeys(i for f in failures for i in f["ids"])),
+    }
+
+def build_review(articles, **kwargs):
+    return asyncio.run(build_review_async(articles, **kwargs))
+
+# ========== 4. Save + CLI ==========
+def save_review(result, out_path="data/processed/pubmed_review.md"):
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w") as f:
+        f.write("# Literature Review\n\n")
+        f.write(result["review"])
+        f.write("\n")
+    print(f"✅ Review saved to {out_path}")
+
+def run(file_path, concurrency, tokens_per_minute):
+    abstracts = load_filtered_abstracts(file_path)
+    print(f"✅ Loaded {len(abstracts)} filtered abstracts.")
+
+    result = build_review(abstracts, concurrency=concurrency, tokens_per_minute=tokens_per_minute)
+    print(f"📚 {result['chunks']} chunks; {result['llm_calls']} LLM calls, {result['reused']} summaries reused")
+    for failure in result["failures"]:
+        print(f"⚠️  level {failure['level']} ({len(failure['ids'])} articles) failed: {failure['error']}")
+    if result["missing_ids"]:
+        print(f"⚠️  The review is incomplete: {len(result['missing_ids'])} articles are not covered; "
+              "run again to retry them")
+    save_review(result)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental map-reduce literature review")
+    parser.add_argument("--file", default="data/raw/pubmed_filtered.json", help="Filtered abstracts JSON or .corpus")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--tpm", type=int, default=TOKENS_PER_MINUTE, help="Token-per-minute budget (0 = unlimited)")
+    args = parser.parse_args()
+
+    run(args.file, args.concurrency, args.tpm)
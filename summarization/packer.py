@@ -0,0 +1,179 @@
+# summarization/packer.py
+
+import hashlib
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # optional; fall back to a character estimate
+    tiktoken = None
+
+# Tokens available for abstracts in one request, on top of the fixed prompt
+# template. Kept well under the model's context window so the model still
+# has room to reason and the completion budget (MAX_TOKENS) always fits.
+TARGET_PROMPT_TOKENS = 6000
+MESSAGE_OVERHEAD = 4  # per chat message framing tokens
+
+ID_KEYS = ("pmid", "pubmed_id", "id", "paper_id")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+
+# === 1. Token counting ===
+@lru_cache(maxsize=None)
+def _encoding(model):
+    # None without tiktoken, or when it can't download its BPE file
+    # (offline runs without a TIKTOKEN_CACHE_DIR; requests' errors are OSErrors)
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except OSError as e:
+        print(f"⚠️  tiktoken encoding unavailable ({type(e).__name__}); estimating tokens from characters")
+        return None
+
+def count_tokens(text, model="gpt-4-turbo"):
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+def prompt_overhead(build_messages, model="gpt-4-turbo"):
+    # Tokens the prompt costs with no abstracts in it
+    messages = build_messages("")
+    return sum(count_tokens(m["content"], model) + MESSAGE_OVERHEAD for m in messages)
+
+# === 2. Articles -> sized pieces, splitting oversized abstracts ===
+def article_id(entry):
+    for key in ID_KEYS:
+        if entry.get(key):
+            return str(entry[key])
+    return ""
+
+def format_piece(aid, title, text, part=None):
+    label = f" (part {part[0]}/{part[1]})" if part else ""
+    return f"\n[{aid}] Title: {title}{label}\nAbstract: {text}\n"
+
+def _split_units(entry):
+    # Structured abstracts split on their sections, anything else on sentences
+    sections = entry.get("abstract_sections") or []
+    if len(sections) > 1:
+        return [f"{s['label']}: {s['text']}" if s.get("label") else s["text"] for s in sections if s.get("text")]
+    return SENTENCE_RE.split(entry.get("abstract", ""))
+
+def article_pieces(entry, capacity, model="gpt-4-turbo"):
+    """Return [(article_id, text, tokens)]; one piece unless it won't fit."""
+    aid = article_id(entry)
+    title = entry.get("title", "")
+    abstract = entry.get("abstract", "")
+    text = format_piece(aid, title, abstract)
+    tokens = count_tokens(text, model)
+    if tokens <= capacity:
+        return [(aid, text, tokens)]
+
+    # Greedily regroup sections/sentences into parts that each fit
+    header = count_tokens(format_piece(aid, title, "", (99, 99)), model)
+    groups, current, current_tokens = [], [], 0
+    for unit in _split_units(entry):
+        unit_tokens = count_tokens(unit, model) + 1
+        if current and current_tokens + unit_tokens > capacity - header:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        groups.append(current)
+
+    pieces = []
+    for i, group in enumerate(groups, 1):
+        piece = format_piece(aid, title, " ".join(group), (i, len(groups)))
+        pieces.append((aid, piece, count_tokens(piece, model)))
+    return pieces
+
+# === 3. Bin packing ===
+def pack_abstracts(abstracts, build_messages, budget=TARGET_PROMPT_TOKENS, model="gpt-4-turbo"):
+    """First-fit-decreasing packing of abstracts into prompt-sized chunks.
+
+    Returns [{"text", "ids", "tokens", "fill"}] where `tokens` counts the
+    whole prompt (template included) and `fill` is abstract tokens / budget.
+    """
+    capacity = budget
+    pieces = []  # (article order, piece order, article id, text, tokens)
+    for order, entry in enumerate(abstracts):
+        if not entry.get("abstract"):
+            continue
+        for aid, text, tokens in article_pieces(entry, capacity, model):
+            pieces.append((order, len(pieces), aid, text, tokens))
+
+    # Largest pieces first; each goes into the first bin it fits in
+    bins = []
+    for piece in sorted(pieces, key=lambda p: -p[4]):
+        for b in bins:
+            if b["used"] + piece[4] <= capacity:
+                b["pieces"].append(piece)
+                b["used"] += piece[4]
+                break
+        else:
+            bins.append({"pieces": [piece], "used": piece[4]})
+
+    overhead = prompt_overhead(build_messages, model)
+    chunks = []
+    for b in bins:
+        ordered = sorted(b["pieces"], key=lambda p: (p[0], p[1]))  # reading order
+        chunks.append((ordered[0][:2], {
+            "text": "".join(p[3] for p in ordered),
+            "ids": list(dict.fromkeys(p[2] for p in ordered)),
+            "tokens": b["used"] + overhead,
+            "fill": b["used"] / capacity,
+        }))
+    # Chunks in order of the first article they contain
+    return [c for _, c in sorted(chunks, key=lambda c: c[0])]
+
+def pack_stable(abstracts, budget=TARGET_PROMPT_TOKENS, model="gpt-4-turbo", boundary_mod=8, min_fill=0.5):
+    """Pack for incremental re-summarization rather than minimum calls.
+
+    Articles are taken in article-ID order and chunks are closed at
+    content-defined boundaries (an article whose ID hash is 0 mod
+    `boundary_mod`, once the chunk is at least `min_fill` full) or when the
+    budget is reached. Adding or removing a few articles then only changes
+    the chunks around them; every other chunk keeps the same members.
+    """
+    capacity = budget
+    pieces = []
+    for entry in sorted((a for a in abstracts if a.get("abstract")), key=article_id):
+        pieces.extend(article_pieces(entry, capacity, model))
+
+    chunks, current, used = [], [], 0
+    for aid, text, tokens in pieces:
+        if current and used + tokens > capacity:
+            chunks.append((current, used))
+            current, used = [], 0
+        current.append((aid, text))
+        used += tokens
+        if used >= capacity * min_fill and _stable_hash(aid) % boundary_mod == 0:
+            chunks.append((current, used))
+            current, used = [], 0
+    if current:
+        chunks.append((current, used))
+
+    return [
+        {
+            "text": "".join(t for _, t in members),
+            "ids": list(dict.fromkeys(a for a, _ in members)),
+            "tokens": used,
+            "fill": used / capacity,
+        }
+        for members, used in chunks
+    ]
+
+def _stable_hash(text):
+    # hash() is salted per process; boundaries must be stable across runs
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+
+def packing_report(chunks):
+    if not chunks:
+        return {"chunks": 0, "mean_fill": 0.0, "min_fill": 0.0}
+    fills = [c["fill"] for c in chunks]
+    return {"chunks": len(chunks), "mean_fill": sum(fills) / len(fills), "min_fill": min(fills)}
@@ -1,101 +1,227 @@
-# summarization/summarize_pubmed.py
-
-import os
-import json
-import argparse
-import openai  # or any LLM client you want
-from tqdm import tqdm
-
-# ========== SETTINGS ==========
-LLM_MODEL = "gpt-4-turbo"  # or your available model
-CHUNK_SIZE = 3000  # characters per prompt chunk (adjust as needed)
-
-# ========== 1. Load abstracts ==========
-def load_filtered_abstracts(file_path="data/raw/pubmed_filtered.json"):
-    with open(file_path, "r") as f:
-        return json.load(f)
-
-# ========== 2. Split abstracts into manageable chunks ==========
-def chunk_abstracts(abstracts):
-    chunks = []
-    current_chunk = ""
-
-    for entry in abstracts:
-        abstract = entry.get("abstract", "")
-        if not abstract:
-            continue
-
-        if len(current_chunk) + len(abstract) > CHUNK_SIZE:
-            chunks.append(current_chunk)
-            current_chunk = ""
-
-        current_chunk += f"\nTitle: {entry.get('title', '')}\nAbstract: {abstract}\n"
-
-    if current_chunk:
-        chunks.append(current_chunk)
-
-    return chunks
-
-# ========== 3. Summarize using LLM ==========
-def summarize_chunk(chunk):
-    prompt = f"""
-You are a scientific assistant.
-
-I will give you several medical journal abstracts below. Your task:
-- Focus on identifying the types of **statistical analysis** discussed
-- Summarize **key findings** if present
-- List **methodologies** or techniques used
-- Write clean, bullet-point summaries.
-
-Abstracts:
-{chunk}
-
-Respond in well-organized markdown format.
-"""
-    try:
-        response = openai.ChatCompletion.create(
-            model=LLM_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a helpful scientific assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=2000,
-        )
-        return response["choices"][0]["message"]["content"]
-    except Exception as e:
-        print(f"Error during summarization: {e}")
-        return None
-
-# ========== 4. Save Summaries ==========
-def save_summaries(summaries, out_path="data/processed/pubmed_summary.md"):
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    with open(out_path, "w") as f:
-        for idx, summary in enumerate(summaries, 1):
-            f.write(f"## Summary Chunk {idx}\n\n")
-            f.write(summary)
-            f.write("\n\n")
-    print(f"✅ Summaries saved to {out_path}")
-
-# ========== 5. Main Function ==========
-def run():
-    abstracts = load_filtered_abstracts()
-    print(f"✅ Loaded {len(abstracts)} filtered abstracts.")
-
-    chunks = chunk_abstracts(abstracts)
-    print(f"📚 Split into {len(chunks)} chunks.")
-
-    summaries = []
-    for chunk in tqdm(chunks, desc="Summarizing"):
-        summary = summarize_chunk(chunk)
-        if summary:
-            summaries.append(summary)
-
-    save_summaries(summaries)
-
-# ========== 6. CLI ==========
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    args = parser.parse_args()
-
-    run()
+# summarization/summarize_pubmed.py
+
+import os
+import json
+import argparse
+import asyncio
+import random
+import openai  # or any LLM client you want
+from tqdm import tqdm
+from utils.rate_limit import AsyncTokenBudget
+from utils import llm_cache, metrics
+from summarization.packer import pack_abstracts, packing_report, TARGET_PROMPT_TOKENS
+from storage.corpus import is_corpus, open_corpus
+
+# ========== SETTINGS ==========
+LLM_MODEL = "gpt-4-turbo"  # or your available model
+PROMPT_TOKEN_BUDGET = int(os.getenv("SUMMARY_PROMPT_TOKENS", str(TARGET_PROMPT_TOKENS)))  # abstract tokens per chunk
+MAX_TOKENS = 2000  # completion tokens per summary
+TEMPERATURE = 0   # deterministic, so repeated chunks are served from the LLM cache
+CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))  # chunks in flight at once
+TOKENS_PER_MINUTE = int(os.getenv("SUMMARY_TPM", "30000"))  # prompt + completion budget
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0  # seconds; doubled per attempt, with jitter
+BACKOFF_CAP = 30.0
+
+# Point OPENAI_API_BASE at a local OpenAI-compatible server to run offline
+if os.getenv("OPENAI_API_BASE"):
+    openai.api_base = os.getenv("OPENAI_API_BASE")
+
+# ========== 1. Load abstracts ==========
+def load_filtered_abstracts(file_path="data/raw/pubmed_filtered.json", columns=None):
+    # A .corpus directory (python -m storage.corpus convert) is read lazily,
+    # block by block, instead of parsing the whole JSON file up front
+    if is_corpus(file_path):
+        return open_corpus(file_path, columns)
+    with open(file_path, "r") as f:
+        return json.load(f)
+
+# ========== 2. Split abstracts into manageable chunks ==========
+def pack_chunks(abstracts, budget=PROMPT_TOKEN_BUDGET):
+    # Token-measured bin packing; each chunk keeps the IDs of its articles
+    return pack_abstracts(abstracts, build_messages, budget, LLM_MODEL)
+
+def chunk_abstracts(abstracts, budget=PROMPT_TOKEN_BUDGET):
+    return [c["text"] for c in pack_chunks(abstracts, budget)]
+
+# ========== 3. Summarize using LLM ==========
+def build_messages(chunk):
+    prompt = f"""
+You are a scientific assistant.
+
+I will give you several medical journal abstracts below. Your task:
+- Focus on identifying the types of **statistical analysis** discussed
+- Summarize **key findings** if present
+- List **methodologies** or techniques used
+- Write clean, bullet-point summaries.
+
+Abstracts:
+{chunk}
+
+Respond in well-organized markdown format.
+"""
+    return [
+        {"role": "system", "content": "You are a helpful scientific assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
+def summarize_chunk(chunk):
+    try:
+        response = llm_cache.chat_completion(
+            model=LLM_MODEL,
+            messages=build_messages(chunk),
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+        )
+        return response["choices"][0]["message"]["content"]
+    except Exception as e:
+        print(f"Error during summarization: {e}")
+        return None
+
+# ========== 3b. Async engine: bounded concurrency, TPM budget, retries ==========
+def estimate_tokens(messages):
+    # ~4 characters per token for English prompts, plus the completion budget
+    return sum(len(m["content"]) for m in messages) // 4 + MAX_TOKENS
+
+def is_retryable(error):
+    if isinstance(error, (openai.error.RateLimitError, openai.error.ServiceUnavailableError,
+                          openai.error.Timeout, openai.error.APIConnectionError)):
+        return True
+    status = getattr(error, "http_status", None)
+    return status is not None and (status == 429 or status >= 500)
+
+def openai_retry_reason(error):
+    status = getattr(error, "http_status", None)
+    if isinstance(error, openai.error.RateLimitError):
+        status = 429
+    return metrics.retry_reason(status)
+
+def backoff_delay(error, attempt):
+    # Honor Retry-After when the server sends one, else jittered exponential
+    retry_after = (getattr(error, "headers", None) or {}).get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+async def acomplete(messages, budget=None):
+    """One chat completion, retrying 429/5xx; raises after MAX_RETRIES.
+
+    Returns (content, attempts); attempts is 0 for an LLM cache hit.
+    """
+    params = {"temperature": TEMPERATURE, "max_tokens": MAX_TOKENS}
+    # The cache is SQLite; its reads and writes stay off the event loop
+    cached = await asyncio.to_thread(llm_cache.lookup, LLM_MODEL, messages, **params)
+    if cached is not None:
+        return cached["choices"][0]["message"]["content"], 0
+
+    estimated = estimate_tokens(messages)
+    for attempt in range(MAX_RETRIES + 1):
+        if budget:
+            await budget.acquire(estimated)
+        try:
+            response = await openai.ChatCompletion.acreate(model=LLM_MODEL, messages=messages, **params)
+        except Exception as e:
+            if attempt == MAX_RETRIES or not is_retryable(e):
+                raise
+            metrics.UPSTREAM_RETRIES.inc(source="openai", reason=openai_retry_reason(e))
+            await asyncio.sleep(backoff_delay(e, attempt))
+            continue
+        metrics.record_llm_usage(LLM_MODEL, response)
+        if budget:
+            budget.settle(estimated, (response.get("usage") or {}).get("total_tokens"))
+        await asyncio.to_thread(llm_cache.store, LLM_MODEL, messages, response, **params)
+        return response["choices"][0]["message"]["content"], attempt + 1
+
+async def asummarize_chunk(chunk, budget=None):
+    return await acomplete(build_messages(chunk), budget)
+
+async def summarize_chunks_async(chunks, concurrency=CONCURRENCY, tokens_per_minute=TOKENS_PER_MINUTE,
+                                 summarize=asummarize_chunk, budget=None):
+    """Summarize every chunk; results come back in chunk order.
+
+    Each result is {"chunk", "summary", "error", "attempts"}; a chunk that
+    still fails after its retries has summary None and the error message
+    set instead of being dropped. Pass `budget` (an AsyncTokenBudget) to
+    share one token budget between concurrent calls.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    if budget is None and tokens_per_minute:
+        budget = AsyncTokenBudget(tokens_per_minute)
+    progress = tqdm(total=len(chunks), desc="Summarizing")
+
+    async def one(idx, chunk):
+        async with semaphore:
+            try:
+                summary, attempts = await summarize(chunk, budget)
+                result = {"chunk": idx, "summary": summary, "error": None, "attempts": attempts}
+            except Exception as e:
+                result = {"chunk": idx, "summary": None, "error": f"{type(e).__name__}: {e}", "attempts": None}
+            progress.update(1)
+            return result
+
+    try:
+        return await asyncio.gather(*(one(i, c) for i, c in enumerate(chunks, 1)))
+    finally:
+        progress.close()
+
+@metrics.timed("summarize")
+async def summarize_articles_async(articles, concurrency=CONCURRENCY, tokens_per_minute=TOKENS_PER_MINUTE,
+                                   budget=None):
+    # Tokenizing every abstract is CPU-bound; keep it off the event loop
+    chunks = await asyncio.to_thread(pack_chunks, articles)
+    results = await summarize_chunks_async([c["text"] for c in chunks], concurrency, tokens_per_minute,
+                                           budget=budget)
+    for result, chunk in zip(results, chunks):
+        result["ids"] = chunk["ids"]
+        result["fill"] = chunk["fill"]
+    return results
+
+def summarize_articles(articles, concurrency=CONCURRENCY, tokens_per_minute=TOKENS_PER_MINUTE):
+    # Sync entry point for main.py and api/app.py; async callers should
+    # await summarize_articles_async instead
+    return asyncio.run(summarize_articles_async(articles, concurrency, tokens_per_minute))
+
+def report_failures(results):
+    failed = [r for r in results if r["error"]]
+    if failed:
+        print(f"⚠️  {len(failed)} of {len(results)} chunks failed to summarize:")
+        for r in failed:
+            print(f"   chunk {r['chunk']}: {r['error']}")
+    return failed
+
+# ========== 4. Save Summaries ==========
+def save_summaries(summaries, out_path="data/processed/pubmed_summary.md"):
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w") as f:
+        for idx, summary in enumerate(summaries, 1):
+            f.write(f"## Summary Chunk {idx}\n\n")
+            f.write(summary)
+            f.write("\n\n")
+    print(f"✅ Summaries saved to {out_path}")
+
+# ========== 5. Main Function ==========
+def run(concurrency=CONCURRENCY, tokens_per_minute=TOKENS_PER_MINUTE):
+    abstracts = load_filtered_abstracts()
+    print(f"✅ Loaded {len(abstracts)} filtered abstracts.")
+
+    chunks = pack_chunks(abstracts)
+    report = packing_report(chunks)
+    print(f"📚 Packed into {report['chunks']} chunks "
+          f"(mean fill {report['mean_fill']:.0%}, min {report['min_fill']:.0%}).")
+
+    results = asyncio.run(summarize_chunks_async([c["text"] for c in chunks], concurrency, tokens_per_minute))
+    report_failures(results)
+
+    save_summaries([r["summary"] for r in results if r["summary"]])
+
+# ========== 6. CLI ==========
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Chunks summarized at once")
+    parser.add_argument("--tpm", type=int, default=TOKENS_PER_MINUTE, help="Token-per-minute budget (0 = unlimited)")
+    args = parser.parse_args()
+
+    run(args.concurrency, args.tpm)
@@ -0,0 +1,71 @@
+# tests/test_arxiv_ids.py
+#
+# The query API and OAI-PMH name the same paper differently; both must land
+# on one article-store row so OAI updates and deletions reach API entries.
+
+from ingestion.arxiv_ingestor import normalize_stored_ids
+from ingestion.arxiv_xml import arxiv_key, iter_arxiv_entries, iter_oai_records
+from storage.article_store import ArticleStore
+
+API_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>http://arxiv.org/abs/2301.00001v2</id>
+    <title>Survival models for sepsis</title>
+    <summary>Cox regression on ICU cohorts.</summary>
+  </entry>
+  <entry>
+    <id>http://arxiv.org/abs/hep-th/9901001v1</id>
+    <title>Strings</title>
+    <summary>Old-style identifier.</summary>
+  </entry>
+</feed>"""
+
+OAI_PAGE = """<?xml version="1.0" encoding="UTF-8"?>
+<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">
+  <ListRecords>
+    <record>
+      <header><identifier>oai:arXiv.org:2301.00001</identifier></header>
+      <metadata>
+        <arXiv xmlns="http://arxiv.org/OAI/arXiv/">
+          <id>2301.00001</id>
+          <title>Survival models for sepsis (revised)</title>
+          <abstract>Cox regression on ICU cohorts.</abstract>
+        </arXiv>
+      </metadata>
+    </record>
+    <record>
+      <header status="deleted"><identifier>oai:arXiv.org:hep-th/9901001</identifier></header>
+    </record>
+  </ListRecords>
+</OAI-PMH>"""
+
+def test_every_form_of_an_id_maps_to_one_key():
+    forms = ["http://arxiv.org/abs/2301.00001v3", "2301.00001", "oai:arXiv.org:2301.00001", " 2301.00001v1 "]
+    assert {arxiv_key(f) for f in forms} == {"http://arxiv.org/abs/2301.00001"}
+    assert arxiv_key("oai:arXiv.org:hep-th/9901001") == "http://arxiv.org/abs/hep-th/9901001"
+
+def test_oai_revisions_and_deletions_reach_api_entries(tmp_path):
+    store = ArticleStore(str(tmp_path / "articles.db"))
+    store.put_many("arxiv", list(iter_arxiv_entries(API_FEED)), "id")
+
+    state = {}
+    store.put_many("arxiv", list(iter_oai_records(OAI_PAGE, state)), "id")
+    store.delete_many("arxiv", [arxiv_key(i) for i in state["deleted"]])
+
+    rows = store.conn.execute("SELECT source_id, record FROM articles WHERE source = 'arxiv'").fetchall()
+    assert [sid for sid, _ in rows] == ["http://arxiv.org/abs/2301.00001"]
+    assert "(revised)" in rows[0][1]
+
+def test_versioned_ids_in_old_stores_are_moved(tmp_path):
+    store = ArticleStore(str(tmp_path / "articles.db"))
+    store.put_many("arxiv", [{"id": "http://arxiv.org/abs/2301.00001v1", "title": "v1", "summary": "kappa"}], "id")
+    store.conn.execute("UPDATE articles SET fetched_at = 1000")
+    store.conn.commit()
+    store.put_many("arxiv", [{"id": "http://arxiv.org/abs/2301.00001v2", "title": "v2", "summary": "kappa"}], "id")
+
+    assert normalize_stored_ids(store) == 2
+    rows = store.conn.execute("SELECT source_id, record FROM articles").fetchall()
+    assert len(rows) == 1 and rows[0][0] == "http://arxiv.org/abs/2301.00001" and '"v2"' in rows[0][1]
+    assert [r["title"] for _, r, _ in store.search("kappa")] == ["v2"]
+    assert normalize_stored_ids(store) == 0
@@ -0,0 +1,15 @@
+# tests/test_corpus.py
+
+import os
+
+from storage.corpus import open_corpus, write_corpus
+
+def test_rewriting_a_relative_path_drops_old_column_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    wide = [{"pmid": str(i), "title": f"t{i}", "abstract": "a", "journal": "j", "extra": i} for i in range(10)]
+    write_corpus("corpus", wide)
+    assert len([n for n in os.listdir("corpus") if n.endswith(".col")]) == 5
+
+    write_corpus("corpus", [{"pmid": "1", "title": "only"}])
+    assert sorted(os.listdir("corpus")) == ["0.col", "1.col", "meta.json"]
+    assert list(open_corpus("corpus")) == [{"pmid": "1", "title": "only"}]
@@ -0,0 +1,23 @@
+# tests/test_dedup.py
+
+from ingestion.dedup import dedupe, find_duplicates, merge_keys
+
+TITLE = "Machine learning in medicine: a review"
+
+def article(year, abstract="", **ids):
+    return {"title": TITLE, "abstract": abstract, "year": year, "ids": ids}
+
+def test_title_key_needs_a_year():
+    assert "title:machine learning in medicine a review:2019" in merge_keys(article(2019))
+    assert not [k for k in merge_keys(article(None)) if k.startswith("title:")]
+
+def test_same_title_different_papers_stay_apart():
+    first = article(2019, "Deep networks predict sepsis onset from vital signs in intensive care. " * 3, pubmed="1")
+    later = article(2023, semantic="s2-a")
+    clusters, _ = find_duplicates([first, later])
+    assert sorted(clusters) == [[0], [1]]
+
+def test_same_title_same_year_still_merges():
+    merged = dedupe([article(2019, "An abstract.", pubmed="1"), article(2019, semantic="s2-a")])
+    assert len(merged) == 1
+    assert merged[0]["ids"] == {"pubmed": "1", "semantic": "s2-a"}
@@ -0,0 +1,72 @@
+# tests/test_federated.py
+#
+# ingestion.federated with stand-in fetchers for the three sources.
+
+import asyncio
+
+import pytest
+
+from ingestion import federated
+from ingestion.federated import federated_search
+
+PUBMED = {"pmid": "111", "title": "Sepsis prediction with gradient boosting", "abstract": "A cohort study.",
+          "authors": ["A. Author"], "journal": "Crit Care", "pubdate": "2021 Mar", "doi": "10.1/sepsis"}
+ARXIV = {"id": "http://arxiv.org/abs/2101.00001v1", "title": "Transformers for ICU notes",
+         "summary": "We train a model.", "authors": ["B. Author"], "primary_category": "cs.CL",
+         "published": "2021-01-01T00:00:00Z", "doi": ""}
+SEMANTIC = {"paper_id": "s2-1", "title": "Sepsis prediction with gradient boosting", "abstract": "",
+            "authors": ["A. Author"], "venue": "Crit Care", "year": 2021, "url": "https://s2/1",
+            "external_ids": {"PubMed": "111"}}
+
+@pytest.fixture
+def fetchers(monkeypatch):
+    def install(**fetch):
+        for source, fn in fetch.items():
+            monkeypatch.setitem(federated.FETCHERS, source, fn)
+    return install
+
+async def stalls_after_first_batch(query, max_results, emit):
+    await emit([PUBMED])
+    await asyncio.sleep(60)
+
+def answers(records, delay=0.0):
+    async def fetch(query, max_results, emit):
+        await asyncio.sleep(delay)
+        await emit(records)
+    return fetch
+
+def search(**kwargs):
+    return asyncio.run(federated_search("sepsis", **kwargs))
+
+def test_a_slow_source_times_out_and_keeps_what_arrived(fetchers):
+    fetchers(pubmed=stalls_after_first_batch,
+             arxiv=answers([ARXIV]),
+             semantic=answers([SEMANTIC], delay=0.05))
+    result = search(budget={"pubmed": 0.2, "arxiv": 5, "semantic": 5})
+
+    pubmed = result["sources"]["pubmed"]
+    assert (pubmed["status"], pubmed["count"], pubmed["error"]) == ("timeout", 1, None)
+    assert 0.2 <= pubmed["elapsed"] < 5
+    assert result["sources"]["arxiv"]["status"] == result["sources"]["semantic"]["status"] == "ok"
+
+    # The PubMed record made it in, merged with its Semantic Scholar copy
+    by_title = {a["title"]: a for a in result["results"]}
+    assert len(result["results"]) == 2
+    merged = by_title[PUBMED["title"]]
+    assert merged["ids"] == {"pubmed": "111", "semantic": "s2-1"}
+    assert sorted(merged["sources"]) == ["pubmed", "semantic"]
+
+def test_a_failing_source_is_reported_as_an_error(fetchers):
+    async def broken(query, max_results, emit):
+        raise ConnectionError("S2 is down")
+
+    fetchers(pubmed=answers([PUBMED]), arxiv=answers([ARXIV]), semantic=broken)
+    result = search(budget=5)
+
+    assert result["sources"]["semantic"]["status"] == "error"
+    assert result["sources"]["semantic"]["error"] == "ConnectionError: S2 is down"
+    assert {a["title"] for a in result["results"]} == {PUBMED["title"], ARXIV["title"]}
+
+def test_unknown_sources_are_rejected():
+    with pytest.raises(ValueError):
+        search(sources=["pubmed", "scopus"])
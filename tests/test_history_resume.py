@@ -0,0 +1,65 @@
+# tests/test_history_resume.py
+#
+# Resuming a history-server pull must page the result set the checkpointed
+# offset was taken from, even after PubMed has gained records since.
+
+import pytest
+import requests
+
+from ingestion import pubmed_ingestor
+from ingestion.pubmed_ingestor import iter_history_windows
+
+class FakeHistory:
+    """esearch parks the current PMID list under a new WebEnv; PMIDs added
+    later go to the front (newest first), as in PubMed's default order."""
+
+    def __init__(self, pmids):
+        self.pmids = list(pmids)
+        self.sets = {}
+        self.searches = []
+
+    def esearch(self, query, dates=None):
+        self.searches.append(dates)
+        webenv = f"WE{len(self.searches)}"
+        self.sets[webenv] = [p for p in self.pmids if not dates or p < "5"]  # "5…" entered PubMed later
+        return len(self.sets[webenv]), webenv, "1"
+
+    def efetch(self, webenv, query_key, retstart, retmax=pubmed_ingestor.HISTORY_WINDOW):
+        if webenv not in self.sets:
+            raise requests.HTTPError("400 Client Error: Cannot retrieve history data")
+        return [{"pmid": p} for p in self.sets[webenv][retstart:retstart + retmax]]
+
+@pytest.fixture
+def server(monkeypatch):
+    fake = FakeHistory([str(1000 + i) for i in range(25)])
+    monkeypatch.setattr(pubmed_ingestor, "HISTORY_WINDOW", 10)
+    monkeypatch.setattr(pubmed_ingestor, "esearch_history", fake.esearch)
+    monkeypatch.setattr(pubmed_ingestor, "fetch_history_window", fake.efetch)
+    return fake
+
+def pull(history, start=0, stop_after=None):
+    pmids, next_start = [], start
+    for i, (next_start, _, records) in enumerate(iter_history_windows("q", start=start, history=history)):
+        pmids += [r["pmid"] for r in records]
+        if stop_after is not None and i + 1 == stop_after:
+            break
+    return pmids, next_start
+
+def test_resume_reuses_the_checkpointed_result_set(server):
+    history = {}
+    first, retstart = pull(history, stop_after=1)
+    server.pmids[:0] = ["5001", "5002", "5003"]  # new records while we were stopped
+
+    rest, _ = pull(history, start=retstart)
+    assert len(server.searches) == 1
+    assert first + rest == [str(1000 + i) for i in range(25)]
+
+def test_expired_history_is_searched_again_up_to_the_original_date(server):
+    history = {}
+    first, retstart = pull(history, stop_after=1)
+    server.pmids[:0] = ["5001", "5002", "5003"]
+    server.sets.clear()  # the history server dropped the WebEnv
+
+    rest, _ = pull(history, start=retstart)
+    assert server.searches[1] == {"datetype": "edat", "mindate": "1800/01/01", "maxdate": history["searched"]}
+    assert first + rest == [str(1000 + i) for i in range(25)]
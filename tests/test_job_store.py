@@ -0,0 +1,100 @@
+# tests/test_job_store.py
+#
+# jobs.store.JobStore claiming and crash recovery. Each worker process has its
+# own JobStore (and connection) on the shared file, as in production.
+
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from jobs import worker
+from jobs.store import JobStore, QUEUED, RUNNING, SUCCEEDED
+
+def claim_all(path, owner):
+    store = JobStore(path)
+    claimed = []
+    while (job := store.claim_next(owner)) is not None:
+        claimed.append(job["id"])
+    return claimed
+
+def test_each_job_is_claimed_once_across_processes(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    ids = {store.create({"query": f"q{i}"}) for i in range(200)}
+
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        claims = list(pool.map(claim_all, [path] * 4, [f"w{i}" for i in range(4)]))
+
+    claimed = [job_id for ids_ in claims for job_id in ids_]
+    assert len(claimed) == len(set(claimed)) == len(ids)
+    assert set(claimed) == ids
+
+def test_only_stale_jobs_are_requeued(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    live, dead = store.create({}), store.create({})
+    assert store.claim_next("a")["id"] == live
+    assert store.claim_next("b")["id"] == dead
+    store.update(dead, heartbeat=time.time() - 600)
+
+    store.heartbeat([live, dead], "a")  # "a" can't revive a job it doesn't own
+    assert store.requeue_stale(stale_after=60) == 1
+    assert store.get(live)["status"] == RUNNING
+    assert store.get(dead)["status"] == QUEUED
+    assert store.get(dead)["owner"] is None
+
+def test_jobs_from_before_owner_columns_are_migrated(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, params TEXT NOT NULL, status TEXT NOT NULL, step TEXT, "
+        "state TEXT NOT NULL, error TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0, "
+        "result_count INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO jobs VALUES ('old', '{}', 'running', 'fetch', '{}', NULL, 0, 0, 1, 1)")
+    conn.commit()
+    conn.close()
+
+    store = JobStore(path)
+    assert store.get("old")["heartbeat"] is None
+    assert store.requeue_stale() == 1  # no heartbeat: its worker predates them, so it is gone
+    assert store.claim_next("w")["id"] == "old"
+
+def test_a_worker_that_lost_its_job_cannot_write_to_it(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_id = store.create({})
+    store.claim_next("slow")
+    assert store.append_results(job_id, [{"n": 0}], {"retstart": 1}, "slow")
+
+    # "slow" stalls past STALE_AFTER; its job is requeued and resumed by "fresh"
+    store.update(job_id, heartbeat=time.time() - 600)
+    store.requeue_stale(stale_after=60)
+    assert store.claim_next("fresh")["state"] == {"retstart": 1}
+
+    assert not store.append_results(job_id, [{"n": "late"}], {"retstart": 9}, "slow")
+    assert not store.update(job_id, "slow", status=SUCCEEDED)
+    assert store.append_results(job_id, [{"n": 1}], {"retstart": 2}, "fresh")
+
+    job = store.get(job_id)
+    assert (job["status"], job["result_count"], job["state"]) == (RUNNING, 2, {"retstart": 2})
+    assert list(store.iter_results(job_id)) == [{"n": 0}, {"n": 1}]
+
+def test_run_job_stops_once_the_job_is_taken_over(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_id = store.create({"query": "sepsis", "filter_stats": False})
+    job = store.claim_next("slow")
+
+    def windows(query, start=0, limit=-1, **kwargs):
+        yield 1, 3, [{"pmid": "1"}]
+        store.update(job_id, heartbeat=time.time() - 600)  # we stalled; requeued and reclaimed
+        store.requeue_stale(stale_after=60)
+        store.claim_next("fresh")
+        yield 2, 3, [{"pmid": "2"}]
+        yield 3, 3, [{"pmid": "3"}]
+
+    monkeypatch.setattr(worker, "iter_history_windows", windows)
+    with pytest.raises(worker.JobLost):
+        worker.run_job(store, job)
+    assert list(store.iter_results(job_id)) == [{"pmid": "1"}]
+    assert store.get(job_id)["owner"] == "fresh"
@@ -0,0 +1,71 @@
+# tests/test_map_reduce.py
+
+import asyncio
+import json
+
+import pytest
+
+from summarization import map_reduce
+from summarization.map_reduce import SummaryStore, build_review_async
+
+ARTICLES = [{"pmid": str(10000 + i), "title": f"Trial {i}",
+             "abstract": f"Cohort {i} was followed for outcome {i}. " * 6} for i in range(60)]
+
+class FakeLLM:
+    def __init__(self, fail_pmid=None):
+        self.fail_pmid = fail_pmid
+        self.prompts = []
+        self.budgets = set()
+
+    async def __call__(self, messages, budget=None):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        self.budgets.add(id(budget) if budget is not None else None)
+        if self.fail_pmid and f"[{self.fail_pmid}]" in prompt:
+            raise RuntimeError("upstream 500")
+        return f"summary #{len(self.prompts)}", 1
+
+@pytest.fixture
+def store(tmp_path):
+    return SummaryStore(str(tmp_path / "summaries.db"))
+
+def review(store, llm, monkeypatch, articles=ARTICLES):
+    monkeypatch.setattr(map_reduce, "acomplete", llm)
+    return asyncio.run(build_review_async(articles, store=store, budget=300, tokens_per_minute=10 ** 9))
+
+def test_every_level_draws_on_one_token_budget(store, monkeypatch):
+    llm = FakeLLM()
+    result = review(store, llm, monkeypatch)
+    assert result["chunks"] > map_reduce.REDUCE_FAN_IN  # at least two reduce levels
+    assert len(llm.budgets) == 1 and None not in llm.budgets
+
+def test_a_failed_chunk_marks_the_review_incomplete_and_is_retried(store, monkeypatch):
+    failing = ARTICLES[17]["pmid"]
+    first = review(store, FakeLLM(fail_pmid=failing), monkeypatch)
+    assert first["review"] and first["failures"][0]["level"] == 0
+    assert failing in first["missing_ids"] and len(first["missing_ids"]) < len(ARTICLES)
+    # Nothing built without the failed chunk was stored
+    stored = [json.loads(ids) for (ids,) in store.conn.execute("SELECT article_ids FROM summary_nodes")]
+    assert stored and not any(failing in ids for ids in stored)
+
+    llm = FakeLLM()
+    second = review(store, llm, monkeypatch)
+    assert second["missing_ids"] == [] and second["failures"] == []
+    # Only the failed chunk and its path to the root are summarized again
+    assert 1 < second["llm_calls"] < first["llm_calls"] and second["reused"] > 0
+
+def test_unchanged_nodes_are_reused(store, monkeypatch):
+    first = review(store, FakeLLM(), monkeypatch)
+    total = first["llm_calls"]
+    assert first["reused"] == 0
+
+    llm = FakeLLM()
+    again = review(store, llm, monkeypatch)
+    assert (again["llm_calls"], again["reused"], again["review"]) == (0, total, first["review"])
+
+    # One more article: its chunk and the reduce path above it, nothing else
+    added = {"pmid": "10030a", "title": "Late trial", "abstract": "A late cohort was followed. " * 6}
+    grown = review(store, llm, monkeypatch, ARTICLES + [added])
+    assert 0 < grown["llm_calls"] < total // 2
+    assert sum("[10030a]" in p for p in llm.prompts) == 1
+    assert grown["review"] != first["review"]
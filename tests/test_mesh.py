@@ -0,0 +1,57 @@
+# tests/test_mesh.py
+#
+# nlp.mesh against fixtures/mesh/desc_sample.xml, a few descriptors from the
+# Neoplasms (C04) and Breast Diseases (C17) trees plus "Breast Feeding".
+
+import os
+
+import pytest
+
+from nlp.mesh import MeshIndex, build_index
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "mesh", "desc_sample.xml")
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    out = str(tmp_path_factory.mktemp("mesh"))
+    build_index(FIXTURE, out)
+    return MeshIndex(out)
+
+def names(index, ids):
+    return [index.name[i] for i in ids]
+
+def test_find_by_name_entry_term_or_ui(index):
+    breast = index.find("Breast Neoplasms")
+    assert index.find("  breast   CANCER ") == breast
+    assert index.find("D001943") == breast
+    assert index.find("breast") is None and index.find("D999999") is None
+
+def test_prefix_completion_prefers_exact_then_preferred_names(index):
+    assert [c["name"] for c in index.complete("breast neoplasms")] == [
+        "Breast Neoplasms", "Breast Neoplasms, Male"]
+    # Entry terms complete to their descriptor, shown with the term that matched
+    assert index.complete("breast c", limit=1) == [{"ui": "D001943", "name": "Breast Neoplasms",
+                                                     "match": "Breast Cancer"}]
+    assert {c["name"] for c in index.complete("Breast")} == {
+        "Breast Neoplasms", "Breast Neoplasms, Male", "Breast Diseases", "Breast Feeding",
+        "Carcinoma, Ductal, Breast"}
+    assert index.complete("") == [] and index.complete("xyz") == []
+
+def test_explode_follows_every_tree_number(index):
+    breast = index.find("Breast Neoplasms")
+    assert sorted(names(index, index.explode(breast))) == [
+        "Breast Neoplasms, Male", "Carcinoma, Ductal, Breast", "Triple Negative Breast Neoplasms"]
+    # Breast Neoplasms sits under Breast Diseases too, without its C04 children
+    assert names(index, index.explode(index.find("Breast Diseases"))) == ["Breast Neoplasms"]
+
+def test_explode_depth_limit(index):
+    by_site = index.find("Neoplasms by Site")
+    assert names(index, index.explode(by_site, max_depth=1)) == ["Breast Neoplasms"]
+    assert len(index.explode(by_site)) == 4
+    assert index.explode(index.find("Breast Feeding")) == []
+
+def test_pubmed_clause_or_s_entry_terms(index):
+    assert index.pubmed_clause("breast cancer") == (
+        '("Breast Neoplasms"[Mesh] OR "Breast Cancer"[tiab] OR "Breast Tumors"[tiab] OR "Cancer of Breast"[tiab])')
+    assert index.pubmed_clause("Neoplasms by Site") == '"Neoplasms by Site"[Mesh]'
+    assert index.pubmed_clause("wearables") == '"wearables"[tiab]'
@@ -0,0 +1,53 @@
+# tests/test_metrics.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+from utils import metrics
+from utils.metrics import Counter, Histogram, render
+
+@pytest.fixture
+def registry(monkeypatch):
+    # Metrics made here register into a throwaway registry
+    monkeypatch.setattr(metrics, "_registry", [])
+
+def test_counters_render_one_sorted_line_per_label_set(registry):
+    requests = Counter("upstream_requests_total", "Responses from upstream APIs")
+    requests.inc(source="pubmed", status="200")
+    requests.inc(2, status="429", source="pubmed")
+    requests.inc(source="arxiv", status="200")
+
+    assert render() == (
+        "# HELP upstream_requests_total Responses from upstream APIs\n"
+        "# TYPE upstream_requests_total counter\n"
+        'upstream_requests_total{source="arxiv",status="200"} 1\n'
+        'upstream_requests_total{source="pubmed",status="200"} 1\n'
+        'upstream_requests_total{source="pubmed",status="429"} 2\n'
+    )
+
+def test_histograms_render_cumulative_buckets_sum_and_count(registry):
+    latency = Histogram("stage_seconds", "Stage latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, stage="fetch")
+
+    assert render().splitlines()[2:] == [
+        'stage_seconds_bucket{stage="fetch",le="0.1"} 1',
+        'stage_seconds_bucket{stage="fetch",le="1.0"} 3',
+        'stage_seconds_bucket{stage="fetch",le="+Inf"} 4',
+        'stage_seconds_sum{stage="fetch"} 4.05',
+        'stage_seconds_count{stage="fetch"} 4',
+    ]
+
+def test_help_and_label_values_are_escaped(registry):
+    Counter("errors_total", 'Errors\nby "kind"').inc(kind='bad "quote"\\path')
+    lines = render().splitlines()
+    assert lines[0] == '# HELP errors_total Errors\\nby "kind"'
+    assert lines[2] == 'errors_total{kind="bad \\"quote\\"\\\\path"} 1'
+
+def test_metrics_endpoint_serves_the_text_format():
+    from api import main
+
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    assert "# TYPE pipeline_stage_seconds histogram" in response.text
@@ -0,0 +1,55 @@
+# tests/test_packer.py
+
+import pytest
+
+from summarization import packer
+from summarization.packer import count_tokens, pack_abstracts, pack_stable, prompt_overhead
+from summarization.summarizer import build_messages
+
+def articles(n, start=0):
+    return [{"pmid": str(20000 + 7 * i), "title": f"Trial {i}",
+             "abstract": f"Patients in cohort {i} were followed for a year. " * (3 + i % 9)}
+            for i in range(start, start + n)]
+
+@pytest.fixture
+def char_tokens(monkeypatch):
+    # Chunk boundaries depend on the tokenizer; pin the offline estimate
+    monkeypatch.setattr(packer, "_encoding", lambda model: None)
+
+def test_chunks_stay_within_the_budget():
+    long_one = {"pmid": "1", "title": "Long", "abstract": "Mortality fell by a third in the treated arm. " * 200}
+    chunks = pack_abstracts(articles(40) + [long_one], build_messages, budget=500)
+
+    overhead = prompt_overhead(build_messages)
+    for chunk in chunks:
+        assert count_tokens(chunk["text"]) <= 500
+        assert chunk["tokens"] - overhead <= 500
+    assert {i for c in chunks for i in c["ids"]} == {a["pmid"] for a in articles(40)} | {"1"}
+    # The oversized abstract was split into parts, each in some chunk
+    parts = [c for c in chunks if "[1] Title: Long (part" in c["text"]]
+    assert len(parts) > 1
+
+def test_bins_are_well_filled():
+    report = packer.packing_report(pack_abstracts(articles(200), build_messages, budget=1000))
+    assert report["mean_fill"] > 0.9
+
+def test_stable_chunks_only_change_around_an_added_article(char_tokens):
+    before = [c["ids"] for c in pack_stable(articles(200), budget=800)]
+    added = {"pmid": "20351", "title": "New trial", "abstract": "A new randomized trial. " * 10}
+    after = [c["ids"] for c in pack_stable(articles(200) + [added], budget=800)]
+
+    # Chunks before the new article are untouched, and a content-defined
+    # boundary soon after it brings the rest back in step
+    changed = [ids for ids in before if ids not in after]
+    assert 0 < len(changed) <= 3 < len(before)
+    first = before.index(changed[0])
+    assert before[:first] == after[:first]
+    tail = len(before) - first - len(changed)
+    assert before[len(before) - tail:] == after[len(after) - tail:]
+    assert any("20351" in ids for ids in after[first:len(after) - tail])
+
+def test_stable_chunks_respect_the_budget_in_id_order(char_tokens):
+    chunks = pack_stable(articles(200), budget=400)
+    assert all(c["tokens"] <= 400 for c in chunks)
+    ids = [i for c in chunks for i in c["ids"]]
+    assert ids == sorted(a["pmid"] for a in articles(200))
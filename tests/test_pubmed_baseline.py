@@ -0,0 +1,43 @@
+# tests/test_pubmed_baseline.py
+#
+# ingestion.pubmed_baseline against two small fixture files:
+#   baseline/pubmed25n0001.xml.gz     PMIDs 100-103 (102 doesn't mention statistics)
+#   updatefiles/pubmed25n0002.xml.gz  revises 100, revises 101 so it no longer
+#                                     passes the filter, adds 104, and deletes
+#                                     103 and 999 (never stored)
+
+import os
+
+from ingestion.pubmed_baseline import ingest, list_files
+from storage.article_store import ArticleStore
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "pubmed_baseline")
+BASELINE = os.path.join(FIXTURES, "baseline")
+UPDATES = os.path.join(FIXTURES, "updatefiles")
+
+def stored_pmids(db_path):
+    store = ArticleStore(db_path)
+    return {sid for sid, in store.conn.execute("SELECT source_id FROM articles WHERE source = 'pubmed'")}
+
+def test_files_are_ordered_by_number_not_directory():
+    names = [os.path.basename(p) for p in list_files([UPDATES, BASELINE])]
+    assert names == ["pubmed25n0001.xml.gz", "pubmed25n0002.xml.gz"]
+
+def test_updates_and_deletions_apply_after_the_baseline(tmp_path):
+    db_path = str(tmp_path / "articles.db")
+    totals = ingest([UPDATES, BASELINE], workers=2, db_path=db_path)
+
+    assert stored_pmids(db_path) == {"100", "104"}
+    assert totals == {"parsed": 7, "stored": 5, "deleted": 2}  # 101 (filtered out) and 103
+    store = ArticleStore(db_path)
+    assert store.get_record("pubmed", "100")["title"] == "Sepsis risk model (revised)"
+    assert [r["pmid"] for _, r, _ in store.search("delirium OR variance")] == []
+
+def test_applied_files_are_skipped(tmp_path):
+    db_path = str(tmp_path / "articles.db")
+    ingest([BASELINE], workers=1, db_path=db_path)
+    assert stored_pmids(db_path) == {"100", "101", "103"}
+
+    assert ingest([BASELINE, UPDATES], workers=1, db_path=db_path)["parsed"] == 3
+    assert ingest([BASELINE, UPDATES], workers=1, db_path=db_path) is None
+    assert stored_pmids(db_path) == {"100", "104"}
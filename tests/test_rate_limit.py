@@ -0,0 +1,52 @@
+# tests/test_rate_limit.py
+
+import asyncio
+import threading
+import time
+
+from benchmarks.fake_s2 import start_fake_s2
+from ingestion import semantic_ingestor
+from ingestion.async_http import close_async_client
+from utils.rate_limit import AdaptiveRateLimiter, AsyncRateLimiter, RateLimiter
+
+def test_threads_and_coroutines_share_one_budget():
+    shared = RateLimiter(20)  # one slot every 50 ms
+    async_view = AsyncRateLimiter(shared)
+
+    def in_thread():
+        for _ in range(2):
+            shared.wait()
+
+    async def on_loop():
+        await asyncio.gather(*(async_view.wait() for _ in range(8)))
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=in_thread) for _ in range(4)]
+    for t in threads:
+        t.start()
+    asyncio.run(on_loop())
+    for t in threads:
+        t.join()
+    # 16 slots, the first one immediate
+    assert time.monotonic() - start >= 15 * shared.interval * 0.95
+
+def test_async_s2_requests_back_off_on_the_shared_limiter(monkeypatch):
+    server, api_url = start_fake_s2(latency=0, throttle_every=2)  # the 2nd request gets a 429
+    shared = AdaptiveRateLimiter(100)
+    monkeypatch.setattr(semantic_ingestor, "BASE_URL", f"{api_url}/paper/search")
+    monkeypatch.setattr(semantic_ingestor, "async_limiter", AsyncRateLimiter(shared))
+
+    async def search_twice():
+        try:
+            for _ in range(2):
+                await semantic_ingestor.async_search_semantic_scholar("sepsis", max_results=5)
+        finally:
+            await close_async_client()
+
+    start = time.monotonic()
+    try:
+        asyncio.run(search_twice())
+    finally:
+        server.shutdown()
+    assert time.monotonic() - start >= 1.0  # Retry-After: 1, held by the limiter
+    assert shared.interval > shared.base_interval  # sync callers are slowed too
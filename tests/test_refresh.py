@@ -0,0 +1,70 @@
+# tests/test_refresh.py
+#
+# reviews.refresh against the fake E-utilities server from benchmarks/
+# (every query matches the same HITS records; date windows are ignored).
+
+import asyncio
+
+import pytest
+
+from benchmarks.fake_eutils import start_fake_eutils
+from ingestion import pubmed_ingestor
+from ingestion.async_http import close_async_client
+from reviews import refresh as refresh_module
+from reviews.store import ReviewStore
+from storage.article_store import ArticleStore
+from utils.rate_limit import AsyncRateLimiter, RateLimiter
+
+HITS = 2500  # spans several history-server windows
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    server, url = start_fake_eutils(latency=0, hits=HITS)
+    reviews, articles = ReviewStore(str(tmp_path / "reviews.db")), ArticleStore(str(tmp_path / "articles.db"))
+    monkeypatch.setattr(pubmed_ingestor, "BASE_URL", url)
+    monkeypatch.setattr(pubmed_ingestor, "async_limiter", AsyncRateLimiter(RateLimiter(1000)))
+    monkeypatch.setattr(refresh_module, "get_review_store", lambda: reviews)
+    monkeypatch.setattr(refresh_module, "get_store", lambda: articles)
+    yield reviews
+    server.shutdown()
+
+def run(saved):
+    async def once():
+        try:
+            return await refresh_module.refresh(saved, summarize=False)
+        finally:
+            await close_async_client()
+    return asyncio.run(once())
+
+def test_baseline_pages_every_record_then_advances(stores):
+    saved = stores.save("all", "sepsis", filter_stats=False)
+    stats = run(saved)
+
+    assert (stats["searched"], stats["new"], stats["missed"]) == (HITS, HITS, 0)
+    assert stores.result_count("all", kept_only=False) == HITS
+    assert stores.get("all")["watermark"] == stats["maxdate"]
+    assert stores.runs("all")[0]["status"] == "succeeded"
+
+    again = run(stores.get("all"))
+    assert (again["new"], again["updated"]) == (0, 0)
+
+def test_results_past_max_results_hold_the_watermark(stores):
+    saved = stores.save("capped", "sepsis", filter_stats=False, max_results=1000)
+    stats = run(saved)
+
+    assert (stats["new"], stats["missed"]) == (1000, HITS - 1000)
+    assert stores.get("capped")["watermark"] is None
+    assert stores.runs("capped")[0]["status"] == "incomplete"
+    assert stores.result_count("capped", kept_only=False) == 1000
+
+def test_staged_results_are_ranked_and_cleared(stores):
+    run_id = stores.start_run("ranked", None, "2024/01/01")
+    stores.stage_results(run_id, [("1", True, "d1", 0.2), ("2", False, "d2", None), ("3", True, "d3", 0.9)])
+    stores.stage_results(run_id, [("4", True, "d4", 0.5)])
+    assert stores.ranked_results(run_id) == ["3", "4", "1"]
+    assert stores.ranked_results(run_id, 2) == ["3", "4"]
+
+    stores.save("ranked", "sepsis")
+    stores.finish_run(run_id, "ranked", {}, [], "2024/01/01")
+    assert stores.result_count("ranked", kept_only=False) == 4
+    assert stores.ranked_results(run_id) == []
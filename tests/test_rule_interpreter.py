@@ -0,0 +1,49 @@
+# tests/test_rule_interpreter.py
+
+import pytest
+
+from nlp import rule_interpreter
+from nlp.rule_interpreter import interpret_rules
+
+@pytest.fixture(autouse=True)
+def no_mesh_index(monkeypatch):
+    monkeypatch.setattr(rule_interpreter, "get_mesh_index", lambda: None)
+
+# prompt, pubmed_query, post_filter_keywords, confident
+CASES = [
+    # "mean"/"median" in a prompt is topic, not a request for statistics
+    ("mean arterial pressure in sepsis", "mean arterial pressure AND sepsis", [], True),
+    ("median nerve injury in carpal tunnel syndrome", "median nerve injury AND carpal tunnel syndrome", [], True),
+    ("MRI imaging by means of contrast agents", "MRI imaging AND contrast agents", [], True),
+    # Non-ASCII letters are part of words
+    ("α-synuclein in Parkinson disease", "α-synuclein AND Parkinson disease", [], True),
+    ("Guillain-Barr\u00e9 syndrome", "Guillain-Barr\u00e9 syndrome", [], True),
+    ("Guillain-Barre\u0301 syndrome", "Guillain-Barr\u00e9 syndrome", [], True),  # decomposed accent
+    # Methods at a concept boundary are stripped into the post-filter
+    ("logistic regression for sepsis mortality", "sepsis mortality", ["logistic regression"], True),
+    ("statistical analysis of sepsis outcomes", "sepsis outcomes", ["statistical analysis"], True),
+    # ... but not confidently from inside one
+    ("sepsis logistic regression mortality", "sepsis AND mortality", ["logistic regression"], False),
+    ("cox regression survival in breast cancer", "survival AND breast cancer", ["cox model"], False),
+    # Descriptive statistics are left to the LLM
+    ("mean ± SD of HbA1c in type 2 diabetes", "mean SD AND HbA1c AND type 2 diabetes",
+     ["descriptive statistics"], False),
+    ("how does deep learning compare to radiologists", None, None, False),
+    # Lowercase or/not would turn into AND; the LLM (or an explicit OR/NOT) decides
+    ("diabetes or obesity", "diabetes AND obesity", [], False),
+    ("aspirin not warfarin", "aspirin AND warfarin", [], False),
+    ("stroke prevention without anticoagulation", "stroke prevention AND anticoagulation", [], False),
+    ("diabetes OR obesity", "diabetes OR obesity", [], True),
+    ("aspirin NOT warfarin", "aspirin NOT warfarin", [], True),
+    ("diabetes OR obesity not in children", "diabetes OR obesity not in children", [], False),
+    # ... but not a word that only contains them
+    ("notch signaling in organoids", "notch signaling AND organoids", [], True),
+]
+
+@pytest.mark.parametrize("prompt, query, keywords, confident", CASES)
+def test_interpret_rules(prompt, query, keywords, confident):
+    result, is_confident = interpret_rules(prompt)
+    assert is_confident is confident
+    if query is not None:
+        assert result["pubmed_query"] == query
+        assert result["post_filter_keywords"] == keywords
@@ -0,0 +1,32 @@
+# tests/test_search_index.py
+
+from storage.article_store import ArticleStore
+from storage.search_index import _fallback_query, to_fts_query
+
+def test_pubmed_syntax_is_quoted_for_fts5():
+    query = '("machine learning"[tiab] OR deep*) AND COVID-19[MeSH] not p-value'
+    assert to_fts_query(query) == '( "machine learning" OR "deep"* ) AND "COVID-19" NOT "p-value"'
+
+def test_empty_phrases_and_stray_quotes_are_dropped():
+    assert to_fts_query('"" sepsis* "a"b"') == '"sepsis"* "a" "b"'
+    assert _fallback_query("(sepsis AND [tiab] OR mortality") == '"sepsis" AND "mortality"'
+
+def test_broken_boolean_query_falls_back_to_all_words(tmp_path):
+    store = ArticleStore(str(tmp_path / "articles.db"))
+    store.put_many("pubmed", [{"pmid": "1", "title": "Sepsis mortality in adults"}], "pmid")
+    # "sepsis AND" leaves FTS5 a dangling operator; the fallback still matches
+    assert [r["pmid"] for _, r, _ in store.search("sepsis AND")] == ["1"]
+
+def test_updates_and_deletes_keep_the_index_in_step(tmp_path):
+    store = ArticleStore(str(tmp_path / "articles.db"))
+    store.put_many("pubmed", [{"pmid": "1", "title": "Sepsis in children"},
+                              {"pmid": "2", "title": "Stroke outcomes"}], "pmid")
+    store.put_many("pubmed", [{"pmid": "1", "title": "Asthma in children"}], "pmid")
+
+    assert store.search("sepsis") == []
+    assert [r["pmid"] for _, r, _ in store.search("asthma")] == ["1"]
+    assert store.conn.execute("SELECT count(*) FROM article_fts").fetchone()[0] == 2
+
+    store.delete_many("pubmed", ["1"])
+    assert store.search("children") == []
+    assert [r["pmid"] for _, r, _ in store.search("stroke")] == ["2"]
@@ -0,0 +1,53 @@
+# tests/test_search_stream.py
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import main
+from storage.article_store import ArticleStore
+
+PMIDS = [str(30000000 + i) for i in range(450)]  # three efetch batches
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    store = ArticleStore(str(tmp_path / "articles.db"))
+    monkeypatch.setattr(main, "get_store", lambda: store)
+    return TestClient(main.app)  # no lifespan: no job workers
+
+def events(client, fmt="ndjson"):
+    response = client.post(f"/api/search/stream?format={fmt}",
+                           json={"query": "sepsis", "max_results": len(PMIDS), "filter_stats": False})
+    assert response.status_code == 200
+    if fmt == "sse":
+        return [line[len("event: "):] for line in response.text.splitlines() if line.startswith("event: ")]
+    return [json.loads(line) for line in response.text.splitlines()]
+
+def test_a_failed_batch_is_reported_and_the_stream_still_finishes(client, monkeypatch):
+    async def search(query, max_results):
+        return PMIDS
+
+    async def fetch_batch(batch):
+        if batch[0] == PMIDS[200]:
+            raise RuntimeError("efetch returned 502")
+        return [{"pmid": p, "title": f"t{p}", "abstract": "a"} for p in batch]
+
+    monkeypatch.setattr(main, "async_search_pubmed", search)
+    monkeypatch.setattr(main, "async_fetch_batch", fetch_batch)
+    stream = events(client)
+
+    errors = [e for e in stream if e["type"] == "error"]
+    assert len(errors) == 1 and errors[0]["pmids"] == PMIDS[200:400] and "502" in errors[0]["error"]
+    assert stream[-1] == {"type": "done", "total": 450, "returned": 250, "failed": 200}
+    assert [e for e in stream if e["type"] == "progress"][-1]["batches_failed"] == 1
+
+    sse = events(client, "sse")
+    assert "error" in sse and sse[-1] == "done"
+
+def test_a_failed_search_ends_with_an_error_and_done(client, monkeypatch):
+    async def search(query, max_results):
+        raise RuntimeError("esearch timed out")
+
+    monkeypatch.setattr(main, "async_search_pubmed", search)
+    assert [e["type"] for e in events(client)] == ["error", "done"]
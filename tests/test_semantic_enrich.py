@@ -0,0 +1,29 @@
+# tests/test_semantic_enrich.py
+
+from ingestion import semantic_enrich
+from storage.article_store import ArticleStore
+
+def test_enrichment_keeps_the_stored_record_and_its_fetch_time(tmp_path, monkeypatch):
+    store = ArticleStore(str(tmp_path / "articles.db"))
+    store.put_many("pubmed", [{"pmid": "1", "title": "Stored title", "abstract": "sepsis"},
+                              {"pmid": "2", "title": "Also stored", "abstract": "dialysis"}], "pmid")
+    store.conn.execute("UPDATE articles SET fetched_at = 1000")
+    store.conn.commit()
+
+    paper = {"paperId": "s2-1", "title": "Stored title", "citationCount": 12, "externalIds": {"PubMed": "1"}}
+    monkeypatch.setattr(semantic_enrich, "get_store", lambda: store)
+    monkeypatch.setattr(semantic_enrich, "fetch_paper_batch", lambda ids: [paper if i == "PMID:1" else None for i in ids])
+
+    # The caller's copies are out of date; only "s2" may reach the store
+    records = [{"pmid": "1", "title": "Stale copy"}, {"pmid": "2", "title": "Stale copy"},
+               {"pmid": "3", "title": "Never stored", "abstract": "troponin"}]
+    stats = semantic_enrich.enrich_records(records)
+
+    assert stats == {"looked_up": 3, "found": 1, "skipped": 0}
+    rows = dict(store.conn.execute("SELECT source_id, fetched_at FROM articles WHERE source = 'pubmed'"))
+    assert rows["1"] == rows["2"] == 1000 and rows["3"] > 1000
+    first = store.get_record("pubmed", "1")
+    assert first["title"] == "Stored title" and first["s2"]["citation_count"] == 12
+    assert store.get_record("pubmed", "2")["s2"]["found"] is False
+    assert [r["pmid"] for _, r, _ in store.search("troponin")] == ["3"]
+    assert store.get_record("semantic", "s2-1")["title"] == "Stored title"
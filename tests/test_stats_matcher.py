@@ -0,0 +1,32 @@
+# tests/test_stats_matcher.py
+
+from utils.stats_matcher import StatsMatcher, default_matcher
+
+def test_offsets_index_the_original_text():
+    text = "We used Logistic Regression and a Cox proportional hazards model (P < 0.05)."
+    matches = default_matcher.find(text)
+    assert [m.method for m in matches] == ["logistic regression", "cox model", "p-value"]
+    assert all(text[m.start:m.end] == m.text for m in matches)
+    assert matches[0].text == "Logistic Regression"
+
+def test_text_that_grows_when_lowercased_is_scanned_case_insensitively():
+    # "İ".lower() is two characters, so offsets of a lowercased copy would drift
+    text = "İstanbul cohort: ODDS RATIOS with 95% CI were reported."
+    assert len(text.lower()) != len(text)
+    matches = default_matcher.find(text)
+    assert [(m.method, m.text) for m in matches] == [("odds ratio", "ODDS RATIOS"),
+                                                       ("confidence interval", "95% CI")]
+    assert all(text[m.start:m.end] == m.text for m in matches)
+
+def test_terms_only_match_whole_words():
+    assert not default_matcher.mentions("nonregression of anovagen levels")
+    assert default_matcher.methods("ANOVA, then regressions") == ["anova", "regression"]
+
+def test_bare_mean_and_median_are_not_statistics():
+    assert not default_matcher.mentions("by means of a mean arterial pressure target")
+    assert not default_matcher.mentions("the median survival time was 14 months")
+    assert default_matcher.methods("median (IQR) age was 54") == ["descriptive statistics"]
+
+def test_keyword_matcher_escapes_its_keywords():
+    matcher = StatsMatcher.from_keywords(["C-statistic", "AUC (ROC)"])
+    assert matcher.methods("The AUC (ROC) and c-statistic were 0.8") == ["AUC (ROC)", "C-statistic"]
@@ -0,0 +1,78 @@
+# tests/test_summarizer.py
+#
+# The async summarizer against a scripted openai.ChatCompletion.acreate;
+# the LLM cache is a fresh one per test.
+
+import asyncio
+
+import openai
+import pytest
+
+from summarization import summarizer
+from summarization.summarizer import summarize_chunks_async
+from utils import llm_cache
+
+class FakeCompletions:
+    """Replies "summary of <chunk>" after `delay(chunk)` seconds; `errors`
+    maps a chunk to the exceptions its first calls raise, in order."""
+
+    def __init__(self, errors=None, delay=lambda chunk: 0):
+        self.errors = {chunk: list(errs) for chunk, errs in (errors or {}).items()}
+        self.delay = delay
+        self.calls = []
+
+    async def acreate(self, model, messages, **params):
+        chunk = messages[-1]["content"].split("Abstracts:\n")[1].split("\n")[0]
+        self.calls.append(chunk)
+        await asyncio.sleep(self.delay(chunk))
+        if self.errors.get(chunk):
+            raise self.errors[chunk].pop(0)
+        return {"choices": [{"message": {"content": f"summary of {chunk}"}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}}
+
+@pytest.fixture
+def llm(tmp_path, monkeypatch):
+    def install(**kwargs):
+        fake = FakeCompletions(**kwargs)
+        monkeypatch.setattr(openai.ChatCompletion, "acreate", fake.acreate)
+        return fake
+    monkeypatch.setattr(llm_cache, "_cache", llm_cache.LLMCache(str(tmp_path / "llm_cache.db")))
+    monkeypatch.setattr(summarizer, "BACKOFF_BASE", 0.001)
+    return install
+
+def summarize(chunks, concurrency=4):
+    return asyncio.run(summarize_chunks_async(chunks, concurrency, tokens_per_minute=0))
+
+def rate_limited():
+    return openai.error.RateLimitError("slow down", http_status=429, headers={"retry-after": "0"})
+
+def test_results_come_back_in_chunk_order(llm):
+    llm(delay=lambda chunk: 0.05 if chunk == "a" else 0)  # "a" finishes last
+    results = summarize(["a", "b", "c"])
+    assert [(r["chunk"], r["summary"]) for r in results] == [(1, "summary of a"), (2, "summary of b"),
+                                                              (3, "summary of c")]
+
+def test_retryable_errors_are_retried(llm):
+    fake = llm(errors={"b": [rate_limited(), openai.error.APIError("bad gateway", http_status=502)]})
+    results = summarize(["a", "b"])
+    assert [r["attempts"] for r in results] == [1, 3]
+    assert results[1]["summary"] == "summary of b" and results[1]["error"] is None
+    assert fake.calls.count("b") == 3
+
+def test_failures_are_reported_not_dropped(llm):
+    fake = llm(errors={"a": [openai.error.InvalidRequestError("too long", None)],
+                       "b": [rate_limited()] * (summarizer.MAX_RETRIES + 1)})
+    results = summarize(["a", "b", "c"])
+
+    assert [r["summary"] for r in results] == [None, None, "summary of c"]
+    assert results[0]["error"] == "InvalidRequestError: too long"
+    assert results[1]["error"] == "RateLimitError: slow down"
+    assert fake.calls.count("a") == 1  # not retryable
+    assert fake.calls.count("b") == summarizer.MAX_RETRIES + 1
+    assert summarizer.report_failures(results) == results[:2]
+
+def test_repeated_chunks_are_served_from_the_cache(llm):
+    fake = llm()
+    summarize(["a"])
+    assert [r["attempts"] for r in summarize(["a", "b"])] == [0, 1]
+    assert fake.calls == ["a", "b"]
@@ -0,0 +1,85 @@
+# tests/test_vector_index.py
+#
+# storage.vector_index with several writer processes sharing one index, the
+# way API workers and a --sync run do.
+
+import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from nlp.embedder import article_text
+from storage.article_store import ArticleStore
+from storage.vector_index import VectorIndex
+
+WORDS = ("sepsis mortality regression cohort kidney injury dialysis trial randomized placebo "
+         "insulin glucose retinopathy imaging cancer survival hazard biomarker troponin stroke").split()
+
+def records(offset, n):
+    rng = np.random.default_rng(offset)
+    return [{"pmid": str(offset + i), "title": " ".join(rng.choice(WORDS, 4)),
+             "abstract": " ".join(rng.choice(WORDS, 40))} for i in range(n)]
+
+def add_in_batches(db_path, vector_dir, offset):
+    index = VectorIndex(ArticleStore(db_path), vector_dir)
+    batch = records(offset, 200)
+    return sum(index.add("pubmed", batch[i:i + 10]) for i in range(0, len(batch), 10))
+
+def test_concurrent_writers_keep_rows_and_ids_aligned(tmp_path):
+    db_path, vector_dir = str(tmp_path / "articles.db"), str(tmp_path / "vectors")
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        added = list(pool.map(add_in_batches, [db_path] * 4, [vector_dir] * 4, [0, 1000, 2000, 3000]))
+
+    index = VectorIndex(ArticleStore(db_path), vector_dir)
+    mapping = dict(index.store.conn.execute("SELECT source_id, row FROM embeddings"))
+    assert sum(added) == len(mapping) == index.size == 800
+    assert sorted(mapping.values()) == list(range(800))
+
+    # Each row holds its own article's vector, not a neighbour's
+    texts = {r["pmid"]: article_text("pubmed", r) for offset in (0, 1000, 2000, 3000) for r in records(offset, 200)}
+    ids = list(mapping)
+    expected = index.embedder.embed([texts[i] for i in ids], index.df, index.size)
+    similarity = np.einsum("ij,ij->i", index.matrix()[[mapping[i] for i in ids]], expected)
+    assert similarity.min() > 0.95
+
+def test_rebuild_weights_every_row_with_the_final_idf(tmp_path):
+    store = ArticleStore(str(tmp_path / "articles.db"))
+    batch = records(0, 300)
+    store.put_many("pubmed", batch, "pmid")
+    index = VectorIndex(store, str(tmp_path / "vectors"))
+    for i in range(0, len(batch), 50):
+        index.add("pubmed", batch[i:i + 50])
+    assert index.idf_stale()  # the first 50 rows were weighted for a corpus of 50
+
+    index.rebuild(batch=50)
+    assert not index.idf_stale()
+    rows = index.rows_for("pubmed", [r["pmid"] for r in batch])
+    expected = index.embedder.embed([article_text("pubmed", r) for r in batch], index.df, len(batch))
+    stored = index.matrix()[[rows[r["pmid"]] for r in batch]]
+    assert np.allclose(stored, expected, atol=1e-6)
+    with open(index.meta_path) as f:
+        assert json.load(f) == {"idf_rows": 300}
+
+def test_writers_wait_for_the_whole_rebuild(tmp_path, monkeypatch):
+    db_path, vector_dir = str(tmp_path / "articles.db"), str(tmp_path / "vectors")
+    store = ArticleStore(db_path)
+    store.put_many("pubmed", records(0, 300), "pmid")
+    index = VectorIndex(store, vector_dir)
+    count_df = index.embedder.count_df
+    monkeypatch.setattr(index.embedder, "count_df", lambda texts, df: (time.sleep(0.3), count_df(texts, df))[1])
+
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        pool.submit(int).result()  # start the worker before any thread holds a lock
+        rebuilding = threading.Thread(target=index.rebuild, kwargs={"batch": 50})
+        rebuilding.start()
+        time.sleep(0.2)  # inside the df pass
+        added = pool.submit(add_in_batches, db_path, vector_dir, 5000).result()
+        rebuilding.join()
+
+    # The other writer got the lock only after both passes, so it appended
+    # after the rebuilt rows instead of between the df and embed passes
+    mapping = dict(store.conn.execute("SELECT source_id, row FROM embeddings"))
+    assert added == 200 and len(mapping) == index.size == 500
+    assert sorted(mapping[str(i)] for i in range(300)) == list(range(300))
@@ -0,0 +1,22 @@
+# utils/checkpoint.py
+#
+# JSON checkpoints for resumable bulk downloads (PubMed history windows,
+# arXiv pages, OAI-PMH resumption tokens).
+
+import json
+import os
+
+def load_checkpoint(path, query):
+    # A checkpoint only applies to the query that wrote it
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    return checkpoint if checkpoint.get("query") == query else None
+
+def save_checkpoint(path, checkpoint):
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,186 @@
+# utils/llm_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import openai
+
+from utils import metrics
+
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.db")
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+# Calls sampled above this temperature are not cached: by default only
+# deterministic (temperature 0) calls are, since replaying one sample of a
+# sampled call would hide the variety it was asked for
+CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0"))
+EVICT_EVERY = 100  # puts between full size recounts (other processes share the file)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key         TEXT PRIMARY KEY,
+    response    TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache (last_access);
+CREATE INDEX IF NOT EXISTS llm_cache_expiry ON llm_cache (expires_at);
+"""
+
+def cache_key(model, messages, **params):
+    # Content-addressed: same model + messages + sampling params -> same key
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """Disk-backed LLM response cache, bounded by size with LRU eviction."""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = None  # running total of entry sizes, recounted by evict()
+        self._puts = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn.executescript(SCHEMA)
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        row = self.conn.execute("SELECT response, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < now:
+            with self._lock:
+                self.misses += 1
+            metrics.record_cache("llm", 0, 1)
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        with self._lock:
+            self.hits += 1
+        metrics.record_cache("llm", 1)
+        return json.loads(row[0])
+
+    def put(self, key, response, ttl=None):
+        now = time.time()
+        data = json.dumps(response)
+        with self.conn:
+            old = self.conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, size, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now + (ttl or self.ttl), now),
+            )
+        # Keep a running total instead of summing the table on every put;
+        # recount every EVICT_EVERY puts to pick up other processes' writes
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data) - (old[0] if old else 0)
+            self._puts += 1
+            due = self._size is None or self._size > self.max_bytes or self._puts % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        # Expired entries first, then least recently used until under the bound
+        with self.conn:
+            removed = self.conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),)).rowcount
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            if total > self.max_bytes:
+                target = total - int(self.max_bytes * 0.9)
+                freed = 0
+                victims = []
+                for key, size in self.conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access"):
+                    victims.append((key,))
+                    freed += size
+                    if freed >= target:
+                        break
+                self.conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+                removed += len(victims)
+                total -= freed
+        with self._lock:
+            self.evictions += removed
+            self._size = total
+
+    def stats(self):
+        entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+    return _cache
+
+def is_cacheable(params, use_cache=True):
+    return use_cache and params.get("temperature", 1.0) <= CACHE_MAX_TEMPERATURE
+
+def _to_plain(response):
+    # OpenAIObject -> plain dicts so it round-trips through JSON
+    return json.loads(json.dumps(response))
+
+# === Cached drop-ins for openai.ChatCompletion.create / acreate ===
+def chat_completion(model, messages, use_cache=True, **params):
+    cacheable = is_cacheable(params, use_cache)
+    key = cache_key(model, messages, **params) if cacheable else None
+    if cacheable:
+        cached = get_cache().get(key)
+        if cached is not None:
+            return cached
+
+    response = _to_plain(openai.ChatCompletion.create(model=model, messages=messages, **params))
+    metrics.record_llm_usage(model, response)
+    if cacheable:
+        get_cache().put(key, response)
+    return response
+
+def lookup(model, messages, use_cache=True, **params):
+    """Cached response or None, without calling the API (for async callers
+    that must do their own budgeting before a real call)."""
+    if not is_cacheable(params, use_cache):
+        return None
+    return get_cache().get(cache_key(model, messages, **params))
+
+def store(model, messages, response, use_cache=True, **params):
+    if is_cacheable(params, use_cache):
+        get_cache().put(cache_key(model, messages, **params), _to_plain(response))
+
+async def achat_completion(model, messages, use_cache=True, **params):
+    cached = lookup(model, messages, use_cache, **params)
+    if cached is not None:
+        return cached
+    response = _to_plain(await openai.ChatCompletion.acreate(model=model, messages=messages, **params))
+    metrics.record_llm_usage(model, response)
+    store(model, messages, response, use_cache, **params)
+    return response
@@ -0,0 +1,294 @@
+# utils/metrics.py
+#
+# In-process counters and latency histograms. Cheap enough to leave on
+# everywhere: a lock and a dict update per observation.
+#
+# Every metric registers itself; render() gives the Prometheus text format
+# served at /metrics by both APIs. The pipeline-wide metrics (stage latency,
+# upstream requests/bytes/retries, LLM tokens, cache lookups) are defined in
+# section 2. stage()/timed() also feed a per-run trace for `main.py --profile`.
+
+import bisect
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers a sub-millisecond rule match up to a slow LLM call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+def register(metric):
+    # A module imported twice (python -m, reloads) re-creates its metrics;
+    # the newest definition replaces the old one
+    with _registry_lock:
+        _registry[:] = [m for m in _registry if m.name != metric.name]
+        _registry.append(metric)
+    return metric
+
+# === 1. Metric types ===
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+        register(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self):
+        """{labels tuple: value}"""
+        with self._lock:
+            return dict(self._values)
+
+    def total(self, **labels):
+        wanted = set(labels.items())
+        return sum(v for k, v in self.values().items() if wanted <= set(k))
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+        register(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[i] += 1
+            self._series[key] = (counts, total + value)
+
+    def series(self):
+        """{labels tuple: (per-bucket counts incl. +Inf, sum)}"""
+        with self._lock:
+            return {k: (list(c), s) for k, (c, s) in self._series.items()}
+
+    def summary(self, **labels):
+        """count, mean and p50/p90/p99 (bucket upper bounds) over matching series."""
+        wanted = set(labels.items())
+        counts, total = [0] * (len(self.buckets) + 1), 0.0
+        for key, (c, s) in self.series().items():
+            if wanted <= set(key):
+                counts = [a + b for a, b in zip(counts, c)]
+                total += s
+        n = sum(counts)
+        result = {"count": n, "mean": total / n if n else None}
+        for q in (0.5, 0.9, 0.99):
+            result[f"p{int(q * 100)}"] = self._quantile(counts, q) if n else None
+        return result
+
+    def _quantile(self, counts, q):
+        target, seen = q * sum(counts), 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+# === 2. Pipeline metrics ===
+STAGE_LATENCY = Histogram("pipeline_stage_seconds", "Time spent in each pipeline stage")
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "Responses from upstream APIs, by source and HTTP status")
+UPSTREAM_BYTES = Counter("upstream_response_bytes_total", "Response bytes received from upstream APIs")
+UPSTREAM_RETRIES = Counter("upstream_retries_total",
+                           "Upstream requests retried, by source and reason (429, 5xx, transport)")
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens used, by model and kind (prompt, completion)")
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups, by cache and result (hit, miss)")
+HTTP_LATENCY = Histogram("http_request_seconds", "API request latency, by route and status")
+
+def retry_reason(status):
+    if status is None:
+        return "transport"
+    return "429" if status == 429 else "5xx"
+
+def record_response(source, response, stream=False):
+    """Count a response: status, bytes, and for `requests` the retries urllib3 made.
+
+    For stream=True the body hasn't been read yet; call record_bytes once
+    it has.
+    """
+    retries = getattr(getattr(response, "raw", None), "retries", None)
+    for attempt in getattr(retries, "history", None) or ():
+        UPSTREAM_RETRIES.inc(source=source, reason=retry_reason(attempt.status))
+    UPSTREAM_REQUESTS.inc(source=source, status=str(response.status_code))
+    if not stream:
+        record_bytes(source, response)
+
+def record_bytes(source, response):
+    # Wire bytes (before gzip decoding) where the transport knows them
+    nbytes = getattr(response, "num_bytes_downloaded", None)  # httpx
+    if nbytes is None:
+        tell = getattr(response.raw, "tell", None)
+        nbytes = tell() if tell else len(response.content)
+    UPSTREAM_BYTES.inc(nbytes, source=source)
+
+def record_llm_usage(model, response):
+    # One completed (uncached) chat completion
+    UPSTREAM_REQUESTS.inc(source="openai", status="200")
+    usage = response.get("usage") or {}
+    for kind in ("prompt", "completion"):
+        if usage.get(f"{kind}_tokens"):
+            LLM_TOKENS.inc(usage[f"{kind}_tokens"], model=model, kind=kind)
+
+def record_cache(cache, hits, misses=0):
+    if hits:
+        CACHE_LOOKUPS.inc(hits, cache=cache, result="hit")
+    if misses:
+        CACHE_LOOKUPS.inc(misses, cache=cache, result="miss")
+
+def cache_hit_rates():
+    """{cache: hit rate} over all lookups so far."""
+    caches = {dict(k)["cache"] for k in CACHE_LOOKUPS.values()}
+    rates = {}
+    for cache in sorted(caches):
+        hits = CACHE_LOOKUPS.total(cache=cache, result="hit")
+        rates[cache] = hits / CACHE_LOOKUPS.total(cache=cache)
+    return rates
+
+# === 3. Stage timing and per-run traces ===
+_trace = contextvars.ContextVar("metrics_trace", default=None)
+_stage_path = contextvars.ContextVar("metrics_stage_path", default=())
+
+@contextmanager
+def stage(name):
+    """Time a block as pipeline stage `name` (nested stages nest in the trace)."""
+    path = _stage_path.get() + (name,)
+    token = _stage_path.set(path)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _stage_path.reset(token)
+        STAGE_LATENCY.observe(elapsed, stage=name)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((path, elapsed))
+
+def timed(name):
+    """Decorator form of stage(); works on plain and async functions."""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def start_trace():
+    """Collect (stage path, seconds) for every stage run from this context on.
+
+    Threads started by a ThreadPoolExecutor don't inherit the context, so
+    stages inside worker threads only show up in the histograms.
+    """
+    trace = []
+    _trace.set(trace)
+    return trace
+
+def stage_breakdown(trace, wall_time):
+    """Printable table: calls and total time per stage path, in first-seen order."""
+    totals = {}
+    for path, elapsed in trace:
+        calls, total = totals.get(path, (0, 0.0))
+        totals[path] = (calls + 1, total + elapsed)
+    # Parents finish after their children; list them first
+    first = {}
+    for i, (path, _) in enumerate(trace):
+        for n in range(1, len(path) + 1):
+            first.setdefault(path[:n], i)
+    order = sorted(totals, key=lambda p: (first[p], len(p)))
+    lines = [f"{'stage':32s} {'calls':>6s} {'total s':>9s} {'% wall':>7s}"]
+    for path in order:
+        calls, total = totals[path]
+        label = "  " * (len(path) - 1) + path[-1]
+        lines.append(f"{label:32s} {calls:6d} {total:9.3f} {100 * total / wall_time:6.1f}%")
+    accounted = sum(total for path, (_, total) in totals.items() if len(path) == 1)
+    lines.append(f"{'(other)':32s} {'':6s} {wall_time - accounted:9.3f} "
+                 f"{100 * (wall_time - accounted) / wall_time:6.1f}%")
+    lines.append(f"{'wall':32s} {'':6s} {wall_time:9.3f}")
+    return "\n".join(lines)
+
+def upstream_report():
+    """Printable per-source requests, bytes and retries, LLM tokens and cache hit rates."""
+    lines = []
+    sources = sorted({dict(k)["source"] for k in UPSTREAM_REQUESTS.values()}
+                     | {dict(k)["source"] for k in UPSTREAM_RETRIES.values()})
+    for source in sources:
+        retries = ", ".join(f"{dict(k)['reason']}: {v}" for k, v in sorted(UPSTREAM_RETRIES.values().items())
+                            if dict(k)["source"] == source)
+        lines.append(f"{source:12s} {UPSTREAM_REQUESTS.total(source=source):6d} requests "
+                     f"{UPSTREAM_BYTES.total(source=source) / 1e6:9.2f} MB"
+                     + (f"  retries ({retries})" if retries else ""))
+    for key, tokens in sorted(LLM_TOKENS.values().items()):
+        labels = dict(key)
+        lines.append(f"LLM {labels['model']} {labels['kind']} tokens: {tokens}")
+    for cache, rate in cache_hit_rates().items():
+        lines.append(f"cache {cache}: {100 * rate:.0f}% hits of {CACHE_LOOKUPS.total(cache=cache)} lookups")
+    return "\n".join(lines)
+
+# === 4. Prometheus text exposition ===
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value, quotes=True):
+    # HELP text escapes backslash and newline only; label values also quotes
+    value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quotes else value
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def route_label(scope):
+    # The route template ("/api/jobs/{job_id}"), not the raw path, so ids
+    # don't each become a series
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def render():
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry)
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {_escape(metric.help, quotes=False)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if metric.kind == "counter":
+            for key, value in sorted(metric.values().items()):
+                lines.append(f"{metric.name}{_labels(key)} {_number(value)}")
+            continue
+        for key, (counts, total) in sorted(metric.series().items()):
+            seen = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), counts):
+                seen += count
+                lines.append(f"{metric.name}_bucket{_labels(key + (('le', _number(bound)),))} {seen}")
+            lines.append(f"{metric.name}_sum{_labels(key)} {_number(total)}")
+            lines.append(f"{metric.name}_count{_labels(key)} {seen}")
+    return "\n".join(lines) + "\n"
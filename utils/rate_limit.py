@@ -0,0 +1,116 @@
+# utils/rate_limit.py
+
+import asyncio
+import threading
+import time
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls evenly at `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def reserve(self):
+        """Take the next free slot; returns how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        return slot - time.monotonic()
+
+    def wait(self):
+        # Reserve under the lock, then sleep outside it so other threads can
+        # queue up behind us
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+class AdaptiveRateLimiter(RateLimiter):
+    """RateLimiter that slows down when the server pushes back.
+
+    `backoff` doubles the interval (up to `max_interval`) and, given a
+    Retry-After delay, holds every caller until it has passed; `success`
+    eases the interval back towards the configured rate.
+    """
+
+    def __init__(self, rate, max_interval=60.0):
+        super().__init__(rate)
+        self.base_interval = self.interval
+        self.max_interval = max_interval
+
+    def backoff(self, delay=None):
+        with self._lock:
+            self.interval = min(self.max_interval, self.interval * 2)
+            now = time.monotonic()
+            self._next_slot = max(self._next_slot, now + (delay if delay is not None else self.interval))
+
+    def success(self):
+        with self._lock:
+            self.interval = max(self.base_interval, self.interval * 0.8)
+
+class AsyncTokenBudget:
+    """Token-per-minute budget shared by concurrent coroutines.
+
+    A token bucket refilled continuously at `tokens_per_minute / 60` per
+    second; `acquire` waits (without blocking the loop) until enough is
+    available. `settle` gives back the difference when the real usage of a
+    call turns out lower than the estimate that was acquired.
+    """
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.available = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        tokens = min(tokens, self.capacity)
+        # Waiters queue on the lock, so the budget is handed out in FIFO order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return
+                await asyncio.sleep((tokens - self.available) / self.rate)
+
+    def settle(self, estimated, actual):
+        if actual is not None and actual < estimated:
+            self._refill()
+            self.available = min(self.capacity, self.available + (estimated - actual))
+
+class AsyncRateLimiter:
+    """Awaitable view of a RateLimiter for coroutines.
+
+    Slots come from the wrapped limiter, so coroutines and threads (sync
+    ingestor calls, job workers) in one process share one budget per source;
+    only the wait itself is done with asyncio.sleep. Wrapping an
+    AdaptiveRateLimiter makes `adaptive` true and `backoff`/`success` reach it.
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.adaptive = isinstance(limiter, AdaptiveRateLimiter)
+
+    async def wait(self):
+        delay = self.limiter.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def backoff(self, delay=None):
+        if self.adaptive:
+            self.limiter.backoff(delay)
+
+    def success(self):
+        if self.adaptive:
+            self.limiter.success()
@@ -0,0 +1,123 @@
+# utils/stats_matcher.py
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Canonical statistical method -> regex alternatives that indicate it.
+# Patterns are matched against the lowercased abstract, so write them in
+# lowercase. More specific phrasings come first so "logistic regression"
+# is reported as such rather than as plain "regression". Start every
+# alternative with a literal character; that is what keeps the scan fast.
+DEFAULT_TERMS = {
+    "logistic regression": [r"logistic(?: regression)?"],
+    "cox model": [r"cox (?:proportional[- ]hazards? )?(?:model|regression)", r"proportional[- ]hazards?"],
+    "regression": [r"regressions?"],
+    "p-value": [r"p[- ]?values?", r"p\s*[<>=≤≥]\s*0?\.\d+"],
+    "anova": [r"anova", r"analysis of variance"],
+    "chi-square": [r"chi[- ]?squared?(?: tests?)?", r"χ2"],
+    "t-test": [r"t[- ]tests?"],
+    "odds ratio": [r"odds ratios?"],
+    "hazard ratio": [r"hazard ratios?"],
+    "confidence interval": [r"confidence intervals?", r"9[059]% ?cis?"],
+    "multivariate analysis": [r"multivari(?:ate|able)(?: analys[ie]s)?"],
+    "statistical significance": [r"statistical(?:ly)? significan(?:t|ce)"],
+    "statistical analysis": [r"statistical analys[ie]s", r"statistical tests?"],
+    "standard deviation": [r"standard deviations?"],
+    "correlation": [r"correlations?", r"correlated"],
+    # Bare "mean"/"median" is mostly ordinary English ("by means of", "mean
+    # arterial pressure"); only count them next to a dispersion measure
+    "descriptive statistics": [
+        r"means?\s*(?:±|\+/-)\s*(?:sd|sem?|s\.d\.|standard deviations?)?",
+        r"means?\s*[(\[]\s*(?:sd|sem?|s\.d\.|standard deviations?)",
+        r"means? and standard deviations?",
+        r"medians?\s*(?:[(\[]\s*|and |,\s*)(?:iqr|interquartile ranges?|ranges?)",
+    ],
+}
+
+StatsMatch = namedtuple("StatsMatch", ["method", "start", "end", "text"])
+
+class StatsMatcher:
+    """All terms of a dictionary compiled into one alternation.
+
+    The abstract is lowercased once and scanned in a single pass. The
+    pattern is deliberately flat and case-sensitive (no named groups, no
+    leading lookbehind) so the regex engine can skip ahead to positions
+    whose first character can start a term; the method behind a hit is
+    looked up afterwards from the matched text. Lowercasing never shortens
+    a character, so when the length is unchanged the offsets of the
+    lowercased copy index the original text; otherwise (e.g. "İ") the
+    original is scanned with an IGNORECASE pattern, about 5x slower.
+    """
+
+    def __init__(self, terms=None):
+        self.terms = dict(terms or DEFAULT_TERMS)
+        alternatives = [p for patterns in self.terms.values() for p in patterns]
+        self.pattern = re.compile(rf"(?:{'|'.join(alternatives)})(?!\w)")
+        self.pattern_ignorecase = re.compile(self.pattern.pattern, re.IGNORECASE)
+        self._method_patterns = [
+            (method, re.compile(rf"(?:{'|'.join(patterns)})")) for method, patterns in self.terms.items()
+        ]
+        self.method_of = lru_cache(maxsize=4096)(self._method_of)
+
+    @classmethod
+    def from_keywords(cls, keywords):
+        # Plain keyword lists, e.g. interpret_query's post_filter_keywords
+        return cls({kw: [re.escape(kw.lower())] for kw in keywords if kw})
+
+    def _method_of(self, matched):
+        for method, pattern in self._method_patterns:
+            if pattern.fullmatch(matched):
+                return method
+        return None
+
+    def _iter_hits(self, text):
+        lowered = text.lower()
+        scanned, pattern = (lowered, self.pattern) if len(lowered) == len(text) else (text, self.pattern_ignorecase)
+        # Word-start check done here instead of in the regex (see class doc)
+        for m in pattern.finditer(scanned):
+            start = m.start()
+            if start and scanned[start - 1].isalnum():
+                continue
+            yield m
+
+    def mentions(self, text):
+        if not text:
+            return False
+        return next(self._iter_hits(text), None) is not None
+
+    def find(self, text):
+        """Every match in `text` as StatsMatch(method, start, end, text)."""
+        if not text:
+            return []
+        return [
+            StatsMatch(self.method_of(m.group().lower()), m.start(), m.end(), text[m.start():m.end()])
+            for m in self._iter_hits(text)
+        ]
+
+    def methods(self, text):
+        # Distinct methods in order of first appearance
+        return list(dict.fromkeys(m.method for m in self.find(text)))
+
+    # --- batch API over records ---
+    def match_records(self, records, field="abstract"):
+        """Yield (record, matches) for every record."""
+        for record in records:
+            yield record, self.find(record.get(field) or "")
+
+    def filter_records(self, records, field="abstract", annotate=False):
+        """Yield only records that mention a method; optionally tag them
+        with `stats_methods` and `stats_matches`."""
+        for record in records:
+            text = record.get(field) or ""
+            if not annotate:
+                if self.mentions(text):
+                    yield record
+                continue
+            matches = self.find(text)
+            if matches:
+                record["stats_methods"] = list(dict.fromkeys(m.method for m in matches))
+                record["stats_matches"] = [m._asdict() for m in matches]
+                yield record
+
+default_matcher = StatsMatcher()